@@ -46,7 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,17 +78,76 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Route the recipe list/detail and user endpoints to their async views.
+# app/asgi.py turns this on, so it only applies when served over ASGI.
+API_ASYNC_VIEWS = os.environ.get('API_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections come from an in-process pool (core.db.pool): Django hands
+# them back at the end of every request (CONN_MAX_AGE 0) and the pool
+# keeps them open, health-checked and recycled. Set DB_ENGINE to
+# django.db.backends.postgresql and DB_CONN_MAX_AGE to use Django's own
+# persistent connections instead.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.environ.get(
+            'DB_ENGINE', 'core.db.backends.postgresql_pool'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME':os.environ.get('DB_NAME'),
         'USER':os.environ.get('DB_USER'),
         'PASSWORD':os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'MAX_USES': int(os.environ.get('DB_POOL_MAX_USES', 1000)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'HEALTH_CHECK_INTERVAL': float(
+                os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30)
+            ),
+        },
+    }
+}
+
+# Read replicas, one alias per host in DB_REPLICA_HOSTS (replica1, ...).
+# core.db.routers.ReplicaRouter sends recipe list/retrieve reads to them,
+# except for users who wrote within the last REPLICA_STICKY_SECONDS.
+# Under test they mirror the default database.
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1
+):
+    _alias = 'replica%d' % _index
+    DATABASES[_alias] = dict(
+        DATABASES['default'],
+        HOST=_host.strip(),
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_STICKY_CACHE_ALIAS = os.environ.get(
+    'REPLICA_STICKY_CACHE_ALIAS', 'default'
+)
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django_redis.cache.RedisCache) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -109,6 +171,55 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the hasher for new passwords; the others stay
+# listed so existing hashes still verify and get upgraded on login.
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items()
+    if name != PASSWORD_HASHER
+]
+
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 260000)
+)
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 3))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 65536)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 4)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# Pool for the hashes of the user API (core.hashing), off unless
+# PASSWORD_HASHING_POOL=1: workers, extra requests allowed to queue, and
+# seconds to wait for a slot before answering 503. Waiting
+# requests hold a server thread, so keep workers + max pending below the
+# threads of each server process. The process executor relies on fork to
+# inherit the Django settings.
+PASSWORD_HASHING_POOL = os.environ.get('PASSWORD_HASHING_POOL', '0') == '1'
+PASSWORD_HASHING_EXECUTOR = os.environ.get(
+    'PASSWORD_HASHING_EXECUTOR', 'thread'
+)
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_MAX_PENDING = int(
+    os.environ.get('PASSWORD_HASHING_MAX_PENDING', 2)
+)
+PASSWORD_HASHING_TIMEOUT = float(
+    os.environ.get('PASSWORD_HASHING_TIMEOUT', 0.5)
+)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -137,4 +248,115 @@ AUTH_USER_MODEL ='core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS' : 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('PAGE_SIZE', 50)),
+    # orjson-backed JSON, falling back to the stdlib when orjson is not
+    # installed. Use rest_framework.renderers.JSONRenderer and
+    # rest_framework.parsers.JSONParser to always use the stdlib.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Upper bound for the ?page_size= query parameter.
+PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('PAGINATION_MAX_PAGE_SIZE', 500))
+
+# Rows fetched per server-side cursor round trip by the recipe export.
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000))
+
+# Cache used by core.authentication.CachedTokenAuthentication.
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_CACHE_ALIAS', 'default')
+TOKEN_AUTH_CACHE_TIMEOUT = int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 300))
+
+# Build recipe list responses from values_list() rows instead of model
+# instances and DRF fields (recipe.serializers.ValuesSerializer).
+RECIPE_FAST_SERIALIZER = os.environ.get('RECIPE_FAST_SERIALIZER', '0') == '1'
+
+# Response compression (core.middleware.CompressionMiddleware). Encodings
+# are in order of preference; br and zstd need brotli and zstandard.
+COMPRESSION_ENCODINGS = os.environ.get(
+    'COMPRESSION_ENCODINGS', 'br,zstd,gzip'
+).split(',')
+COMPRESSION_LEVELS = {
+    'gzip': int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6)),
+    'br': int(os.environ.get('COMPRESSION_BROTLI_LEVEL', 4)),
+    'zstd': int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3)),
+}
+# Smaller bodies gain little and cost a compressor each.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_CONTENT_TYPES = [
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/vnd.oai.openapi',
+    'application/javascript',
+    'application/xml',
+]
+# Streamed bodies are flushed to the client every this many bytes.
+COMPRESSION_STREAM_FLUSH_SIZE = int(
+    os.environ.get('COMPRESSION_STREAM_FLUSH_SIZE', 64 * 1024)
+)
+
+# OpenAPI schema files written by manage.py build_schema, served by
+# core.schema.SchemaView. Without them the schema is generated once per
+# process and CODE_VERSION (e.g. the commit being deployed) keys it.
+SCHEMA_DIR = os.environ.get('SCHEMA_DIR', str(BASE_DIR / 'schema'))
+CODE_VERSION = os.environ.get('CODE_VERSION', '')
+
+# Share of requests whose DB, serializer and render times are recorded
+# (core.instrumentation), and whether they get a Server-Timing header.
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 0.05)
+)
+INSTRUMENTATION_SERVER_TIMING = \
+    os.environ.get('INSTRUMENTATION_SERVER_TIMING', '1') == '1'
+# Bearer token for the Prometheus endpoint at /metrics, disabled if empty.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Limits for the recipe bulk endpoint.
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 10000))
+RECIPE_BULK_BATCH_SIZE = int(os.environ.get('RECIPE_BULK_BATCH_SIZE', 1000))
+
+# Rows validated and copied at a time by recipe imports, and how many
+# rejected rows an import reports in its response.
+RECIPE_IMPORT_BATCH_SIZE = int(os.environ.get('RECIPE_IMPORT_BATCH_SIZE', 5000))
+RECIPE_IMPORT_MAX_ERRORS = int(os.environ.get('RECIPE_IMPORT_MAX_ERRORS', 100))
+
+# Background jobs (core.jobs): 'database' queues them for
+# manage.py run_worker, 'immediate' runs them when enqueued (for tests).
+JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'database')
+JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 5))
+# Seconds before the first retry, doubling per attempt up to the max.
+JOBS_RETRY_BACKOFF = float(os.environ.get('JOBS_RETRY_BACKOFF', 10))
+JOBS_RETRY_BACKOFF_MAX = float(os.environ.get('JOBS_RETRY_BACKOFF_MAX', 3600))
+# Seconds after which a running job is assumed lost and queued again.
+JOBS_TIMEOUT = int(os.environ.get('JOBS_TIMEOUT', 600))
+JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 4))
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1))
+
+# Rate limits checked by core.middleware.ThrottleMiddleware, by view name
+# and scope: 'ip' has a bucket per client address, 'user' one per valid
+# API token (other requests use the address's). Rates are requests/period,
+# with period s, m, h or d; an empty rate turns that limit off.
+THROTTLE_RATES = {
+    'user:token': {'ip': os.environ.get('THROTTLE_TOKEN_RATE', '10/m')},
+    'user:create': {'ip': os.environ.get('THROTTLE_CREATE_USER_RATE', '5/m')},
+    'recipe:recipe-list': {
+        'user': os.environ.get('THROTTLE_RECIPE_LIST_RATE', '600/m'),
+    },
 }
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'default')
+# Proxies in front of the app appending to X-Forwarded-For; with 0 the
+# client address is REMOTE_ADDR.
+THROTTLE_NUM_PROXIES = int(os.environ.get('THROTTLE_NUM_PROXIES', 0))
+
+# Per-user cache of rendered recipe list and detail responses. Writes
+# through the API invalidate it; other writes show up after the timeout.
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
@@ -13,17 +13,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 from django.contrib import admin
 from django.urls import path, include
 
+from core.schema import SchemaView
+from core.views import metrics
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/schema/', SchemaView.as_view(), name='api-schema'),
+    path('metrics', metrics, name='metrics'),
     path(
         'api/docs/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
@@ -45,3 +45,14 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Define the admin page for background jobs."""
+    ordering = ['-id']
+    list_display = ['id', 'name', 'status', 'attempts', 'run_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['created_at', 'locked_at', 'locked_by', 'last_error']
+
+
+admin.site.register(models.Job, JobAdmin)
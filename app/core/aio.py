@@ -0,0 +1,50 @@
+"""
+Async access to the ORM and cache, with fallbacks for older Django.
+
+Django 4.1+ querysets and 4.0+ caches have native async methods; on
+older versions the sync call runs through sync_to_async. In-process
+caches are called directly, as they never block on I/O.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+IN_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+async def aget(queryset, *args, **kwargs):
+    """Return queryset.get(*args, **kwargs)."""
+    if hasattr(queryset, 'aget'):
+        return await queryset.aget(*args, **kwargs)
+    return await sync_to_async(queryset.get)(*args, **kwargs)
+
+
+async def alist(queryset):
+    """Return the rows of queryset as a list."""
+    if hasattr(queryset, '__aiter__'):
+        return [row async for row in queryset]
+    return await sync_to_async(list)(queryset)
+
+
+async def aaggregate(queryset, **kwargs):
+    """Return queryset.aggregate(**kwargs)."""
+    if hasattr(queryset, 'aaggregate'):
+        return await queryset.aaggregate(**kwargs)
+    return await sync_to_async(queryset.aggregate)(**kwargs)
+
+
+async def acreate(manager, **kwargs):
+    """Return manager.create(**kwargs)."""
+    if hasattr(manager, 'acreate'):
+        return await manager.acreate(**kwargs)
+    return await sync_to_async(manager.create)(**kwargs)
+
+
+async def acache_call(cache, method, *args):
+    """Call cache.<method>(*args), without blocking the event loop."""
+    if isinstance(cache, IN_PROCESS_CACHES):
+        return getattr(cache, method)(*args)
+    if hasattr(cache, 'a' + method):
+        return await getattr(cache, 'a' + method)(*args)
+    return await sync_to_async(getattr(cache, method))(*args)
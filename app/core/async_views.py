@@ -0,0 +1,136 @@
+"""
+Base class for async-native API views.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+
+from rest_framework import exceptions
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.authentication import CachedTokenAuthentication
+
+
+class AsyncAPIView:
+    """An API endpoint whose hot paths run on the event loop.
+
+    Coroutine handlers named after HTTP methods (``get``, ``post``...)
+    get an authenticated DRF Request and return a Response, reaching
+    the database through core.aio. Other methods are passed to
+    `sync_view`, the DRF view of the same URL, in a worker thread.
+
+    Only authenticated JSON requests are handled, like the DRF views
+    these stand in for, rendered by the configured JSON renderers.
+    """
+    authentication_class = CachedTokenAuthentication
+    renderer_classes = [
+        renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if issubclass(renderer, JSONRenderer)
+    ]
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    sync_view = None
+
+    @classmethod
+    def as_view(cls):
+        """Return the async view function for urlpatterns."""
+        async def view(request, *args, **kwargs):
+            return await cls().dispatch(request, *args, **kwargs)
+
+        # Token authentication only, so there is no session to protect.
+        view.csrf_exempt = True
+        view.view_class = cls
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if handler is None:
+            return await sync_to_async(self.sync_view)(
+                request, *args, **kwargs
+            )
+
+        self.args = args
+        self.kwargs = kwargs
+        self.request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            negotiator=DefaultContentNegotiation(),
+        )
+        try:
+            self.perform_content_negotiation(self.request)
+            await self.perform_authentication(self.request)
+            response = await handler(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        return self.finalize_response(response)
+
+    def perform_content_negotiation(self, request):
+        renderers = [renderer() for renderer in self.renderer_classes]
+        renderer, media_type = request.negotiator.select_renderer(
+            request, renderers
+        )
+        request.accepted_renderer = renderer
+        request.accepted_media_type = media_type
+
+    async def perform_authentication(self, request):
+        """Authenticate request, raising NotAuthenticated for anonymous."""
+        if request.authenticators:
+            # APIClient.force_authenticate(), which DRF's Request honours
+            # by swapping in a ForcedAuthentication authenticator.
+            result = request.authenticators[0].authenticate(request)
+        else:
+            result = await self.authentication_class().aauthenticate(request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+
+        request.user, request.auth = result
+
+    def handle_exception(self, exc):
+        """Return the DRF error response for exc, as APIView does."""
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            authenticator = self.authentication_class()
+            exc.auth_header = authenticator.authenticate_header(self.request)
+
+        context = {'view': self, 'args': self.args,
+                   'kwargs': self.kwargs, 'request': self.request}
+        response = api_settings.EXCEPTION_HANDLER(exc, context)
+        if response is None:
+            raise exc
+
+        return response
+
+    def finalize_response(self, response):
+        """Render a DRF Response into a plain HttpResponse.
+
+        Returning an unrendered Response would make Django render it in
+        a worker thread, so it is rendered here on the event loop.
+        """
+        if not isinstance(response, Response):
+            return response
+
+        if not hasattr(self.request, 'accepted_renderer'):
+            # Content negotiation itself failed.
+            self.request.accepted_renderer = self.renderer_classes[0]()
+            self.request.accepted_media_type = \
+                self.request.accepted_renderer.media_type
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = {
+            'view': self,
+            'args': self.args,
+            'kwargs': self.kwargs,
+            'request': self.request,
+            'response': response,
+        }
+        response.render()
+
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        # Kept for callers that inspect the data, as on a DRF Response.
+        rendered.data = response.data
+        return rendered
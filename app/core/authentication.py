@@ -0,0 +1,154 @@
+"""
+Authentication classes for the API.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from core import metrics
+from core.aio import acache_call
+
+
+def token_cache_key(key):
+    """Return the cache key holding the token with the given key."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return 'auth:token:%s' % digest
+
+
+def token_generation_key(key):
+    """Return the cache key holding the generation of a cached token.
+
+    A token is cached along with the generation read before it was
+    fetched, and only used while that generation is current. So a
+    lookup racing with an invalidation can not cache a stale user.
+    """
+    return token_cache_key(key) + ':generation'
+
+
+def get_token_cache():
+    """Return the cache backend used for token lookups."""
+    return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+
+
+def invalidate_tokens(*keys):
+    """Drop the cached lookups for the given token keys.
+
+    They start a new generation, so lookups already underway do not
+    cache what they read either.
+    """
+    generation = time.time_ns()
+    get_token_cache().set_many(
+        {token_generation_key(key): generation for key in keys}, None,
+    )
+
+
+def get_current_token(values, key):
+    """Return the token cached in values by get_many(), if still valid."""
+    entry = values.get(token_cache_key(key))
+    if entry is None or entry[0] != values.get(token_generation_key(key)):
+        return None
+
+    token = entry[1]
+    return token if token.user.is_active else None
+
+
+def get_cache_stats():
+    """Return the token cache hit and miss counts."""
+    counters = metrics.get_counters()
+    return {
+        'hits': counters.get('auth.token_cache.hit', 0),
+        'misses': counters.get('auth.token_cache.miss', 0),
+    }
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token and user lookup.
+
+    aauthenticate() is the same check for async views: cache hits are
+    answered on the event loop and only misses reach the database.
+    """
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        return self.authenticate_credentials(key)
+
+    async def aauthenticate(self, request):
+        """Async authenticate()."""
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        values = await acache_call(
+            get_token_cache(), 'get_many',
+            [token_cache_key(key), token_generation_key(key)],
+        )
+        token = get_current_token(values, key)
+        if token is not None:
+            metrics.incr('auth.token_cache.hit')
+            return (token.user, token)
+
+        return await sync_to_async(self.fetch_credentials)(key)
+
+    def get_key(self, request):
+        """Return the token key of the Authorization header, if any."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _('Invalid token header. '
+                    'Token string should not contain spaces.')
+            raise AuthenticationFailed(msg)
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. '
+                    'Token string should not contain invalid characters.')
+            raise AuthenticationFailed(msg)
+
+    def authenticate_credentials(self, key):
+        values = get_token_cache().get_many(
+            [token_cache_key(key), token_generation_key(key)],
+        )
+        token = get_current_token(values, key)
+        if token is not None:
+            metrics.incr('auth.token_cache.hit')
+            return (token.user, token)
+
+        return self.fetch_credentials(key)
+
+    def fetch_credentials(self, key):
+        """Look the token up in the database and cache it."""
+        metrics.incr('auth.token_cache.miss')
+        cache = get_token_cache()
+        generation_key = token_generation_key(key)
+        generation = cache.get(generation_key)
+        if generation is None:
+            cache.add(generation_key, time.time_ns(), None)
+            generation = cache.get(generation_key)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(
+            token_cache_key(key),
+            (generation, token),
+            settings.TOKEN_AUTH_CACHE_TIMEOUT,
+        )
+
+        return (user, token)
@@ -0,0 +1,167 @@
+"""
+Versioned per-owner caching with single-flight recomputation.
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import metrics
+from core.aio import acache_call
+
+
+class VersionedCache:
+    """Cache values per owner under a version that writes bump.
+
+    Every key embeds the owner's current version, so invalidating all of
+    an owner's entries is a single increment and never needs a key scan;
+    entries of old versions simply expire.
+    """
+    # How long a recomputation may hold the lock, and how long other
+    # requests wait for it before computing the value themselves.
+    lock_timeout = 10
+    wait_timeout = 2
+    wait_interval = 0.05
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    @property
+    def cache(self):
+        return caches[settings.RESPONSE_CACHE_ALIAS]
+
+    def get_version(self, owner):
+        """Return the current version of owner's entries."""
+        key = '%s:version:%s' % (self.namespace, owner)
+        version = self.cache.get(key)
+        if version is None:
+            # Start from the clock so an evicted version never reuses
+            # the number of entries that may still be cached.
+            self.cache.add(key, time.time_ns(), None)
+            version = self.cache.get(key)
+
+        return version
+
+    def bump(self, owner):
+        """Invalidate every entry of owner."""
+        key = '%s:version:%s' % (self.namespace, owner)
+        metrics.incr('%s.bump' % self.namespace)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.get_version(owner)
+
+    def make_key(self, owner, *parts):
+        """Return the key of an entry of owner identified by parts."""
+        version = self.get_version(owner)
+        return ':'.join(
+            [self.namespace, str(owner), str(version)] +
+            [str(part) for part in parts]
+        )
+
+    def get_or_compute(self, key, compute):
+        """Return the value at key, computing it at most once at a time.
+
+        compute() may return None for values that must not be cached.
+        When another request is already computing the value, wait for it
+        up to wait_timeout before computing it here as well.
+        """
+        value = self.cache.get(key)
+        if value is not None:
+            metrics.incr('%s.hit' % self.namespace)
+            return value
+
+        lock_key = key + ':lock'
+        locked = self.cache.add(lock_key, 1, self.lock_timeout)
+        if not locked:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.wait_interval)
+                value = self.cache.get(key)
+                if value is not None:
+                    metrics.incr('%s.wait_hit' % self.namespace)
+                    return value
+            metrics.incr('%s.wait_timeout' % self.namespace)
+
+        metrics.incr('%s.miss' % self.namespace)
+        try:
+            value = compute()
+            if value is not None:
+                self.cache.set(key, value, settings.RESPONSE_CACHE_TIMEOUT)
+        finally:
+            if locked:
+                self.cache.delete(lock_key)
+
+        return value
+
+    async def aget_version(self, owner):
+        """Async get_version()."""
+        key = '%s:version:%s' % (self.namespace, owner)
+        version = await acache_call(self.cache, 'get', key)
+        if version is None:
+            await acache_call(self.cache, 'add', key, time.time_ns(), None)
+            version = await acache_call(self.cache, 'get', key)
+
+        return version
+
+    async def abump(self, owner):
+        """Async bump()."""
+        key = '%s:version:%s' % (self.namespace, owner)
+        metrics.incr('%s.bump' % self.namespace)
+        try:
+            await acache_call(self.cache, 'incr', key)
+        except ValueError:
+            await self.aget_version(owner)
+
+    async def amake_key(self, owner, *parts):
+        """Async make_key()."""
+        version = await self.aget_version(owner)
+        return ':'.join(
+            [self.namespace, str(owner), str(version)] +
+            [str(part) for part in parts]
+        )
+
+    async def aget_or_compute(self, key, compute):
+        """Async get_or_compute(); compute is a coroutine function."""
+        value = await acache_call(self.cache, 'get', key)
+        if value is not None:
+            metrics.incr('%s.hit' % self.namespace)
+            return value
+
+        lock_key = key + ':lock'
+        locked = await acache_call(
+            self.cache, 'add', lock_key, 1, self.lock_timeout
+        )
+        if not locked:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.wait_interval)
+                value = await acache_call(self.cache, 'get', key)
+                if value is not None:
+                    metrics.incr('%s.wait_hit' % self.namespace)
+                    return value
+            metrics.incr('%s.wait_timeout' % self.namespace)
+
+        metrics.incr('%s.miss' % self.namespace)
+        try:
+            value = await compute()
+            if value is not None:
+                await acache_call(
+                    self.cache, 'set', key, value,
+                    settings.RESPONSE_CACHE_TIMEOUT,
+                )
+        finally:
+            if locked:
+                await acache_call(self.cache, 'delete', lock_key)
+
+        return value
+
+    def get_stats(self):
+        """Return the counters of this cache."""
+        prefix = self.namespace + '.'
+        return {
+            name[len(prefix):]: value
+            for name, value in metrics.get_counters().items()
+            if name.startswith(prefix)
+        }
@@ -0,0 +1,143 @@
+"""
+Response body encoders for core.middleware.CompressionMiddleware.
+
+gzip is always available; br and zstd need the brotli and zstandard
+packages and are skipped without them.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCompressor:
+    """Incremental gzip, with a zero mtime so output is reproducible."""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Return the output so far, decodable by the client as is."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    """Incremental brotli."""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    """Incremental zstd."""
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {
+    'gzip': GzipCompressor,
+    'br': BrotliCompressor if brotli else None,
+    'zstd': ZstdCompressor if zstandard else None,
+}
+
+
+def get_available_encodings(encodings):
+    """Return the encodings of the list that can be used here."""
+    return [
+        encoding for encoding in encodings
+        if COMPRESSORS.get(encoding) is not None
+    ]
+
+
+def parse_accept_encoding(header):
+    """Return {coding: quality} for an Accept-Encoding header."""
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+
+    return qualities
+
+
+def select_encoding(header, encodings):
+    """Return the first of encodings the client accepts, or None.
+
+    `encodings` is in server preference order; the client's q-values
+    only rule encodings out (q=0), as most clients send them all at 1.
+    """
+    qualities = parse_accept_encoding(header)
+    for encoding in get_available_encodings(encodings):
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > 0:
+            return encoding
+
+    return None
+
+
+def compress(encoding, level, data):
+    """Return data compressed with encoding in one go."""
+    compressor = COMPRESSORS[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_sequence(encoding, level, chunks, flush_size):
+    """Compress an iterable of bytes chunk by chunk.
+
+    Output is yielded as the compressor produces it, and flushed every
+    `flush_size` bytes of input so a slow stream still reaches the
+    client progressively without flushing (and losing ratio) per chunk.
+    """
+    compressor = COMPRESSORS[encoding](level)
+    pending = 0
+    for chunk in chunks:
+        output = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            output += compressor.flush()
+            pending = 0
+        if output:
+            yield output
+
+    yield compressor.finish()
@@ -0,0 +1,79 @@
+"""
+PostgreSQL backend drawing its connections from core.db.pool.
+"""
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.backends.postgresql_pool.creation import DatabaseCreation
+from core.db.pool import get_pool
+
+
+def reset_connection(connection):
+    """Reset a released connection to a fresh session; False if unusable.
+
+    Open transactions are rolled back, then DISCARD ALL drops what the
+    session kept: SET parameters, open cursors, temporary tables,
+    prepared statements, advisory locks and LISTENs. Django sets the
+    time zone again when the connection is handed out.
+    """
+    if connection.closed:
+        return False
+
+    status = connection.info.transaction_status
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    try:
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        # DISCARD ALL can not run inside a transaction block.
+        autocommit = connection.autocommit
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute('DISCARD ALL')
+        connection.autocommit = autocommit
+    except base.Database.Error:
+        return False
+
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connections kept open in a per-process pool.
+
+    Closing the connection (Django does at the end of each request with
+    CONN_MAX_AGE 0) returns it to the pool. The pool is configured by
+    the POOL dict of the database settings.
+    """
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        """Return the pool of connections opened with conn_params."""
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(
+            (self.alias, repr(sorted(conn_params.items()))),
+            max_size=options.get('MAX_SIZE', 10),
+            max_uses=options.get('MAX_USES', 1000),
+            max_lifetime=options.get('MAX_LIFETIME', 1800),
+            timeout=options.get('TIMEOUT', 5),
+            health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30),
+            reset=reset_connection,
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.get(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        # The parent records the isolation level only for new connections.
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
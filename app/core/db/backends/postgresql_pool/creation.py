@@ -0,0 +1,14 @@
+"""
+Test database creation for the pooled PostgreSQL backend.
+"""
+from django.db.backends.postgresql import creation
+
+from core.db.pool import drain_all
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # PostgreSQL refuses to drop a database with open sessions.
+        drain_all()
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,37 @@
+"""
+The one definition of a healthy database connection.
+
+Both the connection pool (before reusing an idle connection) and the
+wait_for_db command use these checks.
+"""
+from django.db import connections
+from django.db.utils import OperationalError
+
+
+HEALTH_CHECK_SQL = 'SELECT 1'
+
+
+def ping(raw_connection):
+    """Return whether a DB-API connection answers HEALTH_CHECK_SQL."""
+    try:
+        cursor = raw_connection.cursor()
+        try:
+            cursor.execute(HEALTH_CHECK_SQL)
+            cursor.fetchone()
+        finally:
+            cursor.close()
+    except Exception:
+        # Any DB-API error (closed socket, server restart, aborted
+        # transaction) means the connection can not be used.
+        return False
+
+    return True
+
+
+def check_database(alias='default'):
+    """Raise OperationalError unless alias accepts connections and queries."""
+    connection = connections[alias]
+    connection.ensure_connection()
+    if not ping(connection.connection):
+        connection.close()
+        raise OperationalError('Database %r failed its health check.' % alias)
@@ -0,0 +1,28 @@
+"""
+Migration operations that only touch PostgreSQL databases.
+
+The model state is always updated, so migrations stay consistent on
+other backends (e.g. SQLite for local test runs), but the schema change
+itself is skipped there.
+"""
+from django.db import migrations
+
+
+class PostgreSQLOnlyMixin:
+    """Skip the database side of an operation on non-PostgreSQL backends."""
+
+    def database_forwards(self, app_label, schema_editor, *args):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, *args)
+
+    def database_backwards(self, app_label, schema_editor, *args):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, *args)
+
+
+class AddIndex(PostgreSQLOnlyMixin, migrations.AddIndex):
+    """AddIndex for PostgreSQL specific indexes such as GinIndex."""
+
+
+class RunSQL(PostgreSQLOnlyMixin, migrations.RunSQL):
+    """RunSQL for PostgreSQL specific SQL such as triggers."""
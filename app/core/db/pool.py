@@ -0,0 +1,189 @@
+"""
+In-process database connection pool.
+
+Django closes its connection at the end of every request when
+CONN_MAX_AGE is 0; a pooled backend hands the connection back here
+instead, so the next request skips the connect and authentication round
+trips. The pool caps how many connections a worker process opens and
+recycles them after a number of uses or seconds, so server-side memory
+held by long-lived sessions is released.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+from core import metrics
+from core.db.health import ping
+
+_lock = threading.Lock()
+_pools = {}
+
+
+class _Entry:
+    """A pooled connection and its bookkeeping."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.uses = 0
+
+
+class ConnectionPool:
+    """A bounded pool of DB-API connections.
+
+    `max_size` connections at most are open at once; get() waits up to
+    `timeout` seconds for one. Idle connections are checked with the
+    shared health check when unused for `health_check_interval`
+    seconds, and closed after `max_uses` checkouts or `max_lifetime`
+    seconds. `reset(connection)` is called on release and returns
+    whether the connection can be reused.
+    """
+
+    def __init__(self, max_size=10, max_uses=1000, max_lifetime=1800,
+                 timeout=5, health_check_interval=30, reset=None):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.reset = reset or (lambda connection: True)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = deque()
+        self._in_use = {}
+
+    def get(self, connect):
+        """Return a healthy connection, opening one with connect()."""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            metrics.incr('db_pool.timeout')
+            raise OperationalError(
+                'No database connection available within %ss.' % self.timeout
+            )
+        metrics.incr('db_pool.checkout')
+        metrics.incr('db_pool.wait_ms', (time.monotonic() - start) * 1000)
+
+        try:
+            entry = self._get_idle()
+            if entry is None:
+                entry = _Entry(connect())
+                metrics.incr('db_pool.opened')
+        except BaseException:
+            self._slots.release()
+            raise
+
+        entry.uses += 1
+        with self._lock:
+            self._in_use[id(entry.connection)] = entry
+        return entry.connection
+
+    def put(self, connection):
+        """Give back a connection returned by get()."""
+        with self._lock:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            self._discard(connection, 'db_pool.closed')
+            return
+
+        try:
+            if not self.reset(connection):
+                self._discard(connection, 'db_pool.broken')
+            elif self._is_expired(entry):
+                self._discard(connection, 'db_pool.recycled')
+            else:
+                entry.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(entry)
+        finally:
+            self._slots.release()
+
+    def drain(self):
+        """Close every idle connection."""
+        with self._lock:
+            entries = list(self._idle)
+            self._idle.clear()
+        for entry in entries:
+            self._discard(entry.connection, 'db_pool.closed')
+
+    def stats(self):
+        """Return the number of idle and checked out connections."""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+            }
+
+    def _get_idle(self):
+        """Pop the most recently used healthy idle connection, if any."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                entry = self._idle.pop()
+
+            if self._is_expired(entry):
+                self._discard(entry.connection, 'db_pool.recycled')
+                continue
+
+            idle_for = time.monotonic() - entry.last_used
+            if idle_for >= self.health_check_interval and \
+                    not ping(entry.connection):
+                self._discard(entry.connection, 'db_pool.broken')
+                continue
+
+            return entry
+
+    def _is_expired(self, entry):
+        return (
+            entry.uses >= self.max_uses or
+            time.monotonic() - entry.created >= self.max_lifetime
+        )
+
+    def _discard(self, connection, reason):
+        metrics.incr(reason)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def get_pool(key, **options):
+    """Return the pool for key in this process, creating it if needed.
+
+    Pools are per process: a forked child must not share the parent's
+    sockets, so it starts with empty pools.
+    """
+    key = (os.getpid(), key)
+    with _lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+def drain_all():
+    """Close the idle connections of every pool of this process."""
+    pid = os.getpid()
+    with _lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == pid]
+    for pool in pools:
+        pool.drain()
+
+
+def get_stats():
+    """Return the pool metrics and the size of every pool."""
+    pid = os.getpid()
+    with _lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == pid]
+    stats = {
+        name[len('db_pool.'):]: value
+        for name, value in metrics.get_counters().items()
+        if name.startswith('db_pool.')
+    }
+    stats['pools'] = [pool.stats() for pool in pools]
+
+    return stats
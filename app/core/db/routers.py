@@ -0,0 +1,87 @@
+"""
+Routing of reads to replicas with read-your-writes stickiness.
+
+Reads go to a replica only inside replica_reads(), which views wrap
+around requests that tolerate replication lag. A user who wrote
+within REPLICA_STICKY_SECONDS keeps reading from the primary, so they
+always see their own changes; record_write() starts that window.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import metrics
+from core.aio import acache_call
+
+_reads = ContextVar('replica_reads', default=None)
+
+
+def _sticky_key(user_pk):
+    return 'db:recent_write:%s' % user_pk
+
+
+def _get_sticky_cache():
+    return caches[settings.REPLICA_STICKY_CACHE_ALIAS]
+
+
+def record_write(user_pk):
+    """Keep user_pk reading from the primary for the sticky window."""
+    _get_sticky_cache().set(
+        _sticky_key(user_pk), True, settings.REPLICA_STICKY_SECONDS
+    )
+
+
+async def arecord_write(user_pk):
+    """Async record_write()."""
+    await acache_call(
+        _get_sticky_cache(), 'set',
+        _sticky_key(user_pk), True, settings.REPLICA_STICKY_SECONDS,
+    )
+
+
+@contextmanager
+def replica_reads(user_pk):
+    """Allow reads made for user_pk in the block to use a replica."""
+    token = _reads.set({'user': user_pk})
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads inside replica_reads() to a replica, the rest to default.
+
+    The replica is picked once per block, so all queries of a request
+    see the same snapshot.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _reads.get()
+        if state is None or not settings.DATABASE_REPLICAS:
+            return None
+
+        if 'alias' not in state:
+            if _get_sticky_cache().get(_sticky_key(state['user'])):
+                state['alias'] = None
+                metrics.incr('db_router.sticky')
+            else:
+                state['alias'] = random.choice(settings.DATABASE_REPLICAS)
+                metrics.incr('db_router.replica')
+
+        return state['alias']
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
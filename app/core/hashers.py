@@ -0,0 +1,40 @@
+"""
+Password hashers with work factors taken from settings.
+
+Changing a work factor makes Django re-hash a user's password on their
+next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PASSWORD_PBKDF2_ITERATIONS iterations."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with the PASSWORD_ARGON2_* costs (needs argon2-cffi)."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """BCrypt-SHA256 with PASSWORD_BCRYPT_ROUNDS rounds (needs bcrypt)."""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
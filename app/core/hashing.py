@@ -0,0 +1,149 @@
+"""
+Bounded worker pool for password hashing.
+
+Hashing is deliberately slow CPU work. Running it in a small pool caps
+how many cores a burst of signups or logins can take, so the rest of the
+API keeps its share. The pool is opt-in with PASSWORD_HASHING_POOL and
+only used by the user API (signup, token, password change); otherwise,
+and everywhere else (admin, management commands), hashes run in the
+calling thread. The request thread waits for its hash, so the slots
+(PASSWORD_HASHING_WORKERS + PASSWORD_HASHING_MAX_PENDING) must stay
+below the threads of a server process; requests that can not get a slot
+within PASSWORD_HASHING_TIMEOUT fail fast with 503 rather than holding
+threads the other endpoints need.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core import metrics
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class PasswordHashingBusy(APIException):
+    """Raised when the password hashing pool is saturated."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many password operations, retry later.')
+    default_code = 'password_hashing_busy'
+
+
+def _get_pool():
+    """Return the executor and the semaphore bounding its queue."""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASHING_WORKERS
+            if settings.PASSWORD_HASHING_EXECUTOR == 'process':
+                _executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix='password-hashing',
+                )
+            _slots = threading.BoundedSemaphore(
+                workers + settings.PASSWORD_HASHING_MAX_PENDING
+            )
+
+    return _executor, _slots
+
+
+def _check(password, encoded):
+    """Return whether password matches encoded and if it needs re-hashing."""
+    must_update = []
+    is_correct = hashers.check_password(password, encoded, must_update.append)
+    return is_correct, bool(must_update)
+
+
+def run(func, *args):
+    """Run func(*args) in the hashing pool and return its result."""
+    if not settings.PASSWORD_HASHING_POOL:
+        return func(*args)
+
+    executor, slots = _get_pool()
+    start = time.monotonic()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+        metrics.incr('password_hashing.rejected')
+        raise PasswordHashingBusy()
+
+    metrics.incr('password_hashing.calls')
+    metrics.incr('password_hashing.wait_ms', (time.monotonic() - start) * 1000)
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+async def arun(func, *args):
+    """Await func(*args) in the hashing pool without blocking the loop."""
+    if not settings.PASSWORD_HASHING_POOL:
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+
+    executor, slots = _get_pool()
+    start = time.monotonic()
+    deadline = start + settings.PASSWORD_HASHING_TIMEOUT
+    while not slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            metrics.incr('password_hashing.rejected')
+            raise PasswordHashingBusy()
+        await asyncio.sleep(0.01)
+
+    metrics.incr('password_hashing.calls')
+    metrics.incr('password_hashing.wait_ms', (time.monotonic() - start) * 1000)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, *args)
+    finally:
+        slots.release()
+
+
+def make_password(password):
+    """Hash password in the pool."""
+    if password is None:
+        return hashers.make_password(None)
+    return run(hashers.make_password, password)
+
+
+def check_password(password, encoded):
+    """Return (is_correct, must_update) for password, checked in the pool."""
+    return run(_check, password, encoded)
+
+
+async def amake_password(password):
+    """Async make_password()."""
+    if password is None:
+        return hashers.make_password(None)
+    return await arun(hashers.make_password, password)
+
+
+async def acheck_password(password, encoded):
+    """Async check_password()."""
+    return await arun(_check, password, encoded)
+
+
+def set_user_password(user, raw_password):
+    """user.set_password(), hashing in the pool."""
+    user.password = make_password(raw_password)
+    user._password = raw_password
+
+
+def check_user_password(user, raw_password):
+    """user.check_password() in the pool, upgrading stale hashes."""
+    is_correct, must_update = check_password(raw_password, user.password)
+    if is_correct and must_update:
+        set_user_password(user, raw_password)
+        user._password = None
+        user.save(update_fields=['password'])
+
+    return is_correct
@@ -0,0 +1,132 @@
+"""
+Per-request timing of database, serializer and rendering work.
+
+core.middleware.InstrumentationMiddleware samples a share of requests
+(INSTRUMENTATION_SAMPLE_RATE). For those it records the database time
+and query count, and the time spent in the blocks wrapped in timed().
+It reports them in a Server-Timing header and adds them to per-view
+histograms in core.metrics. Requests that are not sampled only pay a
+context variable lookup per query and timed() block.
+
+Phases may overlap: serializer time includes the queries a serializer
+makes.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core import metrics
+
+PHASES = ['db', 'serialize', 'render']
+
+# Buckets for the number of queries of a request.
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """The time spent in each phase of one request, in seconds."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.active = set()
+
+    def get_total(self):
+        return time.perf_counter() - self.start
+
+    def observe(self, view, total):
+        """Add the timings to the histograms of view."""
+        metrics.observe('http_request_duration_seconds', total, view=view)
+        metrics.observe(
+            'http_request_db_queries',
+            self.queries,
+            buckets=QUERY_BUCKETS,
+            view=view,
+        )
+        for phase, duration in self.durations.items():
+            metrics.observe(
+                'http_request_%s_seconds' % phase, duration, view=view,
+            )
+
+    def get_server_timing(self, total):
+        """Return the Server-Timing header value of the timings."""
+        entries = [
+            '%s;dur=%.2f' % (phase, duration * 1000)
+            for phase, duration in self.durations.items()
+        ]
+        entries[0] += ';desc="%d queries"' % self.queries
+        entries.append('total;dur=%.2f' % (total * 1000))
+
+        return ', '.join(entries)
+
+
+def start_request(sampled):
+    """Start recording the current request if sampled; return timings."""
+    timings = RequestTimings() if sampled else None
+    _timings.set(timings)
+    return timings
+
+
+def finish_request():
+    """Stop recording and return the timings of the request, if any."""
+    timings = _timings.get()
+    _timings.set(None)
+    return timings
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to phase of the sampled request.
+
+    Nested blocks of the same phase are counted once.
+    """
+    timings = _timings.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+
+    timings.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[phase] += time.perf_counter() - start
+        timings.active.discard(phase)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Count the query and its time for the sampled request."""
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    timings.queries += 1
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    """Time the queries of every database connection."""
+    if execute_wrapper not in connection.execute_wrappers:
+        # First, as connection.execute_wrapper() pops the last one.
+        connection.execute_wrappers.insert(0, execute_wrapper)
+
+
+class TimedSerializerMixin:
+    """Serializer mixin timing validation and output as `serialize`."""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+    def is_valid(self, raise_exception=False):
+        with timed('serialize'):
+            return super().is_valid(raise_exception=raise_exception)
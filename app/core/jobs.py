@@ -0,0 +1,279 @@
+"""
+Background jobs backed by a database queue.
+
+Functions decorated with @job are run by `manage.py run_worker` when
+enqueued with `func.delay(*args, **kwargs)`. Arguments are stored as
+JSON. With the database backend, enqueueing inside a transaction only
+queues the job if the transaction commits. Workers claim due jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can share the
+queue (backends without SKIP LOCKED, such as SQLite, claim jobs one
+update at a time instead). Failed jobs are retried with exponential
+backoff until they run out of attempts; finished jobs are deleted.
+
+The immediate backend (JOBS_BACKEND = 'immediate') runs jobs in the
+calling thread as they are enqueued and lets their exceptions
+propagate, which suits tests.
+"""
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+from core.models import Job
+
+_registry = {}
+
+
+class UnknownJob(Exception):
+    """The queued job names no @job function."""
+
+
+def job(func=None, max_attempts=None):
+    """Register func as a job and give it a delay() method."""
+    def register(func):
+        name = '%s.%s' % (func.__module__, func.__qualname__)
+        _registry[name] = func
+        func.job_name = name
+        func.max_attempts = max_attempts
+
+        def delay(*args, **kwargs):
+            return enqueue(func, args, kwargs)
+
+        func.delay = delay
+        return func
+
+    return register if func is None else register(func)
+
+
+def get_job(name):
+    """Return the job function called name, importing its module."""
+    if name not in _registry:
+        try:
+            import_module(name.rpartition('.')[0])
+        except (ImportError, ValueError):
+            pass
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownJob(name)
+
+
+def enqueue(func, args=(), kwargs=None, run_at=None):
+    """Queue a call of the job func; return its Job, None if run."""
+    kwargs = kwargs or {}
+    metrics.incr('jobs.enqueued')
+    if settings.JOBS_BACKEND == 'immediate':
+        # Round trip the arguments so they behave as when queued.
+        args, kwargs = json.loads(
+            json.dumps([list(args), kwargs], cls=DjangoJSONEncoder)
+        )
+        with timed_job(func.job_name):
+            func(*args, **kwargs)
+        metrics.incr('jobs.succeeded')
+        return None
+
+    return Job.objects.create(
+        name=func.job_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=func.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def claim(count, worker):
+    """Mark up to count due jobs as running by worker and return them."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now) \
+        .order_by('run_at', 'id')
+    claimed = {
+        'status': Job.RUNNING,
+        'attempts': F('attempts') + 1,
+        'locked_at': now,
+        'locked_by': worker,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(due.select_for_update(skip_locked=True)[:count])
+            if jobs:
+                Job.objects.filter(id__in=[job.id for job in jobs]) \
+                    .update(**claimed)
+    else:
+        # Take each job only if it is still queued, so workers racing
+        # for it claim it once.
+        jobs = [
+            job for job in due[:count]
+            if Job.objects.filter(id=job.id, status=Job.QUEUED)
+            .update(**claimed)
+        ]
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.attempts += 1
+
+    return jobs
+
+
+def requeue_stale(timeout=None):
+    """Queue again the jobs running for longer than timeout seconds.
+
+    Their worker is assumed to have died, so the attempt counts as
+    failed. Returns the number of jobs queued again or failed.
+    """
+    timeout = settings.JOBS_TIMEOUT if timeout is None else timeout
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout),
+    )
+    error = 'Timed out after %ds.' % timeout
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_at=None, last_error=error,
+    )
+    queued = stale.update(
+        status=Job.QUEUED, locked_at=None, locked_by='', last_error=error,
+    )
+    metrics.incr('jobs.failed', failed)
+    metrics.incr('jobs.retried', queued)
+
+    return failed + queued
+
+
+def run(job):
+    """Run a claimed job, then delete it or schedule its retry."""
+    try:
+        func = get_job(job.name)
+    except UnknownJob:
+        fail(job, 'Unknown job %s.' % job.name, retry=False)
+        return False
+
+    try:
+        with timed_job(job.name):
+            func(*job.args, **job.kwargs)
+    except Exception:
+        fail(job, traceback.format_exc())
+        return False
+
+    Job.objects.filter(id=job.id).delete()
+    metrics.incr('jobs.succeeded')
+    return True
+
+
+def fail(job, error, retry=True):
+    """Record a failed attempt, retrying with backoff while allowed."""
+    if retry and job.attempts < job.max_attempts:
+        delay = get_retry_delay(job.attempts)
+        Job.objects.filter(id=job.id).update(
+            status=Job.QUEUED,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            locked_at=None,
+            locked_by='',
+            last_error=error,
+        )
+        metrics.incr('jobs.retried')
+        return
+
+    Job.objects.filter(id=job.id).update(
+        status=Job.FAILED,
+        locked_at=None,
+        last_error=error,
+    )
+    metrics.incr('jobs.failed')
+
+
+def get_retry_delay(attempts):
+    """Return the seconds to wait after the given failed attempts.
+
+    The delay doubles per attempt up to JOBS_RETRY_BACKOFF_MAX, with up
+    to half of it taken off at random so retries spread out.
+    """
+    delay = min(
+        settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_BACKOFF_MAX,
+    )
+
+    return delay * random.uniform(0.5, 1)
+
+
+@contextmanager
+def timed_job(name):
+    """Record the duration and outcome of a job run in a histogram."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        metrics.observe(
+            'job_duration_seconds',
+            time.perf_counter() - start,
+            job=name,
+            outcome=outcome,
+        )
+
+
+class Worker:
+    """Claims queued jobs and runs them on a pool of threads.
+
+    A thread's database connection is released after each job, as at
+    the end of a request. Jobs left running by a dead worker are queued
+    again once they are JOBS_TIMEOUT seconds old.
+    """
+
+    def __init__(self, threads=None, poll_interval=None, name=None):
+        self.threads = threads or settings.JOBS_WORKER_THREADS
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.name = name or '%s:%d' % (socket.gethostname(), os.getpid())
+        self.stopping = threading.Event()
+
+    def run(self, burst=False):
+        """Run jobs until stop() is called, or the queue empties if burst.
+
+        Jobs already started are finished before returning.
+        """
+        running = set()
+        with ThreadPoolExecutor(self.threads) as executor:
+            while not self.stopping.is_set():
+                running = {future for future in running if not future.done()}
+                free = self.threads - len(running)
+                jobs = claim(free, self.name) if free else []
+                running.update(
+                    executor.submit(self.run_job, job) for job in jobs
+                )
+                if free and len(jobs) == free:
+                    # More may be due; claim again when a thread is free.
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                    continue
+
+                if not jobs and not running and burst:
+                    break
+                if not jobs:
+                    requeue_stale()
+                    # Idle: release the connection, as between requests.
+                    close_old_connections()
+                if running:
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                else:
+                    self.stopping.wait(self.poll_interval)
+
+    def run_job(self, job):
+        try:
+            return run(job)
+        finally:
+            close_old_connections()
+
+    def stop(self):
+        """Stop claiming jobs."""
+        self.stopping.set()
@@ -0,0 +1,327 @@
+"""
+Django command to load test the API and compare runs across commits.
+"""
+import json
+import re
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import seeding
+from core.models import Recipe
+
+
+PASSWORD = 'bench-password-123'
+EMAIL_PREFIX = 'bench-api-'
+
+Account = namedtuple('Account', ['email', 'key', 'recipe'])
+
+# Each scenario maps an account to (method, path, JSON body, token key).
+SCENARIOS = {
+    'token': lambda account: (
+        'POST',
+        reverse('user:token'),
+        {'email': account.email, 'password': PASSWORD},
+        None,
+    ),
+    'list': lambda account: (
+        'GET', reverse('recipe:recipe-list'), None, account.key,
+    ),
+    'detail': lambda account: (
+        'GET',
+        reverse('recipe:recipe-detail', args=[account.recipe]),
+        None,
+        account.key,
+    ),
+    'create': lambda account: (
+        'POST',
+        reverse('recipe:recipe-list'),
+        {'title': 'Bench recipe', 'time_in_minutes': 10, 'price': '5.00'},
+        account.key,
+    ),
+    'about': lambda account: (
+        'GET', reverse('user:about'), None, account.key,
+    ),
+}
+
+# Lower is better for these; rps is the one metric where higher is.
+LATENCY_METRICS = ['p50', 'p95', 'p99']
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    """Seed users and recipes, then load test the main API endpoints.
+
+    Each scenario sends `--requests` requests from `--concurrency`
+    threads, spread over `--accounts` of the seeded users, either
+    in-process through the test client or to a local server at `--url`.
+    Queries per request come from the Server-Timing header, so a server
+    under `--url` needs INSTRUMENTATION_SAMPLE_RATE=1 to report them.
+
+    The results are written as JSON. With `--baseline`, the run fails
+    when a scenario lost more than `--threshold` of its throughput,
+    gained as much latency, or has a higher error rate or more queries
+    per request.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes-per-user', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--accounts', type=int, default=100)
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            choices=list(SCENARIOS),
+            default=list(SCENARIOS),
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--url',
+            help='Base URL of a local server; in-process if omitted.',
+        )
+        parser.add_argument(
+            '--no-response-cache',
+            action='store_true',
+            help='Bypass the recipe response cache (in-process only).',
+        )
+        parser.add_argument('--output', help='File to write the JSON to.')
+        parser.add_argument('--baseline', help='JSON of an earlier run.')
+        parser.add_argument('--threshold', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        users = self.seed(
+            options['users'],
+            options['recipes_per_user'],
+            options['batch_size'],
+        )
+        accounts = self.get_accounts(users[:options['accounts']])
+
+        if options['url']:
+            results = self.run(accounts, self.send_http, options)
+        else:
+            with self.in_process_settings(options['no_response_cache']):
+                results = self.run(accounts, self.send_in_process, options)
+
+        report = {
+            'code_version': settings.CODE_VERSION,
+            'target': options['url'] or 'in-process',
+            'users': options['users'],
+            'recipes_per_user': options['recipes_per_user'],
+            'concurrency': options['concurrency'],
+            'scenarios': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = self.compare(
+                baseline['scenarios'], results, options['threshold'],
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressions against %s:\n%s' % (
+                        options['baseline'], '\n'.join(regressions),
+                    )
+                )
+
+    def seed(self, users, recipes_per_user, batch_size):
+        """Top up the bench users and their recipes; return the users."""
+        users = seeding.seed(
+            users,
+            recipes_per_user,
+            prefix=EMAIL_PREFIX,
+            password=PASSWORD,
+            batch_size=batch_size,
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE core_user, core_recipe')
+
+        return users
+
+    def get_accounts(self, users):
+        """Return the email, token and a recipe of each user."""
+        accounts = []
+        for user in users:
+            token, _ = Token.objects.get_or_create(user=user)
+            recipe = Recipe.objects.filter(user=user) \
+                .values_list('id', flat=True).first()
+            accounts.append(Account(user.email, token.key, recipe))
+
+        return accounts
+
+    def in_process_settings(self, no_response_cache):
+        """Return the settings requests are served with in-process."""
+        overrides = {
+            'DEBUG': False,
+            'ALLOWED_HOSTS': ['testserver'],
+            # Every response reports its queries in Server-Timing.
+            'INSTRUMENTATION_SAMPLE_RATE': 1,
+            'INSTRUMENTATION_SERVER_TIMING': True,
+            # Every request comes from the same address and token.
+            'THROTTLE_RATES': {},
+        }
+        if no_response_cache:
+            overrides['RESPONSE_CACHE_ALIAS'] = 'bench-dummy'
+            overrides['CACHES'] = dict(settings.CACHES, **{
+                'bench-dummy': {
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+                },
+            })
+
+        return override_settings(**overrides)
+
+    def run(self, accounts, send, options):
+        """Run each scenario and return their summaries by name."""
+        results = {}
+        for name in options['scenarios']:
+            requests = [
+                SCENARIOS[name](accounts[n % len(accounts)])
+                for n in range(options['requests'])
+            ]
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                # Warm up connections and each account's cached token
+                # and responses, so runs compare the steady state.
+                list(executor.map(
+                    lambda request: send(options['url'], *request),
+                    requests[:len(accounts)],
+                ))
+
+                start = time.perf_counter()
+                samples = list(executor.map(
+                    lambda request: self.time_request(
+                        send, options['url'], request,
+                    ),
+                    requests,
+                ))
+                elapsed = time.perf_counter() - start
+
+            results[name] = self.summarize(samples, elapsed)
+            self.stderr.write(
+                '%s: %.1f req/s, p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, '
+                'errors %d' % (
+                    name,
+                    results[name]['rps'],
+                    results[name]['p50'],
+                    results[name]['p95'],
+                    results[name]['p99'],
+                    results[name]['errors'],
+                )
+            )
+
+        return results
+
+    def time_request(self, send, url, request):
+        """Send request; return its status, latency and query count."""
+        start = time.perf_counter()
+        status, server_timing = send(url, *request)
+        latency = time.perf_counter() - start
+
+        match = _QUERIES.search(server_timing or '')
+        return status, latency, int(match.group(1)) if match else None
+
+    def send_in_process(self, url, method, path, data, key):
+        """Serve a request with the test client."""
+        extra = {'HTTP_AUTHORIZATION': 'Token %s' % key} if key else {}
+        res = Client().generic(
+            method,
+            path,
+            json.dumps(data) if data is not None else '',
+            content_type='application/json',
+            **extra
+        )
+        # The test client skips this, leaving worker threads holding
+        # their connections.
+        close_old_connections()
+
+        return res.status_code, res.get('Server-Timing')
+
+    def send_http(self, url, method, path, data, key):
+        """Send a request to the server at url."""
+        headers = {'Content-Type': 'application/json'}
+        if key:
+            headers['Authorization'] = 'Token %s' % key
+        request = urllib.request.Request(
+            url.rstrip('/') + path,
+            data=json.dumps(data).encode() if data is not None else None,
+            headers=headers,
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(request) as res:
+                res.read()
+                return res.status, res.headers.get('Server-Timing')
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get('Server-Timing')
+
+    def summarize(self, samples, elapsed):
+        """Return throughput, latency percentiles (ms) and queries."""
+        latencies = [latency * 1000 for _, latency, _ in samples]
+        percentiles = statistics.quantiles(latencies, n=100)
+        queries = [count for _, _, count in samples if count is not None]
+
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for status, _, _ in samples if status >= 400),
+            'rps': len(samples) / elapsed,
+            'p50': percentiles[49],
+            'p95': percentiles[94],
+            'p99': percentiles[98],
+            'queries': statistics.mean(queries) if queries else None,
+        }
+
+    def compare(self, baseline, results, threshold):
+        """Return a message for each metric that regressed past threshold."""
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+
+            if result['rps'] < base['rps'] * (1 - threshold):
+                regressions.append('%s: rps %.1f -> %.1f' % (
+                    name, base['rps'], result['rps'],
+                ))
+            for metric in LATENCY_METRICS:
+                if result[metric] > base[metric] * (1 + threshold):
+                    regressions.append('%s: %s %.1f ms -> %.1f ms' % (
+                        name, metric, base[metric], result[metric],
+                    ))
+            # Error rates and query counts are deterministic, so any
+            # increase counts. Rates, as runs may differ in --requests.
+            error_rate = result['errors'] / result['requests']
+            base_error_rate = base['errors'] / base['requests']
+            if error_rate > base_error_rate:
+                regressions.append('%s: errors %d/%d -> %d/%d' % (
+                    name, base['errors'], base['requests'],
+                    result['errors'], result['requests'],
+                ))
+            if None not in (result['queries'], base['queries']) and \
+                    result['queries'] > base['queries']:
+                regressions.append('%s: queries %.2f -> %.2f' % (
+                    name, base['queries'], result['queries'],
+                ))
+
+        return regressions
@@ -0,0 +1,174 @@
+"""
+Django command to compare the API under WSGI and ASGI.
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+
+
+PATHS = {
+    'list': lambda recipe: reverse('recipe:recipe-list'),
+    'detail': lambda recipe: reverse('recipe:recipe-detail', args=[recipe]),
+    'about': lambda recipe: reverse('user:about'),
+}
+
+
+class Command(BaseCommand):
+    """Drive one endpoint with many slow clients under WSGI and ASGI.
+
+    Each mode runs in its own process, as the ASGI mode routes to the
+    async views (API_ASYNC_VIEWS=1). A slow client is modelled as
+    `--slow-ms` of holding its connection before the request: a WSGI
+    worker thread is blocked for that time, an ASGI worker is not. WSGI
+    gets `--threads` workers; ASGI serves all `--clients` at once.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['both', 'wsgi', 'asgi'],
+                            default='both')
+        parser.add_argument('--path', choices=list(PATHS), default='list')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--slow-ms', type=float, default=50)
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--email', default='bench-asgi@example.com')
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        if options['mode'] != 'both':
+            result = self.run_mode(options)
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.seed(options['email'], options['recipes'])
+        for mode in ['wsgi', 'asgi']:
+            result = self.run_child(mode, options)
+            self.stdout.write(
+                '%s: %.1f req/s, p50 %.1f ms, p99 %.1f ms, errors %d' % (
+                    mode,
+                    result['rps'],
+                    result['p50'],
+                    result['p99'],
+                    result['errors'],
+                )
+            )
+
+    def run_child(self, mode, options):
+        """Run one mode in a subprocess and return its result."""
+        env = dict(os.environ, API_ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        command = [
+            sys.executable, sys.argv[0], 'bench_asgi',
+            '--mode', mode,
+            '--path', options['path'],
+            '--requests', str(options['requests']),
+            '--clients', str(options['clients']),
+            '--threads', str(options['threads']),
+            '--slow-ms', str(options['slow_ms']),
+            '--recipes', str(options['recipes']),
+            '--email', options['email'],
+        ]
+        output = subprocess.run(
+            command, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+
+        return json.loads(output.strip().splitlines()[-1])
+
+    def seed(self, email, recipes):
+        """Create the bench user, token and recipes; return the token."""
+        user, _ = get_user_model().objects.get_or_create(email=email)
+        token, _ = Token.objects.get_or_create(user=user)
+        existing = Recipe.objects.filter(user=user).count()
+        Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title='Recipe %d' % n,
+                time_in_minutes=n % 120,
+                price='%d.%02d' % (n % 1000, n % 100),
+            )
+            for n in range(existing, recipes)
+        ])
+
+        return token
+
+    # Every request comes from the same address and token.
+    @override_settings(ALLOWED_HOSTS=['testserver'], THROTTLE_RATES={})
+    def run_mode(self, options):
+        """Run the requests of one mode and summarize latencies."""
+        token = self.seed(options['email'], options['recipes'])
+        recipe = Recipe.objects.filter(user=token.user).latest('id').id
+        path = PATHS[options['path']](recipe)
+        slow = options['slow_ms'] / 1000
+
+        start = time.perf_counter()
+        if options['mode'] == 'wsgi':
+            results = self.run_wsgi(path, token.key, slow, options)
+        else:
+            results = asyncio.run(
+                self.run_asgi(path, token.key, slow, options)
+            )
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for _, latency in results)
+        return {
+            'rps': len(results) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'errors': sum(1 for code, _ in results if code != 200),
+        }
+
+    def run_wsgi(self, path, key, slow, options):
+        """Serve every request on a fixed pool of worker threads.
+
+        Up to --clients requests are outstanding at once, like in ASGI
+        mode; the others wait for a client.
+        """
+        client = Client(HTTP_AUTHORIZATION='Token %s' % key)
+        server = ThreadPoolExecutor(max_workers=options['threads'])
+
+        def handle():
+            time.sleep(slow)
+            return client.get(path).status_code
+
+        def request(_):
+            # Latency counts from when a client issues the request, so
+            # waiting for a worker thread is included.
+            issued = time.perf_counter()
+            code = server.submit(handle).result()
+            return code, time.perf_counter() - issued
+
+        with server, ThreadPoolExecutor(
+                max_workers=options['clients']) as clients:
+            return list(clients.map(request, range(options['requests'])))
+
+    async def run_asgi(self, path, key, slow, options):
+        """Serve every request as a task, up to --clients at once."""
+        client = AsyncClient()
+        clients = asyncio.Semaphore(options['clients'])
+
+        async def request():
+            async with clients:
+                issued = time.perf_counter()
+                await asyncio.sleep(slow)
+                # AsyncClient takes extra headers by their HTTP name.
+                res = await client.get(path, authorization='Token %s' % key)
+                return res.status_code, time.perf_counter() - issued
+
+        return await asyncio.gather(*[
+            request() for _ in range(options['requests'])
+        ])
@@ -0,0 +1,92 @@
+"""
+Django command to benchmark response compression.
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from core import compression
+from core.models import Recipe
+from core.renderers import ORJSONRenderer
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Report bytes on the wire and CPU time per encoding and body size."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='Recipe list lengths to compress.',
+        )
+        parser.add_argument(
+            '--levels',
+            type=int,
+            nargs='+',
+            help='Levels to try instead of COMPRESSION_LEVELS.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        bodies = [
+            ('%d recipes' % size, self.get_recipe_list(size))
+            for size in options['sizes']
+        ]
+        schema = Client(HTTP_HOST='localhost').get(reverse('api-schema'))
+        bodies.append(('schema', schema.content))
+        encodings = compression.get_available_encodings(
+            settings.COMPRESSION_ENCODINGS
+        )
+
+        for name, body in bodies:
+            self.stdout.write('%s: %d bytes' % (name, len(body)))
+            for encoding in encodings:
+                levels = options['levels'] or \
+                    [settings.COMPRESSION_LEVELS[encoding]]
+                for level in levels:
+                    self.stdout.write('  %s-%d: %s' % (
+                        encoding, level,
+                        self.run(encoding, level, body, options['repeat']),
+                    ))
+
+    def get_recipe_list(self, size):
+        """Return a rendered recipe list of size recipes."""
+        recipes = [
+            Recipe(
+                id=i,
+                title='Recipe %d' % i,
+                time_in_minutes=i % 120,
+                price=Decimal(i % 10000) / 100,
+                link='https://example.com/%d' % i if i % 2 else '',
+            )
+            for i in range(1, size + 1)
+        ]
+
+        return ORJSONRenderer().render({
+            'next': 'http://localhost/api/recipe?cursor=cD0xMDA%3D',
+            'previous': None,
+            'results': RecipeSerializer(recipes, many=True).data,
+        })
+
+    def run(self, encoding, level, body, repeat):
+        """Summarize the compressed size and best CPU time for body."""
+        timings = []
+        for _ in range(repeat):
+            start = time.process_time()
+            compressed = compression.compress(encoding, level, body)
+            timings.append(time.process_time() - start)
+
+        return '%d bytes (%.1f%%), cpu %.3f ms' % (
+            len(compressed),
+            100 * len(compressed) / len(body),
+            min(timings) * 1000,
+        )
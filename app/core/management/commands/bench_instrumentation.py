@@ -0,0 +1,112 @@
+"""
+Django command to measure the overhead of request instrumentation.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import instrumentation, metrics
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Estimate the instrumentation overhead on the recipe list per rate.
+
+    End to end timings vary by more than the overhead, so the
+    bookkeeping of a sampled and of an unsampled request (middleware,
+    timed blocks and query wrappers) is timed on its own and compared
+    with the CPU time of an uninstrumented list request.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--rates',
+            type=float,
+            nargs='+',
+            default=[0.01, 0.05, 0.1, 1],
+        )
+        parser.add_argument('--recipes', type=int, default=50)
+        parser.add_argument('--email', default='bench-instr@example.com')
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        user, _ = get_user_model().objects.get_or_create(
+            email=options['email'],
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        existing = Recipe.objects.filter(user=user).count()
+        Recipe.objects.bulk_create([
+            Recipe(user=user, title='Recipe %d' % n, price=n % 100)
+            for n in range(existing, options['recipes'])
+        ])
+
+        request_time = self.time_requests(token.key, options['requests'])
+        # The list makes 2 queries and has a serialize and render block.
+        unsampled = self.time_bookkeeping(False, queries=2)
+        sampled = self.time_bookkeeping(True, queries=2)
+        self.stdout.write('request: %.1f us' % (request_time * 1e6))
+        self.stdout.write('bookkeeping: %.2f us unsampled, %.2f us sampled' % (
+            unsampled * 1e6, sampled * 1e6,
+        ))
+        for rate in options['rates']:
+            cost = unsampled * (1 - rate) + sampled * rate
+            self.stdout.write('rate %g: overhead %.3f%%' % (
+                rate, 100 * cost / request_time,
+            ))
+
+    def time_requests(self, key, requests):
+        """Return the CPU time of an uninstrumented recipe list request."""
+        middleware = [
+            name for name in settings.MIDDLEWARE
+            if name != 'core.middleware.InstrumentationMiddleware'
+        ]
+        with override_settings(MIDDLEWARE=middleware,
+                               ALLOWED_HOSTS=['testserver'],
+                               RESPONSE_CACHE_ALIAS='bench-dummy',
+                               CACHES=dict(settings.CACHES, **{
+                                   'bench-dummy': {
+                                       'BACKEND': 'django.core.cache.'
+                                                  'backends.dummy.DummyCache',
+                                   },
+                               })):
+            client = Client(HTTP_AUTHORIZATION='Token %s' % key)
+            url = reverse('recipe:recipe-list')
+            client.get(url)
+
+            start = time.process_time()
+            for _ in range(requests):
+                client.get(url)
+
+            return (time.process_time() - start) / requests
+
+    def time_bookkeeping(self, sampled, queries, repeat=20000):
+        """Return the instrumentation CPU time of one request."""
+        def execute(sql, params, many, context):
+            pass
+
+        start = time.process_time()
+        for _ in range(repeat):
+            instrumentation.start_request(sampled)
+            for _ in range(queries):
+                instrumentation.execute_wrapper(execute, '', (), False, {})
+            with instrumentation.timed('serialize'):
+                pass
+            with instrumentation.timed('render'):
+                pass
+            timings = instrumentation.finish_request()
+            if timings is not None:
+                total = timings.get_total()
+                timings.observe('bench', total)
+                timings.get_server_timing(total)
+        elapsed = time.process_time() - start
+        metrics.reset()
+
+        return elapsed / repeat
@@ -0,0 +1,91 @@
+"""
+Django command to benchmark the JSON renderers and parsers.
+"""
+import io
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Render and parse recipe lists with the stdlib and orjson classes."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        pairs = [
+            ('stdlib', JSONRenderer(), JSONParser()),
+            ('orjson', ORJSONRenderer(), ORJSONParser()),
+        ]
+        for size in options['sizes']:
+            data = self.get_data(size)
+            content = JSONRenderer().render(data)
+            for name, renderer, parser in pairs:
+                self.stdout.write('%6d items %s render: %s' % (
+                    size, name,
+                    self.run(lambda: renderer.render(data), options['repeat']),
+                ))
+                self.stdout.write('%6d items %s parse:  %s' % (
+                    size, name,
+                    self.run(
+                        lambda: parser.parse(io.BytesIO(content)),
+                        options['repeat'],
+                    ),
+                ))
+
+    def get_data(self, size):
+        """Return a paginated recipe list response of size recipes."""
+        recipes = [
+            Recipe(
+                id=i,
+                title='Recipe %d' % i,
+                time_in_minutes=i % 120,
+                price=Decimal(i % 10000) / 100,
+                link='https://example.com/%d' % i if i % 2 else '',
+            )
+            for i in range(1, size + 1)
+        ]
+
+        return {
+            'next': 'http://localhost/api/recipe?cursor=cD0xMDA%3D',
+            'previous': None,
+            'results': RecipeSerializer(recipes, many=True).data,
+        }
+
+    def run(self, func, repeat):
+        """Summarize the best CPU time and peak allocations of func()."""
+        timings = []
+        for _ in range(repeat):
+            start = time.process_time()
+            func()
+            timings.append(time.process_time() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return 'cpu %.2f ms, peak allocated %.1f KiB' % (
+            min(timings) * 1000, peak / 1024,
+        )
@@ -0,0 +1,115 @@
+"""
+Django command to benchmark the recipe list query.
+"""
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from rest_framework.request import Request
+
+from core.models import Recipe
+from core.pagination import KeysetPagination
+from recipe.views import RetrieveRecipeView
+
+
+class Command(BaseCommand):
+    """Seed recipes for one user, then time and EXPLAIN the list query."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        users = self.seed(
+            options['rows'],
+            options['users'],
+            options['batch_size'],
+        )
+        user = users[0]
+
+        # A cursor 90% of the way down the user's list.
+        ids = Recipe.objects.filter(user=user).order_by('id')
+        deep_id = ids.values_list('id', flat=True)[ids.count() // 10]
+        first_page = self.list_queryset(user)
+        deep_page = self.list_queryset(user, cursor_id=deep_id)
+
+        for label, queryset in [
+            ('first page', first_page),
+            ('deep page', deep_page),
+        ]:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(self.explain(queryset))
+            self.stdout.write(self.timings(queryset, options['repeat']))
+
+    def seed(self, rows, users, batch_size):
+        """Top up the bench users' recipes to `rows` with bulk_create."""
+        User = get_user_model()
+        emails = ['bench%d@example.com' % i for i in range(users)]
+        User.objects.bulk_create(
+            [User(email=email) for email in emails],
+            ignore_conflicts=True,
+        )
+        users = list(User.objects.filter(email__in=emails).order_by('id'))
+
+        existing = Recipe.objects.filter(user__in=users).count()
+        for start in range(existing, rows, batch_size):
+            size = min(batch_size, rows - start)
+            Recipe.objects.bulk_create([
+                Recipe(
+                    user=users[n % len(users)],
+                    title='Recipe %d' % n,
+                    time_in_minutes=n % 120,
+                    price='%d.%02d' % (n % 1000, n % 100),
+                    link='https://example.com/%d' % n,
+                )
+                for n in range(start, start + size)
+            ])
+            self.stdout.write('seeded %d/%d' % (start + size, rows))
+
+        if connection.vendor == 'postgresql':
+            # Refresh the visibility map so index-only scans are possible.
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE core_recipe')
+
+        return users
+
+    def list_queryset(self, user, cursor_id=None):
+        """Return the queryset the list endpoint runs for one page."""
+        view = RetrieveRecipeView(action='list')
+        view.request = Request(RequestFactory().get('/'))
+        view.request.user = user
+        queryset = view.get_queryset()
+        if cursor_id is not None:
+            queryset = queryset.filter(id__lt=cursor_id)
+        page_size = KeysetPagination().get_page_size(view.request)
+
+        return queryset[:page_size + 1]
+
+    def explain(self, queryset):
+        """Return the query plan of queryset."""
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
+
+    def timings(self, queryset, repeat):
+        """Return the latency summary of running queryset repeat times."""
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+
+        return 'p50 %.3f ms, p95 %.3f ms, max %.3f ms' % (
+            statistics.median(samples),
+            samples[int(len(samples) * 0.95) - 1],
+            samples[-1],
+        )
@@ -0,0 +1,80 @@
+"""
+Django command to benchmark the recipe list serializers.
+"""
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe
+from recipe.serializers import RecipeSerializer, ValuesSerializer
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer with the ValuesSerializer fast path."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--min-speedup', type=float, default=5)
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        serializer = RecipeSerializer()
+        values_serializer = ValuesSerializer(serializer)
+        recipes = [
+            Recipe(
+                id=i,
+                title='Recipe %d' % i,
+                time_in_minutes=i % 120,
+                price=Decimal(i % 10000) / 100,
+                link='https://example.com/%d' % i if i % 2 else '',
+            )
+            for i in range(1, options['rows'] + 1)
+        ]
+        Row = namedtuple('Row', values_serializer.sources)
+        rows = [
+            Row(*(getattr(recipe, name) for name in Row._fields))
+            for recipe in recipes
+        ]
+
+        expected = RecipeSerializer(recipes, many=True).data
+        if JSONRenderer().render(values_serializer.to_representation(rows)) \
+                != JSONRenderer().render(expected):
+            raise CommandError('ValuesSerializer output differs.')
+
+        serializer_time = self.time(
+            lambda: RecipeSerializer(recipes, many=True).data,
+            options['repeat'],
+        )
+        values_time = self.time(
+            lambda: values_serializer.to_representation(rows),
+            options['repeat'],
+        )
+        speedup = serializer_time / values_time
+
+        for name, elapsed in [
+            ('RecipeSerializer', serializer_time),
+            ('ValuesSerializer', values_time),
+        ]:
+            self.stdout.write('%s: %.1f ms, %.0f rows/s' % (
+                name, elapsed * 1000, options['rows'] / elapsed,
+            ))
+        self.stdout.write('speedup: %.1fx' % speedup)
+
+        if speedup < options['min_speedup']:
+            raise CommandError('Speedup below %.1fx.' % options['min_speedup'])
+
+    def time(self, serialize, repeat):
+        """Return the best time of repeat calls to serialize()."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            timings.append(time.perf_counter() - start)
+
+        return min(timings)
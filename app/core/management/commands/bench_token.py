@@ -0,0 +1,78 @@
+"""
+Django command to benchmark the token endpoint per password hasher.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    """Measure requests per second on /api/user/token/ for each hasher."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--hashers',
+            nargs='+',
+            default=['pbkdf2', 'argon2', 'bcrypt'],
+        )
+        parser.add_argument('--email', default='bench-token@example.com')
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        password = 'bench-password-123'
+        for name in options['hashers']:
+            hasher = settings.PASSWORD_HASHER_CHOICES[name]
+            # Every request comes from the same address.
+            with override_settings(PASSWORD_HASHERS=[hasher],
+                                   THROTTLE_RATES={}):
+                try:
+                    self.set_password(options['email'], password)
+                except ValueError as error:
+                    self.stdout.write('%s: skipped (%s)' % (name, error))
+                    continue
+
+                result = self.run(
+                    {'email': options['email'], 'password': password},
+                    options['requests'],
+                    options['concurrency'],
+                )
+            self.stdout.write('%s: %s' % (name, result))
+
+    def set_password(self, email, password):
+        """Create the bench user with password hashed by the hasher."""
+        user, _ = get_user_model().objects.get_or_create(email=email)
+        user.set_password(password)
+        user.save()
+
+    def run(self, payload, requests, concurrency):
+        """POST payload to the token endpoint and summarize latencies."""
+        url = reverse('user:token')
+
+        def request(_):
+            start = time.perf_counter()
+            res = Client(HTTP_HOST='localhost').post(url, payload)
+            return res.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(request, range(requests)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for _, latency in results)
+        errors = sum(1 for code, _ in results if code != 200)
+
+        return '%.1f req/s, p50 %.1f ms, p99 %.1f ms, errors %d' % (
+            requests / elapsed,
+            statistics.median(latencies),
+            latencies[int(len(latencies) * 0.99) - 1],
+            errors,
+        )
@@ -0,0 +1,26 @@
+"""
+Django command to render the OpenAPI schema into files.
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.schema import SCHEMA_RENDERERS, generate_schema, get_schema_path
+
+
+class Command(BaseCommand):
+    """Write the schema served by core.schema.SchemaView to SCHEMA_DIR."""
+    help = __doc__
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        os.makedirs(settings.SCHEMA_DIR, exist_ok=True)
+        for format, renderer_class in SCHEMA_RENDERERS.items():
+            content = generate_schema(renderer_class())
+            path = get_schema_path(format)
+            # Replace atomically, running servers may be reading it.
+            with open(path + '.tmp', 'wb') as schema_file:
+                schema_file.write(content)
+            os.replace(path + '.tmp', path)
+            self.stdout.write('Wrote %s (%d bytes)' % (path, len(content)))
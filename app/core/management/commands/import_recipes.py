@@ -0,0 +1,75 @@
+"""
+Django command to import recipes from a CSV, NDJSON or JSON file.
+"""
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from recipe import importing
+from recipe.serializers import IMPORT_FORMATS
+from recipe.views import recipe_cache
+
+
+class Command(BaseCommand):
+    """Import the recipes of a file for a user.
+
+    Valid rows are created in one transaction and invalid ones are
+    skipped. --rejects writes every rejected row number with its errors
+    as NDJSON.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Email of owner.')
+        parser.add_argument('--format', choices=IMPORT_FORMATS)
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--rejects', help='File to report rejects to.')
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['user'].lower())
+        except User.DoesNotExist:
+            raise CommandError('No user with email %s.' % options['user'])
+
+        rejects = open(options['rejects'], 'w') if options['rejects'] \
+            else None
+
+        def reject(number, errors):
+            rejects.write(json.dumps(
+                {'row': number, 'errors': errors}, cls=JSONEncoder,
+            ) + '\n')
+
+        start = time.perf_counter()
+        try:
+            format = options['format'] or \
+                importing.get_format(options['path'])
+            with open(options['path'], 'rb') as f:
+                result = importing.import_recipes(
+                    user,
+                    importing.read_rows(f, format),
+                    batch_size=options['batch_size'],
+                    reject=reject if rejects else None,
+                )
+        except importing.ImportFormatError as error:
+            raise CommandError(error)
+        finally:
+            if rejects:
+                rejects.close()
+        elapsed = time.perf_counter() - start
+        if result['imported']:
+            recipe_cache.bump(user.pk)
+
+        self.stdout.write('Imported %d recipes, rejected %d in %.1fs.' % (
+            result['imported'], result['rejected'], elapsed,
+        ))
+        for error in [] if options['rejects'] else result['errors']:
+            self.stdout.write('row %d: %s' % (
+                error['row'], json.dumps(error['errors'], cls=JSONEncoder),
+            ))
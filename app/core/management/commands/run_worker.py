@@ -0,0 +1,120 @@
+"""
+Django command to run background jobs.
+"""
+import multiprocessing
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+from core import jobs, metrics
+from core.db.pool import drain_all
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve core.metrics like the /metrics view, given METRICS_TOKEN."""
+
+    def do_GET(self):
+        if not settings.METRICS_TOKEN:
+            self.send_error(404)
+            return
+        if not constant_time_compare(
+                self.headers.get('Authorization', ''),
+                'Bearer %s' % settings.METRICS_TOKEN):
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer')
+            self.end_headers()
+            return
+
+        body = metrics.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header(
+            'Content-Type', 'text/plain; version=0.0.4; charset=utf-8',
+        )
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """Run queued jobs on --threads threads in each of --processes.
+
+    SIGTERM or SIGINT stop claiming jobs; running ones are finished
+    first. With --metrics-port, each process serves its job metrics for
+    Prometheus on that port plus its index.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float)
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no job is due.',
+        )
+        parser.add_argument('--metrics-port', type=int)
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        if options['processes'] == 1:
+            self.run_worker(0, options)
+            return
+
+        # Children open their own connections.
+        connections.close_all()
+        drain_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=self.run_worker, args=(index, options))
+            for index in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(signum, frame):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
+
+    def run_worker(self, index, options):
+        """Run a worker in this process until it is stopped."""
+        worker = jobs.Worker(
+            threads=options['threads'],
+            poll_interval=options['poll_interval'],
+        )
+
+        def stop(signum, frame):
+            worker.stop()
+
+        handlers = {
+            signum: signal.signal(signum, stop)
+            for signum in [signal.SIGTERM, signal.SIGINT]
+        }
+        if options['metrics_port']:
+            server = ThreadingHTTPServer(
+                ('', options['metrics_port'] + index), MetricsHandler,
+            )
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        self.stdout.write('Worker %s running %d threads.' % (
+            worker.name, worker.threads,
+        ))
+        try:
+            worker.run(burst=options['burst'])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write('Worker %s stopped.' % worker.name)
@@ -0,0 +1,62 @@
+"""
+Django command to seed synthetic users and recipes.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    """Top up synthetic users, each with --recipes-per-user recipes.
+
+    Rows are generated from --seed, so the same arguments on the same
+    database give the same data. Users created by an earlier run under
+    the same --prefix are kept.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes-per-user', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed-')
+        parser.add_argument('--password', default=seeding.SEED_PASSWORD)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--no-copy',
+            action='store_false',
+            dest='copy',
+            default=None,
+            help='Insert with bulk_create instead of COPY.',
+        )
+
+    def handle(self, *args, **options):
+        """EntryPoint for command"""
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = seeding.seed(
+                options['users'],
+                options['recipes_per_user'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                password=options['password'],
+                batch_size=options['batch_size'],
+                copy=options['copy'],
+            )
+        elapsed = time.perf_counter() - start
+
+        # VACUUM cannot run in a transaction, e.g. when called in tests.
+        if connection.vendor == 'postgresql' and \
+                not connection.in_atomic_block:
+            # Fresh statistics and visibility map for the new rows.
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE core_user, core_recipe')
+
+        self.stdout.write(self.style.SUCCESS(
+            '%d users under %s, seeded in %.1fs.' % (
+                users.count(), options['prefix'], elapsed,
+            )
+        ))
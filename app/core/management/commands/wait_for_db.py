@@ -5,23 +5,27 @@ import time
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.conf import settings
 from django.db.utils import OperationalError
 from django.core.management.base import BaseCommand
 
+from core.db.health import check_database
+
 
 class Command(BaseCommand):
-    """Django command to wait for database."""
+    """Django command to wait for every configured database."""
 
     def handle(self, *args, **options):
         """EntryPoint for command"""
         self.stdout.write("waiting for database....")
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write("Database unavailable..1sec")
-                time.sleep(1)
+        for alias in ['default'] + settings.DATABASE_REPLICAS:
+            db_up = False
+            while db_up is False:
+                try:
+                    check_database(alias)
+                    db_up = True
+                except (Psycopg2Error, OperationalError):
+                    self.stdout.write("Database %s unavailable..1sec" % alias)
+                    time.sleep(1)
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
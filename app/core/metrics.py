@@ -0,0 +1,114 @@
+"""
+In-process counters and histograms for runtime metrics.
+"""
+import bisect
+import re
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_histograms = {}
+
+# Upper bounds, in seconds, of the buckets of duration histograms.
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+def incr(name, value=1):
+    """Increment the counter called name."""
+    with _lock:
+        _counters[name] += value
+
+
+def get_counters():
+    """Return a snapshot of every counter."""
+    with _lock:
+        return dict(_counters)
+
+
+def observe(name, value, buckets=DURATION_BUCKETS, **labels):
+    """Add value to the histogram called name with labels.
+
+    The buckets of a histogram are fixed by its first observation.
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {
+                'buckets': tuple(buckets),
+                'counts': [0] * (len(buckets) + 1),
+                'sum': 0,
+                'count': 0,
+            }
+        index = bisect.bisect_left(histogram['buckets'], value)
+        histogram['counts'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+def get_histograms():
+    """Return a snapshot of every histogram, keyed by name and labels."""
+    with _lock:
+        return {
+            key: dict(histogram, counts=list(histogram['counts']))
+            for key, histogram in _histograms.items()
+        }
+
+
+def reset():
+    """Reset every counter and histogram."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\')
+                     .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+
+
+def to_prometheus():
+    """Return every metric in the Prometheus text exposition format.
+
+    Counters are named after the counter with `_total` appended and
+    every character Prometheus does not allow replaced by `_`.
+    """
+    lines = []
+    for name, value in sorted(get_counters().items()):
+        name = _metric_name(name) + '_total'
+        lines.append('# TYPE %s counter' % name)
+        lines.append('%s %r' % (name, value))
+
+    typed = set()
+    for (name, labels), histogram in sorted(get_histograms().items()):
+        name = _metric_name(name)
+        if name not in typed:
+            typed.add(name)
+            lines.append('# TYPE %s histogram' % name)
+        cumulative = 0
+        bounds = [repr(float(bound)) for bound in histogram['buckets']]
+        for bound, count in zip(bounds + ['+Inf'], histogram['counts']):
+            cumulative += count
+            lines.append('%s_bucket%s %d' % (
+                name, _format_labels(labels + (('le', bound),)), cumulative,
+            ))
+        lines.append('%s_sum%s %r' % (
+            name, _format_labels(labels), histogram['sum'],
+        ))
+        lines.append('%s_count%s %d' % (
+            name, _format_labels(labels), histogram['count'],
+        ))
+
+    return '\n'.join(lines) + '\n'
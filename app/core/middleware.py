@@ -0,0 +1,207 @@
+"""
+Middleware for the API.
+"""
+import asyncio
+import math
+import random
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, get_resolver
+from django.utils.cache import patch_vary_headers
+
+from core import compression, instrumentation, metrics, throttling
+
+
+class BaseMiddleware:
+    """Middleware running natively in both sync and async stacks.
+
+    Subclasses implement process_request() and process_response(),
+    which must not block. Unlike MiddlewareMixin, no thread hop is
+    added on ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function for Django, the
+            # same way MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_request(self, request):
+        pass
+
+    def process_response(self, request, response):
+        return response
+
+
+class InstrumentationMiddleware(BaseMiddleware):
+    """Record the timings of a sample of requests per view.
+
+    See core.instrumentation. Sampled responses get a Server-Timing
+    header unless INSTRUMENTATION_SERVER_TIMING is off.
+    """
+
+    def process_request(self, request):
+        instrumentation.start_request(
+            random.random() < settings.INSTRUMENTATION_SAMPLE_RATE
+        )
+
+    def process_response(self, request, response):
+        timings = instrumentation.finish_request()
+        if timings is None:
+            return response
+
+        total = timings.get_total()
+        match = request.resolver_match
+        timings.observe(match.view_name if match else '<unmatched>', total)
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response['Server-Timing'] = timings.get_server_timing(total)
+
+        return response
+
+
+class ThrottleMiddleware(BaseMiddleware):
+    """Rate limit requests per view, per THROTTLE_RATES.
+
+    The view is resolved here so over-limit requests are answered 429
+    before any authentication, body parsing or view code runs. See
+    core.throttling.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        view_name = self.get_view_name(request)
+        if view_name:
+            token = throttling.get_known_token(request) \
+                if self.uses_token(view_name) else None
+            for key, rate in throttling.get_buckets(
+                    request, view_name, token):
+                wait = throttling.take(key, rate)
+                if wait:
+                    return self.throttled(wait)
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        view_name = self.get_view_name(request)
+        if view_name:
+            token = await throttling.aget_known_token(request) \
+                if self.uses_token(view_name) else None
+            for key, rate in throttling.get_buckets(
+                    request, view_name, token):
+                wait = await throttling.atake(key, rate)
+                if wait:
+                    return self.throttled(wait)
+
+        return await self.get_response(request)
+
+    def get_view_name(self, request):
+        """Return the name of the throttled view requested, if any."""
+        if not settings.THROTTLE_RATES:
+            return None
+        resolver = get_resolver(getattr(request, 'urlconf', None))
+        try:
+            match = resolver.resolve(request.path_info)
+        except Resolver404:
+            return None
+
+        # Later middleware reports the view of rejected requests.
+        request.resolver_match = match
+        if match.view_name in settings.THROTTLE_RATES:
+            return match.view_name
+        return None
+
+    def uses_token(self, view_name):
+        return bool(settings.THROTTLE_RATES[view_name].get('user'))
+
+    def throttled(self, wait):
+        metrics.incr('throttle.rejected')
+        wait = math.ceil(wait)
+        response = JsonResponse(
+            {'detail': 'Request was throttled. Expected available in '
+                       '%d seconds.' % wait},
+            status=429,
+        )
+        response['Retry-After'] = str(wait)
+
+        return response
+
+
+class CompressionMiddleware(BaseMiddleware):
+    """Compress responses with the best encoding the client accepts.
+
+    Like Django's GZipMiddleware, plus brotli and zstd, settings for the
+    encodings, levels, content types and minimum size, and periodic
+    flushing of streamed bodies. Strong ETags are made weak, so
+    conditional requests keep matching the uncompressed representation.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or \
+                not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = compression.select_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            settings.COMPRESSION_ENCODINGS,
+        )
+        if encoding is None:
+            return response
+        level = settings.COMPRESSION_LEVELS[encoding]
+
+        if response.streaming:
+            # The compressed size is not known until the stream ends.
+            response.streaming_content = compression.compress_sequence(
+                encoding,
+                level,
+                response.streaming_content,
+                settings.COMPRESSION_STREAM_FLUSH_SIZE,
+            )
+            del response['Content-Length']
+        else:
+            content = compression.compress(encoding, level, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # RFC 7232 section 2.1: the compressed body is not byte-equal to
+        # the one a strong ETag was computed for.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+
+        return response
+
+    def is_compressible(self, response):
+        """Return whether response is worth compressing."""
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if not content_type.startswith(
+                tuple(settings.COMPRESSION_CONTENT_TYPES)):
+            return False
+
+        if response.streaming:
+            length = response.get('Content-Length')
+            return length is None or \
+                int(length) >= settings.COMPRESSION_MIN_SIZE
+
+        return len(response.content) >= settings.COMPRESSION_MIN_SIZE
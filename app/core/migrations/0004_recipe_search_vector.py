@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+import core.db.operations
+
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION core_recipe_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON core_recipe
+    FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector_update();
+
+UPDATE core_recipe SET search_vector = NULL;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER core_recipe_search_vector_trigger ON core_recipe;
+DROP FUNCTION core_recipe_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_recipe_user_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        core.db.operations.RunSQL(
+            SEARCH_VECTOR_TRIGGER,
+            DROP_SEARCH_VECTOR_TRIGGER,
+        ),
+        core.db.operations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
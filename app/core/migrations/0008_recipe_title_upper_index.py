@@ -0,0 +1,22 @@
+from django.db import migrations
+
+import core.db.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_job'),
+    ]
+
+    operations = [
+        # The title__istartswith filter compiles to UPPER(title) LIKE,
+        # which recipe_user_title_idx cannot serve. text_pattern_ops
+        # makes the prefix match an index range whatever the collation.
+        # Expressions with opclasses need Django 4, hence the raw SQL.
+        core.db.operations.RunSQL(
+            'CREATE INDEX recipe_user_title_upper_idx ON core_recipe '
+            '(user_id, UPPER(title) text_pattern_ops)',
+            'DROP INDEX recipe_user_title_upper_idx',
+        ),
+    ]
@@ -2,7 +2,11 @@
 Database models.
 """
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -13,11 +17,15 @@ from django.contrib.auth.models import (
 class UserManager(BaseUserManager):
     """manager for users"""
 
-    def create_user(self, email, password=None, **extra_fields):
-        """create save and return a new user"""
+    def make_user(self, email, **extra_fields):
+        """return a new unsaved user, without a password"""
         if not email:
             raise ValueError("user must have an email address")
-        user = self.model(email=email.lower(), **extra_fields)
+        return self.model(email=email.lower(), **extra_fields)
+
+    def create_user(self, email, password=None, **extra_fields):
+        """create save and return a new user"""
+        user = self.make_user(email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
 
@@ -49,13 +57,103 @@ class Recipe(models.Model):
     """Recipe object."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
     title = models.CharField(max_length=255, blank=False)
     time_in_minutes = models.IntegerField(default=5)
     price = models.DecimalField(max_digits=5, decimal_places=2, default='0.00')
     description = models.TextField(blank=True)
     link = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger on PostgreSQL, see migration 0004.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the recipe list (filter by user, newest first) as an
+            # index-only scan on PostgreSQL; it also replaces the plain
+            # user_id index for foreign key lookups.
+            models.Index(
+                fields=['user', '-id'],
+                include=['title', 'time_in_minutes', 'price', 'link'],
+                name='recipe_user_id_desc_idx',
+            ),
+            # One index per ordering allowed on the recipe list, so
+            # sorted pages are read in index order without a sort step.
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_in_minutes', 'id'],
+                name='recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='recipe_user_title_idx',
+            ),
+            # The title__istartswith filter is served by
+            # recipe_user_title_upper_idx on PostgreSQL, see migration
+            # 0008; Django 3.2 cannot declare it here.
+            # Count and latest change per user, for the list ETag.
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='recipe_user_updated_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class Job(models.Model):
+    """A call of a background job function, see core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the due queued jobs in run_at order; done
+            # jobs are deleted, so the index only holds pending work.
+            models.Index(
+                fields=['run_at', 'id'],
+                condition=models.Q(status='queued'),
+                name='job_queued_run_at_idx',
+            ),
+            # Running jobs whose worker stopped responding.
+            models.Index(
+                fields=['locked_at'],
+                condition=models.Q(status='running'),
+                name='job_running_locked_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return '%s #%d' % (self.name, self.pk)
@@ -0,0 +1,215 @@
+"""
+Keyset (cursor) pagination for the API.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    _positive_int,
+)
+from rest_framework.settings import api_settings
+
+
+def _reverse_ordering(ordering):
+    """Flip the direction of every field in an ordering tuple."""
+    return tuple(
+        field[1:] if field.startswith('-') else '-' + field
+        for field in ordering
+    )
+
+
+class KeysetPagination(CursorPagination):
+    """Paginate a queryset by seeking past the last row of the page.
+
+    The ordering is taken from the queryset itself (falling back to
+    `ordering`) and `id` is appended as a tie-breaker, so every page is
+    fetched with a single `WHERE (a, id) < (x, y) LIMIT n` query whose
+    cost does not grow with how deep the client has scrolled.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    tie_breaker = 'id'
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', None)
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped at max_page_size."""
+        if self.page_size_query_param in request.query_params:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except ValueError:
+                pass
+
+        page_size = api_settings.PAGE_SIZE
+        if self.max_page_size and page_size:
+            return min(page_size, self.max_page_size)
+        return page_size
+
+    def get_ordering(self, request, queryset, view):
+        """Return the queryset ordering with a unique tie-breaker."""
+        ordering = tuple(
+            field for field in queryset.query.order_by
+            if isinstance(field, str)
+        ) or tuple(self.ordering)
+
+        fields = [field.lstrip('-') for field in ordering]
+        if self.tie_breaker not in fields and 'pk' not in fields:
+            prefix = '-' if ordering[0].startswith('-') else ''
+            ordering += (prefix + self.tie_breaker,)
+
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+
+        return self.set_page(list(page_queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Return the unevaluated query of the page and one more row.
+
+        Split from paginate_queryset so async views can fetch the rows
+        themselves and hand them to set_page().
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+
+        ordering = _reverse_ordering(self.ordering) if reverse \
+            else self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        if self.cursor and self.cursor.position is not None:
+            queryset = queryset.filter(self._get_seek_filter(
+                ordering, self.cursor.position, queryset,
+            ))
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """Return the page from the rows of get_page_queryset()."""
+        reverse = self.cursor.reverse if self.cursor else False
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_previous = has_following
+            self.has_next = bool(self.page)
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None and bool(self.page)
+
+        if self.page:
+            self.previous_position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+            self.next_position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+
+        return self.page
+
+    def _get_seek_filter(self, ordering, position, queryset):
+        """Return a filter selecting rows strictly after `position`.
+
+        The values are converted by their fields, so a tampered
+        cursor, or one from another ordering, is a 404 rather than an
+        error in the query.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            values = [
+                self._get_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+
+        seek = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], values)
+            }
+            seek |= Q(**equal, **{name + lookup: values[index]})
+
+        if len(ordering) > 1:
+            # A plain range on the leading column lets the planner turn
+            # the OR above into an index range scan.
+            first = ordering[0]
+            lookup = '__lte' if first.startswith('-') else '__gte'
+            seek &= Q(**{first.lstrip('-') + lookup: values[0]})
+
+        return seek
+
+    def _get_field(self, queryset, name):
+        """Return the model or annotation field ordered by."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            values.append(str(value))
+
+        return json.dumps(values)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        cursor = Cursor(offset=0, reverse=False, position=self.next_position)
+        return self.encode_cursor(cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        cursor = Cursor(
+            offset=0,
+            reverse=True,
+            position=self.previous_position,
+        )
+        return self.encode_cursor(cursor)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters[0]['schema'] = {'type': 'string'}
+        return parameters
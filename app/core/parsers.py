@@ -0,0 +1,34 @@
+"""
+JSON parser backed by orjson when it is installed.
+"""
+import codecs
+
+from django.conf import settings
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core.renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(parsers.JSONParser):
+    """JSONParser decoding with orjson, or the stdlib without it.
+
+    orjson only reads UTF-8 and always rejects NaN and infinities, so
+    other encodings and STRICT_JSON = False are left to JSONParser.
+    Integers over 64 bits are read as floats.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or \
+                codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,52 @@
+"""
+JSON renderer backed by orjson when it is installed.
+"""
+from rest_framework import renderers
+
+from core.instrumentation import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson, or the stdlib without it.
+
+    The bytes are the same as JSONRenderer's: datetimes, dates, times
+    and anything orjson cannot encode natively go through DRF's
+    JSONEncoder. Indented or non-compact output, ASCII-only output and
+    data orjson rejects (integers over 64 bits, non-string keys) are
+    left to JSONRenderer. Unlike the stdlib with STRICT_JSON, orjson
+    writes NaN and infinities as null instead of raising.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring."""
+        with timed('render'):
+            return self.render_json(
+                data, accepted_media_type, renderer_context,
+            )
+
+    def render_json(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+
+        if orjson is None or self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=(orjson.OPT_PASSTHROUGH_DATETIME |
+                        orjson.OPT_PASSTHROUGH_DATACLASS),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped like JSONRenderer to stay a strict javascript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,101 @@
+"""
+OpenAPI schema served from build-time files or a per-process memo.
+
+Generating the schema introspects every view and serializer, so
+`manage.py build_schema` renders it into SCHEMA_DIR at build or deploy
+time and SchemaView serves those files. Without them, each rendering
+is generated once per process and memoized, keyed on CODE_VERSION.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+# One file per format; the other renderers of a format give the same bytes.
+SCHEMA_RENDERERS = {
+    OpenApiYamlRenderer.format: OpenApiYamlRenderer,
+    OpenApiJsonRenderer.format: OpenApiJsonRenderer,
+}
+
+_memo = {}
+
+
+def get_schema_path(format):
+    """Return the path build_schema writes the format's schema to."""
+    return os.path.join(settings.SCHEMA_DIR, 'schema.%s' % format)
+
+
+def generate_schema(renderer, media_type=None, request=None):
+    """Generate the schema and return it rendered with renderer."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(
+        request=request,
+        public=spectacular_settings.SERVE_PUBLIC,
+    )
+
+    return renderer.render(schema, media_type, {})
+
+
+def _load(content):
+    return content, '"%s"' % hashlib.sha1(content).hexdigest()
+
+
+def get_schema(renderer, media_type, request=None):
+    """Return the rendered schema and its ETag.
+
+    The build_schema file is used for the default language and plain
+    media types; anything else is generated and memoized.
+    """
+    path = get_schema_path(renderer.format)
+    plain = media_type == renderer.media_type and \
+        translation.get_language() == settings.LANGUAGE_CODE
+    if plain and os.path.exists(path):
+        mtime = os.path.getmtime(path)
+        key = ('file', path, mtime)
+        if key not in _memo:
+            with open(path, 'rb') as schema_file:
+                _memo[key] = _load(schema_file.read())
+        return _memo[key]
+
+    key = (
+        settings.CODE_VERSION,
+        type(renderer),
+        media_type,
+        translation.get_language(),
+    )
+    if key not in _memo:
+        _memo[key] = _load(generate_schema(renderer, media_type, request))
+
+    return _memo[key]
+
+
+def clear_cache():
+    """Forget the loaded and memoized schemas."""
+    _memo.clear()
+
+
+class SchemaView(SpectacularAPIView):
+    # SpectacularAPIView serving a precomputed schema with an ETag. The
+    # docstring is the endpoint's description in the schema, keep it.
+    __doc__ = SpectacularAPIView.__doc__
+
+    def _get_schema_response(self, request):
+        renderer = request.accepted_renderer
+        media_type = request.accepted_media_type
+        content, etag = get_schema(renderer, media_type, request)
+
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            if renderer.charset:
+                media_type = '%s; charset=%s' % (media_type, renderer.charset)
+            response = HttpResponse(content, content_type=media_type)
+        response['ETag'] = etag
+
+        return response
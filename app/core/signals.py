@@ -0,0 +1,31 @@
+"""
+Signal handlers keeping cached data consistent with the database.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_tokens
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached tokens when a user is saved (password, is_active...)."""
+    if created:
+        return
+
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    invalidate_tokens(*keys)
+    # Lookups until the commit still read the old row, so again then.
+    transaction.on_commit(lambda: invalidate_tokens(*keys))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop the cached lookup of a deleted token."""
+    invalidate_tokens(instance.key)
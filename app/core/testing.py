@@ -0,0 +1,126 @@
+"""
+Query budgets and N+1 query detection for tests.
+
+QueryBudgetMixin checks every request a TestCase makes through the test
+client: it fails when a request runs the same SQL shape (the statement
+with its literals replaced) `n_plus_one_threshold` times or more, or
+when it makes more queries than the budget declared for its view in
+`query_budgets`. query_budget() applies the same checks to a block,
+for tests that do not use the mixin.
+"""
+import re
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.db import connections
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+
+# Repeats of one shape from this count on are reported as N+1 queries.
+N_PLUS_ONE_THRESHOLD = 3
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SAVEPOINT = re.compile(r'^(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO)\b')
+
+
+def get_sql_shape(sql):
+    """Return sql with its literals, and lists of them, replaced by ?."""
+    sql = _NUMBER.sub('?', _STRING.sub('?', sql))
+    return _LIST.sub('(?)', sql)
+
+
+def find_repeated_queries(queries, threshold=N_PLUS_ONE_THRESHOLD):
+    """Return {shape: count} of the shapes run threshold times or more."""
+    counts = {}
+    for query in queries:
+        if _SAVEPOINT.match(query['sql']):
+            continue
+        shape = get_sql_shape(query['sql'])
+        counts[shape] = counts.get(shape, 0) + 1
+
+    return {
+        shape: count for shape, count in counts.items()
+        if count >= threshold
+    }
+
+
+def check_queries(queries, budget=None, threshold=N_PLUS_ONE_THRESHOLD,
+                  label='Block'):
+    """Raise AssertionError for an N+1 or more queries than budget."""
+    repeated = find_repeated_queries(queries, threshold)
+    if repeated:
+        raise AssertionError('%s ran N+1 queries:\n%s' % (label, '\n'.join(
+            '%d x %s' % (count, shape) for shape, count in repeated.items()
+        )))
+
+    if budget is not None and len(queries) > budget:
+        raise AssertionError(
+            '%s made %d queries, over its budget of %d:\n%s' % (
+                label, len(queries), budget,
+                '\n'.join(query['sql'] for query in queries),
+            )
+        )
+
+
+@contextmanager
+def query_budget(budget=None, threshold=N_PLUS_ONE_THRESHOLD,
+                 using='default'):
+    """Fail if the block makes an N+1 or more than budget queries."""
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+
+    check_queries(context.captured_queries, budget, threshold)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin checking the queries of every test client request.
+
+    `query_budgets` maps view names, or (method, view name) pairs, to
+    the most queries a request may make. Bodies streamed after the
+    response is returned, and requests of the async client, are not
+    checked.
+    """
+    query_budgets = {}
+    n_plus_one_threshold = N_PLUS_ONE_THRESHOLD
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        request = Client.request
+
+        def checked_request(client, **environ):
+            with CaptureQueriesContext(connections['default']) as context:
+                response = request(client, **environ)
+            cls.check_request_queries(environ, context.captured_queries)
+            return response
+
+        patcher = patch.object(Client, 'request', checked_request)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+    @classmethod
+    def get_query_budget(cls, method, view_name):
+        """Return the query budget of a view, None if it has none."""
+        budget = cls.query_budgets.get((method, view_name))
+        if budget is None:
+            budget = cls.query_budgets.get(view_name)
+
+        return budget
+
+    @classmethod
+    def check_request_queries(cls, environ, queries):
+        method = environ['REQUEST_METHOD']
+        try:
+            view_name = resolve(environ['PATH_INFO']).view_name
+        except Resolver404:
+            view_name = None
+
+        check_queries(
+            queries,
+            cls.get_query_budget(method, view_name),
+            cls.n_plus_one_threshold,
+            '%s %s' % (method, view_name or environ['PATH_INFO']),
+        )
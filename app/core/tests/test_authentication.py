@@ -0,0 +1,101 @@
+"""
+Tests for the cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import get_cache_stats
+
+ME_URL = reverse('user:about')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_token_lookup_cached(self):
+        """Test only the first request queries the token table."""
+        before = get_cache_stats()
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        after = get_cache_stats()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_invalid_token_not_cached(self):
+        """Test an unknown token is rejected every time."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        for _ in range(2):
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token stops authenticating."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test a deactivated user stops authenticating."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_during_lookup(self):
+        """Test a lookup racing with a deactivation caches nothing stale."""
+        fetch = TokenAuthentication.authenticate_credentials
+
+        def fetch_then_deactivate(auth, key):
+            result = fetch(auth, key)
+            self.user.is_active = False
+            self.user.save()
+            return result
+
+        with patch.object(TokenAuthentication, 'authenticate_credentials',
+                          fetch_then_deactivate):
+            self.client.get(ME_URL)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_refreshes_user(self):
+        """Test changing the password drops the cached user."""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'password': 'newpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        before = get_cache_stats()
+        self.client.get(ME_URL)
+
+        self.assertEqual(get_cache_stats()['misses'] - before['misses'], 1)
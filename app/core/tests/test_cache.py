@@ -0,0 +1,85 @@
+"""
+Tests for the versioned cache.
+"""
+import threading
+from unittest.mock import Mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache import VersionedCache
+
+
+class VersionedCacheTests(SimpleTestCase):
+    """Test versioned keys and single-flight recomputation."""
+
+    def setUp(self):
+        cache.clear()
+        self.cache = VersionedCache('test_cache')
+
+    def test_bump_changes_keys(self):
+        """Test bumping an owner's version changes only their keys."""
+        key = self.cache.make_key(1, 'list')
+        other_key = self.cache.make_key(2, 'list')
+
+        self.cache.bump(1)
+
+        self.assertNotEqual(self.cache.make_key(1, 'list'), key)
+        self.assertEqual(self.cache.make_key(2, 'list'), other_key)
+
+    def test_version_survives_eviction(self):
+        """Test an evicted version never reuses older keys."""
+        key = self.cache.make_key(1, 'list')
+        self.cache.bump(1)
+        cache.delete('test_cache:version:1')
+
+        self.assertNotEqual(self.cache.make_key(1, 'list'), key)
+
+    def test_get_or_compute_caches_value(self):
+        """Test a value is computed once and then served from the cache."""
+        compute = Mock(return_value='value')
+        key = self.cache.make_key(1, 'list')
+        before = self.cache.get_stats()
+
+        self.assertEqual(self.cache.get_or_compute(key, compute), 'value')
+        self.assertEqual(self.cache.get_or_compute(key, compute), 'value')
+
+        compute.assert_called_once()
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['hit'] - before.get('hit', 0), 1)
+        self.assertEqual(stats['miss'] - before.get('miss', 0), 1)
+
+    def test_get_or_compute_none_not_cached(self):
+        """Test None results are not cached."""
+        compute = Mock(return_value=None)
+        key = self.cache.make_key(1, 'list')
+
+        self.cache.get_or_compute(key, compute)
+        self.cache.get_or_compute(key, compute)
+
+        self.assertEqual(compute.call_count, 2)
+
+    def test_get_or_compute_single_flight(self):
+        """Test requests wait for a recomputation already in progress."""
+        key = self.cache.make_key(1, 'list')
+        cache.add(key + ':lock', 1)
+        compute = Mock(return_value='mine')
+        timer = threading.Timer(0.1, cache.set, args=(key, 'theirs'))
+
+        timer.start()
+        value = self.cache.get_or_compute(key, compute)
+        timer.join()
+
+        self.assertEqual(value, 'theirs')
+        compute.assert_not_called()
+
+    def test_get_or_compute_lock_timeout(self):
+        """Test a stale lock does not block computing the value."""
+        self.cache.wait_timeout = 0.1
+        key = self.cache.make_key(1, 'list')
+        cache.add(key + ':lock', 1)
+
+        value = self.cache.get_or_compute(key, Mock(return_value='mine'))
+
+        self.assertEqual(value, 'mine')
+        self.assertEqual(cache.get(key + ':lock'), 1)
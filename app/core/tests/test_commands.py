@@ -7,10 +7,11 @@ from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 
 
-@patch('core.management.commands.wait_for_db.Command.check')
+@patch('core.management.commands.wait_for_db.check_database')
+@override_settings(DATABASE_REPLICAS=[])
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
@@ -20,7 +21,7 @@ class CommandTests(SimpleTestCase):
 
         call_command('wait_for_db')
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_check.assert_called_once_with('default')
 
     @patch('time.sleep')
     def test_wait_for_db_delay(self, patched_sleep, pathced_check):
@@ -32,4 +33,16 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(pathced_check.call_count, 6)
 
-        pathced_check.assert_called_with(databases=['default'])
+        pathced_check.assert_called_with('default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_wait_for_every_database(self, patched_check):
+        """Test waiting for the primary and every replica."""
+        patched_check.return_value = True
+
+        call_command('wait_for_db')
+
+        self.assertEqual(
+            [call.args for call in patched_check.call_args_list],
+            [('default',), ('replica1',)],
+        )
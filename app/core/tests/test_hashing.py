@@ -0,0 +1,150 @@
+"""
+Tests for password hashing.
+"""
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+
+
+@contextmanager
+def saturated_pool():
+    """Hold every slot of the hashing pool."""
+    _, slots = hashing._get_pool()
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+
+    try:
+        yield
+    finally:
+        for _ in range(taken):
+            slots.release()
+
+
+@override_settings(PASSWORD_HASHING_POOL=True)
+class PasswordHashingTests(TestCase):
+    """Test hashing passwords in the bounded pool."""
+
+    def test_make_and_check_password(self):
+        """Test hashes made in the pool verify."""
+        encoded = hashing.make_password('testpass123')
+
+        self.assertEqual(
+            hashing.check_password('testpass123', encoded),
+            (True, False),
+        )
+        self.assertEqual(
+            hashing.check_password('wrongpass', encoded),
+            (False, False),
+        )
+
+    def test_user_password_upgraded_on_login(self):
+        """Test a changed work factor re-hashes the password on check."""
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123',
+            )
+        old_hash = user.password
+
+        self.assertTrue(user.check_password('testpass123'))
+
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, old_hash)
+        self.assertIn('$260000$', user.password)
+
+    def test_async_make_and_check_password(self):
+        """Test the pool can be awaited from async code."""
+        encoded = async_to_sync(hashing.amake_password)('testpass123')
+
+        is_correct, _ = async_to_sync(hashing.acheck_password)(
+            'testpass123',
+            encoded,
+        )
+
+        self.assertTrue(is_correct)
+
+    def test_pool_saturated(self):
+        """Test a saturated pool rejects work instead of queueing it."""
+        with saturated_pool(), \
+                self.settings(PASSWORD_HASHING_TIMEOUT=0.01):
+            with self.assertRaises(hashing.PasswordHashingBusy):
+                hashing.make_password('testpass123')
+            with self.assertRaises(hashing.PasswordHashingBusy):
+                async_to_sync(hashing.amake_password)('testpass123')
+
+    def test_pool_saturated_api(self):
+        """Test signup and login answer 503 while the pool is saturated."""
+        cache.clear()
+        client = APIClient()
+        get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        payload = {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+            'name': 'Test',
+        }
+
+        with saturated_pool(), \
+                self.settings(PASSWORD_HASHING_TIMEOUT=0.01):
+            signup = client.post(reverse('user:create'), payload)
+            login = client.post(reverse('user:token'), {
+                'email': 'user@example.com',
+                'password': 'testpass123',
+            })
+
+        for res in [signup, login]:
+            self.assertEqual(
+                res.status_code,
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        self.assertFalse(
+            get_user_model().objects.filter(email=payload['email']).exists()
+        )
+
+    def test_model_bypasses_pool(self):
+        """Test hashing outside the API, e.g. in the admin, never waits."""
+        with saturated_pool(), \
+                self.settings(PASSWORD_HASHING_TIMEOUT=0.01):
+            user = get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123',
+            )
+
+            self.assertTrue(user.check_password('testpass123'))
+
+    def test_pool_disabled(self):
+        """Test hashes run in the calling thread unless the pool is on."""
+        with saturated_pool(), \
+                self.settings(PASSWORD_HASHING_POOL=False):
+            encoded = hashing.make_password('testpass123')
+
+            self.assertEqual(
+                hashing.check_password('testpass123', encoded),
+                (True, False),
+            )
+
+    @override_settings(
+        PASSWORD_HASHERS=['core.hashers.Argon2PasswordHasher'],
+        PASSWORD_ARGON2_TIME_COST=1,
+        PASSWORD_ARGON2_MEMORY_COST=1024,
+        PASSWORD_ARGON2_PARALLELISM=1,
+    )
+    def test_argon2_costs_from_settings(self):
+        """Test the Argon2 work factors come from settings."""
+        encoded = make_password('testpass123')
+
+        self.assertTrue(encoded.startswith('argon2$'))
+        self.assertIn('m=1024,t=1,p=1', encoded)
@@ -0,0 +1,174 @@
+"""
+Tests for request instrumentation and the metrics endpoint.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import instrumentation, metrics
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+METRICS_URL = reverse('metrics')
+
+
+def get_histogram(name, view):
+    return metrics.get_histograms().get((name, (('view', view),)))
+
+
+class MetricsTests(SimpleTestCase):
+    """Test histograms and the Prometheus export."""
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_observe(self):
+        """Test values land in the first bucket they fit in."""
+        for value in [0.001, 0.02, 60]:
+            metrics.observe('latency', value, view='a')
+
+        histogram = metrics.get_histograms()[('latency', (('view', 'a'),))]
+
+        self.assertEqual(histogram['count'], 3)
+        self.assertAlmostEqual(histogram['sum'], 60.021)
+        self.assertEqual(histogram['counts'][0], 1)
+        self.assertEqual(histogram['counts'][4], 1)
+        self.assertEqual(histogram['counts'][-1], 1)
+
+    def test_to_prometheus(self):
+        """Test counters and cumulative histogram buckets are exported."""
+        metrics.incr('auth.token_cache.hit', 2)
+        metrics.observe('latency', 0.5, buckets=(0.1, 1), view='a"b')
+
+        self.assertEqual(metrics.to_prometheus(), '\n'.join([
+            '# TYPE auth_token_cache_hit_total counter',
+            'auth_token_cache_hit_total 2',
+            '# TYPE latency histogram',
+            'latency_bucket{view="a\\"b",le="0.1"} 0',
+            'latency_bucket{view="a\\"b",le="1.0"} 1',
+            'latency_bucket{view="a\\"b",le="+Inf"} 1',
+            'latency_sum{view="a\\"b"} 0.5',
+            'latency_count{view="a\\"b"} 1',
+        ]) + '\n')
+
+    def test_timed_nested(self):
+        """Test nested blocks of a phase are counted once."""
+        timings = instrumentation.start_request(True)
+        with instrumentation.timed('serialize'):
+            with instrumentation.timed('serialize'):
+                pass
+        self.assertIs(instrumentation.finish_request(), timings)
+
+        self.assertGreater(timings.durations['serialize'], 0)
+        self.assertIsNone(instrumentation.finish_request())
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationMiddlewareTests(TestCase):
+    """Test recording the timings of API requests."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        Recipe.objects.create(user=self.user, title='Pasta', price=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing(self):
+        """Test sampled responses report their phases."""
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="2 queries", ')
+        for phase in ['serialize', 'render', 'total']:
+            self.assertRegex(timing, r'\b%s;dur=[\d.]+' % phase)
+
+    def test_histograms_per_view(self):
+        """Test timings are aggregated per view name."""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        queries = get_histogram('http_request_db_queries',
+                                'recipe:recipe-list')
+        serialize = get_histogram('http_request_serialize_seconds',
+                                  'recipe:recipe-list')
+        self.assertEqual(queries['count'], 2)
+        # The second list is answered from the response cache.
+        self.assertEqual(queries['sum'], 2)
+        self.assertGreater(serialize['sum'], 0)
+
+    def test_token_view(self):
+        """Test the token endpoint is recorded under its view name."""
+        self.client.post(TOKEN_URL, {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+        })
+
+        duration = get_histogram('http_request_serialize_seconds',
+                                 'user:token')
+        self.assertGreater(duration['sum'], 0)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Test requests outside the sample are not recorded."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+        self.assertEqual(metrics.get_histograms(), {})
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Test the header can be turned off."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+        self.assertIsNotNone(get_histogram('http_request_duration_seconds',
+                                           'recipe:recipe-list'))
+
+    def test_execute_wrapper_installed(self):
+        """Test queries of the connection go through the wrapper."""
+        connection.ensure_connection()
+
+        self.assertIn(
+            instrumentation.execute_wrapper,
+            connection.execute_wrappers,
+        )
+
+
+class MetricsViewTests(SimpleTestCase):
+    """Test the Prometheus endpoint."""
+
+    def setUp(self):
+        metrics.reset()
+        metrics.incr('auth.token_cache.hit')
+
+    def test_disabled_without_token(self):
+        """Test the endpoint does not exist without METRICS_TOKEN."""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_requires_token(self):
+        """Test scrapes need the bearer token."""
+        for header in ['', 'Bearer wrong']:
+            with self.subTest(header=header):
+                res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION=header)
+
+                self.assertEqual(res.status_code, 401)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_export(self):
+        """Test the metrics are exported in the text format."""
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'auth_token_cache_hit_total 1\n', res.content)
@@ -0,0 +1,206 @@
+"""
+Tests for background jobs.
+"""
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from core import jobs, metrics
+from core.models import Job
+
+calls = []
+
+
+@jobs.job
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@jobs.job(max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+class JobTestMixin:
+
+    def setUp(self):
+        calls.clear()
+        metrics.reset()
+
+
+@override_settings(JOBS_BACKEND='immediate')
+class ImmediateBackendTests(JobTestMixin, SimpleTestCase):
+    """Test running jobs as they are enqueued."""
+
+    def test_delay_runs_job(self):
+        """Test the job runs with its arguments round tripped as JSON."""
+        result = record.delay(1, price=Decimal('1.50'))
+
+        self.assertIsNone(result)
+        self.assertEqual(calls, [((1,), {'price': '1.50'})])
+        self.assertEqual(metrics.get_counters()['jobs.succeeded'], 1)
+
+    def test_errors_propagate(self):
+        """Test exceptions of the job reach the caller."""
+        with self.assertRaises(ValueError):
+            explode.delay()
+
+
+class DatabaseBackendTests(JobTestMixin, TestCase):
+    """Test queueing, claiming and running jobs."""
+
+    def test_delay_queues_job(self):
+        """Test the call is stored until a worker runs it."""
+        job = record.delay(1, name='x')
+
+        self.assertEqual(calls, [])
+        self.assertEqual(job.name, 'core.tests.test_jobs.record')
+        self.assertEqual((job.args, job.kwargs), ([1], {'name': 'x'}))
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.max_attempts, 5)
+
+    def test_claim_and_run(self):
+        """Test claimed jobs are locked by the worker and deleted once run."""
+        record.delay('a')
+        jobs.enqueue(record, ['later'], run_at=timezone.now() + timedelta(1))
+
+        claimed = jobs.claim(10, 'w1')
+
+        self.assertEqual([job.args for job in claimed], [['a']])
+        job = Job.objects.get(id=claimed[0].id)
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 1))
+        self.assertEqual(job.locked_by, 'w1')
+        self.assertEqual(jobs.claim(10, 'w2'), [])
+
+        self.assertTrue(jobs.run(claimed[0]))
+        self.assertEqual(calls, [(('a',), {})])
+        self.assertFalse(Job.objects.filter(id=job.id).exists())
+        self.assertEqual(metrics.get_counters()['jobs.succeeded'], 1)
+
+    def test_claim_without_skip_locked(self):
+        """Test backends without SKIP LOCKED claim jobs one at a time."""
+        for i in range(3):
+            record.delay(i)
+
+        with patch.object(connection.features,
+                          'has_select_for_update_skip_locked', False):
+            claimed = jobs.claim(2, 'w1')
+            rest = jobs.claim(2, 'w2')
+
+        self.assertEqual([job.args for job in claimed], [[0], [1]])
+        self.assertEqual([job.args for job in rest], [[2]])
+        self.assertEqual(
+            Job.objects.filter(status=Job.RUNNING, attempts=1).count(), 3,
+        )
+
+    def test_retry_with_backoff(self):
+        """Test failed jobs are retried later, then marked failed."""
+        job = explode.delay()
+
+        with patch('core.jobs.get_retry_delay', return_value=60):
+            self.assertFalse(jobs.run(jobs.claim(1, 'w')[0]))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(jobs.claim(1, 'w'), [])
+
+        Job.objects.update(run_at=timezone.now())
+        jobs.run(jobs.claim(1, 'w')[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        counters = metrics.get_counters()
+        self.assertEqual(counters['jobs.retried'], 1)
+        self.assertEqual(counters['jobs.failed'], 1)
+
+    @override_settings(JOBS_RETRY_BACKOFF=10, JOBS_RETRY_BACKOFF_MAX=60)
+    def test_retry_delay(self):
+        """Test the delay doubles per attempt up to the maximum."""
+        with patch('core.jobs.random.uniform', return_value=1):
+            self.assertEqual(
+                [jobs.get_retry_delay(attempt) for attempt in range(1, 6)],
+                [10, 20, 40, 60, 60],
+            )
+
+    def test_unknown_job(self):
+        """Test jobs naming no job function fail without retries."""
+        Job.objects.create(name='core.tests.test_jobs.missing',
+                           max_attempts=5)
+
+        jobs.run(jobs.claim(1, 'w')[0])
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('Unknown job', job.last_error)
+
+    def test_requeue_stale(self):
+        """Test jobs of a dead worker are queued again or failed."""
+        old = timezone.now() - timedelta(hours=1)
+        for attempts in [1, 2]:
+            Job.objects.create(name='x', max_attempts=2, attempts=attempts,
+                               status=Job.RUNNING, locked_at=old)
+        Job.objects.create(name='x', max_attempts=2, attempts=1,
+                           status=Job.RUNNING, locked_at=timezone.now())
+
+        self.assertEqual(jobs.requeue_stale(600), 2)
+
+        self.assertEqual(
+            list(Job.objects.order_by('id').values_list('status', flat=True)),
+            [Job.QUEUED, Job.FAILED, Job.RUNNING],
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class WorkerTests(JobTestMixin, TransactionTestCase):
+    """Test workers sharing the queue."""
+
+    def test_claim_skips_locked_jobs(self):
+        """Test jobs locked by another worker's claim are skipped."""
+        first = record.delay(1)
+        record.delay(2)
+        locked = threading.Event()
+        done = threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                Job.objects.select_for_update().get(id=first.id)
+                locked.set()
+                done.wait(5)
+            connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait(5)
+        try:
+            claimed = jobs.claim(10, 'w')
+        finally:
+            done.set()
+            thread.join()
+
+        self.assertEqual([job.args for job in claimed], [[2]])
+
+    def test_run_worker_burst(self):
+        """Test a burst worker runs every due job on its threads."""
+        for i in range(10):
+            record.delay(i)
+        out = StringIO()
+
+        call_command('run_worker', threads=3, burst=True, stdout=out)
+
+        self.assertEqual(sorted(args[0] for args, _ in calls), list(range(10)))
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('stopped', out.getvalue())
@@ -0,0 +1,169 @@
+"""
+Tests for the compression middleware.
+"""
+import gzip
+import zlib
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.models import Recipe
+
+
+BODY = b'{"title": "Pasta"}' * 200
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test compressing responses."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, response, accept='gzip, deflate'):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING=accept))
+
+    def test_compresses_with_gzip(self):
+        """Test a large JSON body is gzipped and marked so."""
+        res = self.get(HttpResponse(BODY, content_type='application/json'))
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertEqual(gzip.decompress(res.content), BODY)
+
+    def test_skips_small_body(self):
+        """Test bodies under COMPRESSION_MIN_SIZE are left alone."""
+        res = self.get(HttpResponse(b'{}', content_type='application/json'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, b'{}')
+
+    def test_skips_other_content_types(self):
+        """Test content types outside the list are left alone."""
+        res = self.get(HttpResponse(BODY, content_type='image/png'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_skips_without_accept_encoding(self):
+        """Test clients not accepting an encoding get the plain body."""
+        for accept in ['', 'identity', 'gzip;q=0']:
+            with self.subTest(accept=accept):
+                res = self.get(
+                    HttpResponse(BODY, content_type='application/json'),
+                    accept,
+                )
+
+                self.assertFalse(res.has_header('Content-Encoding'))
+                self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_weakens_etag(self):
+        """Test a strong ETag becomes weak, a weak one is kept."""
+        for etag, expected in [('"abc"', 'W/"abc"'), ('W/"abc"', 'W/"abc"')]:
+            with self.subTest(etag=etag):
+                response = HttpResponse(BODY, content_type='application/json')
+                response['ETag'] = etag
+
+                self.assertEqual(self.get(response)['ETag'], expected)
+
+    @patch.dict(compression.COMPRESSORS, {
+        'br': compression.GzipCompressor,
+        'zstd': compression.GzipCompressor,
+    })
+    def test_prefers_configured_order(self):
+        """Test the first configured encoding the client accepts wins."""
+        for accept, expected in [
+            ('gzip, br, zstd', 'br'),
+            ('gzip, zstd', 'zstd'),
+            ('br;q=0, *', 'zstd'),
+        ]:
+            with self.subTest(accept=accept):
+                res = self.get(
+                    HttpResponse(BODY, content_type='application/json'),
+                    accept,
+                )
+
+                self.assertEqual(res['Content-Encoding'], expected)
+
+    def test_unavailable_encodings_skipped(self):
+        """Test encodings whose package is missing are not used."""
+        with patch.dict(compression.COMPRESSORS, {'br': None}):
+            res = self.get(
+                HttpResponse(BODY, content_type='application/json'),
+                'br, gzip',
+            )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+    def test_streaming(self):
+        """Test streamed bodies are compressed chunk by chunk."""
+        chunks = [b'{"title": "Pasta %d"}\n' % i for i in range(5000)]
+        response = StreamingHttpResponse(
+            iter(chunks),
+            content_type='application/x-ndjson',
+        )
+        response['Content-Length'] = str(sum(map(len, chunks)))
+
+        with self.settings(COMPRESSION_STREAM_FLUSH_SIZE=1024):
+            res = self.get(response)
+            parts = list(res.streaming_content)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(res.has_header('Content-Length'))
+        self.assertGreater(len(parts), 10)
+        # What has been sent so far decodes without the rest.
+        sent = zlib.decompressobj(31).decompress(b''.join(parts[:10]))
+        self.assertGreater(len(sent), 1024)
+        self.assertTrue(b''.join(chunks).startswith(sent))
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
+
+    def test_async(self):
+        """Test the middleware runs in an async stack."""
+        async def get_response(request):
+            return HttpResponse(BODY, content_type='application/json')
+
+        middleware = CompressionMiddleware(get_response)
+        res = async_to_sync(middleware)(
+            self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        )
+
+        self.assertEqual(gzip.decompress(res.content), BODY)
+
+
+class CompressionApiTests(TestCase):
+    """Test compression of API responses."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        for i in range(30):
+            Recipe.objects.create(user=self.user, title='Recipe %d' % i,
+                                  price=i)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_conditional_request_with_weak_etag(self):
+        """Test the weakened ETag of a compressed list still matches."""
+        url = reverse('recipe:recipe-list')
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertTrue(res['ETag'].startswith('W/'))
+
+        res = self.client.get(
+            url,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+
+        self.assertEqual(res.status_code, 304)
@@ -0,0 +1,189 @@
+"""
+Tests for the database connection pool.
+"""
+import sqlite3
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.db import connection, connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from core import metrics
+from core.db.health import check_database, ping
+from core.db.pool import ConnectionPool
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test pooling plain DB-API connections."""
+
+    def setUp(self):
+        metrics.reset()
+
+    def connect(self):
+        return sqlite3.connect(':memory:', check_same_thread=False)
+
+    def test_reuses_released_connection(self):
+        """Test a released connection is handed out again."""
+        pool = ConnectionPool()
+        first = pool.get(self.connect)
+        pool.put(first)
+
+        second = pool.get(self.connect)
+
+        self.assertIs(second, first)
+        self.assertEqual(metrics.get_counters()['db_pool.opened'], 1)
+        self.assertEqual(metrics.get_counters()['db_pool.checkout'], 2)
+
+    def test_recycles_after_max_uses(self):
+        """Test a connection is closed after max_uses checkouts."""
+        pool = ConnectionPool(max_uses=2)
+        first = pool.get(self.connect)
+        pool.put(first)
+        pool.put(pool.get(self.connect))
+
+        third = pool.get(self.connect)
+
+        self.assertIsNot(third, first)
+        self.assertFalse(ping(first))
+        self.assertEqual(metrics.get_counters()['db_pool.recycled'], 1)
+
+    def test_recycles_after_max_lifetime(self):
+        """Test a connection older than max_lifetime is not reused."""
+        pool = ConnectionPool(max_lifetime=0)
+        first = pool.get(self.connect)
+        pool.put(first)
+
+        self.assertIsNot(pool.get(self.connect), first)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_drops_connection_failing_health_check(self):
+        """Test an idle connection that fails the health check is dropped."""
+        pool = ConnectionPool(health_check_interval=0)
+        first = pool.get(self.connect)
+        pool.put(first)
+        first.close()
+
+        second = pool.get(self.connect)
+
+        self.assertIsNot(second, first)
+        self.assertTrue(ping(second))
+        self.assertEqual(metrics.get_counters()['db_pool.broken'], 1)
+
+    def test_reset_failure_discards_connection(self):
+        """Test a connection reset() rejects is closed, not pooled."""
+        pool = ConnectionPool(reset=lambda connection: False)
+        pool.put(pool.get(self.connect))
+
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_caps_open_connections(self):
+        """Test get() times out when max_size connections are out."""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        held = pool.get(self.connect)
+
+        with self.assertRaises(OperationalError):
+            pool.get(self.connect)
+
+        pool.put(held)
+        self.assertIs(pool.get(self.connect), held)
+        self.assertEqual(metrics.get_counters()['db_pool.timeout'], 1)
+
+    def test_failed_connect_releases_slot(self):
+        """Test a connect() error does not leak a pool slot."""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        def connect():
+            raise OperationalError('down')
+
+        with self.assertRaises(OperationalError):
+            pool.get(connect)
+
+        self.assertIsNotNone(pool.get(self.connect))
+
+
+class HealthCheckTests(TestCase):
+    """Test the shared database health check."""
+
+    def test_check_database(self):
+        """Test the default database passes the health check."""
+        check_database('default')
+
+    @patch('core.db.health.ping', return_value=False)
+    def test_check_database_unhealthy(self, patched_ping):
+        """Test a connection failing ping is closed and reported."""
+        wrapper = MagicMock()
+
+        with patch.dict('core.db.health.connections', {'default': wrapper}):
+            with self.assertRaises(OperationalError):
+                check_database('default')
+
+        patched_ping.assert_called_once_with(wrapper.connection)
+        wrapper.close.assert_called_once_with()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class PooledBackendTests(TestCase):
+    """Test the pooled PostgreSQL backend."""
+
+    def test_close_returns_connection_to_pool(self):
+        """Test closing and reconnecting reuses the same connection."""
+        wrapper = connections['default'].__class__(
+            connection.settings_dict,
+            alias='pool_test',
+        )
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(wrapper.pool.stats()['in_use'], 1)
+        wrapper.close()
+        self.assertEqual(wrapper.pool.stats()['in_use'], 0)
+
+    def test_released_transaction_is_rolled_back(self):
+        """Test a connection closed mid-transaction is reset."""
+        wrapper = connections['default'].__class__(
+            connection.settings_dict,
+            alias='pool_test',
+        )
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertTrue(wrapper.get_autocommit())
+        self.assertTrue(ping(raw))
+        wrapper.close()
+
+    def test_released_session_is_discarded(self):
+        """Test session state does not leak to the next borrower."""
+        wrapper = connections['default'].__class__(
+            connection.settings_dict,
+            alias='pool_test',
+        )
+        wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SET statement_timeout = '1234ms'")
+            cursor.execute('CREATE TEMPORARY TABLE leftover (id int)')
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            self.assertNotEqual(cursor.fetchone()[0], '1234ms')
+            cursor.execute("SELECT to_regclass('pg_temp.leftover')")
+            self.assertIsNone(cursor.fetchone()[0])
+            cursor.execute('SHOW TIME ZONE')
+            self.assertEqual(cursor.fetchone()[0], 'UTC')
+        wrapper.close()
@@ -0,0 +1,105 @@
+"""
+Tests for the orjson renderer and parser.
+"""
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+SAMPLE = ReturnDict({
+    'next': None,
+    'results': ReturnList([{
+        'id': 1,
+        'title': 'Pâté \u2028\u2029 \U0001f35d',
+        'price': Decimal('5.50'),
+        'ratio': 0.1,
+        'created': datetime.datetime(
+            2021, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc,
+        ),
+        'naive': datetime.datetime(2021, 5, 1, 12, 30),
+        'day': datetime.date(2021, 5, 1),
+        'time': datetime.time(8, 15),
+        'duration': datetime.timedelta(minutes=90),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'tags': {'pasta'},
+    }], serializer=None),
+}, serializer=None)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test ORJSONRenderer matches JSONRenderer."""
+
+    def assertRendersLike(self, data, *args):
+        self.assertEqual(
+            ORJSONRenderer().render(data, *args),
+            JSONRenderer().render(data, *args),
+        )
+
+    def test_same_output(self):
+        """Test decimals, datetimes and other types render the same."""
+        self.assertRendersLike(SAMPLE)
+
+    def test_indent(self):
+        """Test indented output is left to JSONRenderer."""
+        self.assertRendersLike(SAMPLE, 'application/json; indent=4')
+        self.assertRendersLike(SAMPLE, None, {'indent': 2})
+
+    def test_unsupported_data_falls_back(self):
+        """Test data orjson rejects is rendered by JSONRenderer."""
+        self.assertRendersLike({'big': 2 ** 70, 1: 'one'})
+
+    def test_none(self):
+        """Test None renders as an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    @patch('core.renderers.orjson', None)
+    def test_without_orjson(self):
+        """Test the stdlib is used when orjson is not installed."""
+        self.assertRendersLike(SAMPLE)
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test ORJSONParser matches JSONParser."""
+
+    def parse(self, parser, content, encoding='utf-8'):
+        return parser.parse(io.BytesIO(content), parser_context={
+            'encoding': encoding,
+        })
+
+    def test_same_output(self):
+        """Test documents parse the same as with JSONParser."""
+        content = ORJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(
+            self.parse(ORJSONParser(), content),
+            self.parse(JSONParser(), content),
+        )
+
+    def test_invalid_json(self):
+        """Test invalid JSON and NaN raise ParseError."""
+        for content in [b'{"title": ', b'{"price": NaN}']:
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    self.parse(ORJSONParser(), content)
+
+    def test_other_encoding(self):
+        """Test non UTF-8 requests are parsed by JSONParser."""
+        content = '{"title": "Pâté"}'.encode('latin-1')
+
+        self.assertEqual(
+            self.parse(ORJSONParser(), content, 'latin-1'),
+            {'title': 'Pâté'},
+        )
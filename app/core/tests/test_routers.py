@@ -0,0 +1,127 @@
+"""
+Tests for the read replica router.
+"""
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.models import Recipe
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the routing decisions."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads outside replica_reads() are not routed."""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_use_one_replica_per_block(self):
+        """Test every read of a block goes to the same replica."""
+        with routers.replica_reads(1):
+            alias = self.router.db_for_read(Recipe)
+            aliases = {self.router.db_for_read(Recipe) for _ in range(20)}
+
+        self.assertIn(alias, settings.DATABASE_REPLICAS)
+        self.assertEqual(aliases, {alias})
+
+    def test_recent_writer_reads_primary(self):
+        """Test a user who just wrote reads from the primary."""
+        routers.record_write(1)
+
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+        with routers.replica_reads(2):
+            self.assertIsNotNone(self.router.db_for_read(Recipe))
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        """Test reads return to replicas after the sticky window."""
+        routers.record_write(1)
+
+        with routers.replica_reads(1):
+            self.assertIsNotNone(self.router.db_for_read(Recipe))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test reads stay on the primary without replicas."""
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test writes are not routed and replicas are never migrated."""
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_write(Recipe))
+
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Set DB_REPLICA_HOSTS to run.')
+class ReplicaReadsTests(TransactionTestCase):
+    """Test the recipe API against a configured replica.
+
+    Replicas mirror the default test database, so the test commits its
+    writes (TransactionTestCase) for the replica connections to see them.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='replica@example.com',
+            password='Testpass123',
+        )
+        Recipe.objects.create(user=self.user, title='Replicated', price=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def capture(self):
+        """Return query captures for the primary and every replica."""
+        return {
+            alias: CaptureQueriesContext(connections[alias])
+            for alias in ['default'] + settings.DATABASE_REPLICAS
+        }
+
+    def test_list_reads_from_replica(self):
+        """Test the recipe list is read from a replica."""
+        captures = self.capture()
+        for capture in captures.values():
+            capture.__enter__()
+        try:
+            res = self.client.get(reverse('recipe:recipe-list'))
+        finally:
+            for capture in captures.values():
+                capture.__exit__(None, None, None)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Replicated')
+        self.assertEqual(len(captures['default']), 0)
+        self.assertTrue(any(
+            len(captures[alias]) for alias in settings.DATABASE_REPLICAS
+        ))
+
+    def test_list_after_write_reads_from_primary(self):
+        """Test a user reads their own write from the primary."""
+        self.client.post(
+            reverse('recipe:recipe-list'),
+            {'title': 'Fresh', 'price': '2.00'},
+        )
+
+        with CaptureQueriesContext(connections['default']) as queries:
+            res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.data['results'][0]['title'], 'Fresh')
+        self.assertGreater(len(queries), 0)
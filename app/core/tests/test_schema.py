@@ -0,0 +1,107 @@
+"""
+Tests for the precomputed OpenAPI schema.
+"""
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.test import APIRequestFactory
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaViewTests(TestCase):
+    """Test serving the schema."""
+
+    def setUp(self):
+        schema.clear_cache()
+        self.schema_dir = tempfile.TemporaryDirectory()
+        settings = override_settings(SCHEMA_DIR=self.schema_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.schema_dir.cleanup)
+        self.addCleanup(schema.clear_cache)
+
+    def get_expected(self, accept):
+        """Return the schema as rendered by SpectacularAPIView."""
+        request = APIRequestFactory().get(SCHEMA_URL, HTTP_ACCEPT=accept)
+        response = SpectacularAPIView.as_view()(request)
+        return response.render().content
+
+    def test_same_as_spectacular(self):
+        """Test every format matches the generated schema."""
+        for accept in [
+            'application/vnd.oai.openapi',
+            'application/vnd.oai.openapi+json',
+            'application/json',
+        ]:
+            with self.subTest(accept=accept):
+                res = self.client.get(SCHEMA_URL, HTTP_ACCEPT=accept)
+
+                self.assertEqual(res.content, self.get_expected(accept))
+                self.assertTrue(res['Content-Type'].startswith(accept))
+
+    def test_generated_once(self):
+        """Test the schema is memoized without a build_schema file."""
+        with patch(
+            'core.schema.generate_schema',
+            wraps=schema.generate_schema,
+        ) as generate:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+    def test_serves_build_schema_file(self):
+        """Test the files of build_schema are served without generating."""
+        call_command('build_schema', stdout=open(os.devnull, 'w'))
+        schema.clear_cache()
+
+        with patch('core.schema.generate_schema') as generate:
+            res = self.client.get(SCHEMA_URL)
+
+        generate.assert_not_called()
+        with open(schema.get_schema_path('yaml'), 'rb') as schema_file:
+            self.assertEqual(res.content, schema_file.read())
+        self.assertEqual(res.content, self.get_expected(
+            'application/vnd.oai.openapi'
+        ))
+
+    def test_file_not_used_for_other_language(self):
+        """Test ?lang= generates the schema in that language."""
+        with open(schema.get_schema_path('yaml'), 'wb') as schema_file:
+            schema_file.write(b'stale')
+
+        self.assertEqual(self.client.get(SCHEMA_URL).content, b'stale')
+        res = self.client.get(SCHEMA_URL, {'lang': 'de'})
+
+        self.assertIn(b'openapi:', res.content)
+
+    def test_etag(self):
+        """Test the schema has an ETag and honours If-None-Match."""
+        res = self.client.get(SCHEMA_URL)
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+
+    def test_code_version_keys_memo(self):
+        """Test a new CODE_VERSION generates the schema again."""
+        with patch(
+            'core.schema.generate_schema',
+            wraps=schema.generate_schema,
+        ) as generate:
+            self.client.get(SCHEMA_URL)
+            with override_settings(CODE_VERSION='next'):
+                self.client.get(SCHEMA_URL)
+
+        self.assertEqual(generate.call_count, 2)
@@ -0,0 +1,104 @@
+"""
+Tests for seeding synthetic users and recipes.
+"""
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core import seeding
+from core.models import Recipe
+
+
+def get_recipes(prefix):
+    return list(
+        Recipe.objects.filter(user__email__startswith=prefix)
+        .order_by('id')
+        .values_list('user__email', 'title', 'time_in_minutes', 'price',
+                     'description', 'link')
+    )
+
+
+class SeedTests(TestCase):
+    """Test seed() and the seed_recipes command."""
+
+    def test_seed(self):
+        """Test users get recipes and share the seeded password."""
+        users = seeding.seed(3, recipes_per_user=2, prefix='a-', copy=False)
+
+        self.assertEqual(
+            [user.email for user in users],
+            ['a-0@example.com', 'a-1@example.com', 'a-2@example.com'],
+        )
+        self.assertTrue(users[0].check_password(seeding.SEED_PASSWORD))
+        for user in users:
+            self.assertEqual(user.recipe_set.count(), 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_copy_fires_search_trigger(self):
+        """Test rows inserted with COPY get their search vector."""
+        users = seeding.seed(1, recipes_per_user=2, prefix='s-', copy=True)
+
+        recipe = Recipe.objects.filter(user=users[0]).first()
+        self.assertIsNotNone(recipe.search_vector)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_copy_matches_bulk_create(self):
+        """Test both insert paths store the same rows."""
+        seeding.seed(2, recipes_per_user=3, prefix='c-', copy=True)
+        seeding.seed(2, recipes_per_user=3, prefix='b-', copy=False)
+
+        self.assertEqual(
+            [row[1:] for row in get_recipes('c-')],
+            [row[1:] for row in get_recipes('b-')],
+        )
+
+    def test_deterministic(self):
+        """Test the rows only depend on the arguments."""
+        seeding.seed(2, recipes_per_user=3, prefix='d-')
+        rows = get_recipes('d-')
+        get_user_model().objects.filter(email__startswith='d-').delete()
+        seeding.seed(2, recipes_per_user=3, prefix='d-')
+
+        self.assertEqual(get_recipes('d-'), rows)
+        seeding.seed(2, recipes_per_user=3, seed=1, prefix='e-')
+        self.assertNotEqual(
+            [row[1:] for row in get_recipes('e-')],
+            [row[1:] for row in rows],
+        )
+
+    def test_top_up(self):
+        """Test existing users are kept and only new ones are added."""
+        seeding.seed(2, recipes_per_user=1, prefix='t-')
+        users = seeding.seed(3, recipes_per_user=1, prefix='t-')
+
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(len(get_recipes('t-')), 3)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_copy_escapes_values(self):
+        """Test COPY's special characters are stored as given."""
+        users = seeding.seed(1, prefix='x-')
+        title = 'Tab\there, newline\n, \\N and \\t'
+        row = (users[0].id, title, 5, '1.00', '', '', timezone.now())
+
+        seeding.copy_rows(
+            connection, Recipe._meta.db_table, seeding.RECIPE_COLUMNS, [row],
+        )
+
+        self.assertEqual(Recipe.objects.get(user=users[0]).title, title)
+
+    def test_seed_recipes_command(self):
+        """Test the command seeds users with their recipes."""
+        out = StringIO()
+        call_command(
+            'seed_recipes', users=2, recipes_per_user=4, prefix='cmd-',
+            stdout=out,
+        )
+
+        self.assertEqual(len(get_recipes('cmd-')), 8)
+        self.assertIn('2 users under cmd-', out.getvalue())
@@ -0,0 +1,105 @@
+"""
+Tests for the query budget test utilities.
+"""
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.testing import (
+    QueryBudgetMixin,
+    find_repeated_queries,
+    get_sql_shape,
+    query_budget,
+)
+
+
+class SqlShapeTests(SimpleTestCase):
+    """Test grouping queries by shape."""
+
+    def test_literals_replaced(self):
+        """Test strings, numbers and lists of them become ?."""
+        self.assertEqual(
+            get_sql_shape(
+                "SELECT * FROM \"core_recipe\" WHERE (\"title\" = 'it''s' "
+                "AND \"id\" IN (1, 2, 3) AND \"price\" > -1.5 "
+                "AND \"t2\".\"id\" = 7)"
+            ),
+            "SELECT * FROM \"core_recipe\" WHERE (\"title\" = ? "
+            "AND \"id\" IN (?) AND \"price\" > ? AND \"t2\".\"id\" = ?)",
+        )
+
+    def test_find_repeated_queries(self):
+        """Test shapes repeated up to the threshold are reported."""
+        queries = [
+            {'sql': 'SELECT * FROM "core_user" WHERE "id" = %d' % i}
+            for i in range(3)
+        ] + [
+            {'sql': 'SAVEPOINT "s1_x%d"' % i} for i in range(3)
+        ]
+
+        self.assertEqual(find_repeated_queries(queries), {
+            'SELECT * FROM "core_user" WHERE "id" = ?': 3,
+        })
+        self.assertEqual(find_repeated_queries(queries, threshold=4), {})
+
+
+class QueryBudgetTests(TestCase):
+    """Test query_budget() and QueryBudgetMixin."""
+
+    def setUp(self):
+        # Cached responses are keyed by user pk, which may be reused.
+        cache.clear()
+        for i in range(3):
+            user = get_user_model().objects.create_user(
+                email='user%d@example.com' % i,
+                password='testpass123',
+            )
+            Recipe.objects.create(user=user, title='Recipe', price=1)
+
+    def test_n_plus_one_detected(self):
+        """Test reading a relation per row fails."""
+        with self.assertRaisesRegex(AssertionError, 'N\\+1'):
+            with query_budget():
+                [recipe.user.email for recipe in Recipe.objects.all()]
+
+        with query_budget(1):
+            [
+                recipe.user.email
+                for recipe in Recipe.objects.select_related('user')
+            ]
+
+    def test_budget_exceeded(self):
+        """Test more queries than the budget fails."""
+        with self.assertRaisesRegex(AssertionError, 'over its budget of 1'):
+            with query_budget(1):
+                Recipe.objects.count()
+                Recipe.objects.exists()
+
+    def test_mixin_checks_requests(self):
+        """Test the mixin applies the budget of the requested view."""
+        # A plain unittest case, leaving the database to this test.
+        class Tests(QueryBudgetMixin, unittest.TestCase):
+            query_budgets = {('GET', 'recipe:recipe-list'): 0}
+
+            def runTest(self):
+                client = APIClient()
+                client.force_authenticate(
+                    get_user_model().objects.get(email='user0@example.com')
+                )
+                client.get(reverse('recipe:recipe-list'))
+
+        result = unittest.TestResult()
+        # Run as a suite, which sets the class up.
+        unittest.TestSuite([Tests('runTest')]).run(result)
+
+        self.assertEqual(len(result.failures), 1)
+        self.assertIn(
+            'GET recipe:recipe-list made 2 queries, over its budget of 0',
+            result.failures[0][1],
+        )
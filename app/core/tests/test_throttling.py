@@ -0,0 +1,195 @@
+"""
+Tests for rate limiting.
+"""
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics, throttling
+from core.authentication import CachedTokenAuthentication
+from core.middleware import ThrottleMiddleware
+
+TOKEN_URL = reverse('user:token')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class TakeTests(SimpleTestCase):
+    """Test taking tokens from buckets."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Test rates are read as requests per period in seconds."""
+        self.assertEqual(throttling.parse_rate('10/m'), (10, 60))
+        self.assertEqual(throttling.parse_rate('5/min'), (5, 60))
+        self.assertEqual(throttling.parse_rate('100/day'), (100, 86400))
+
+    def test_burst_then_refill(self):
+        """Test a full bucket allows a burst, then one per interval."""
+        for take in [throttling.take, async_to_sync(throttling.atake)]:
+            with self.subTest(take=take):
+                cache.clear()
+
+                self.assertEqual(
+                    [take('k', (3, 30), now=100) for _ in range(3)],
+                    [0, 0, 0],
+                )
+                self.assertEqual(take('k', (3, 30), now=100), 10)
+                self.assertEqual(take('k', (3, 30), now=105), 5)
+                self.assertEqual(take('k', (3, 30), now=110), 0)
+                self.assertEqual(take('k', (3, 30), now=110), 10)
+
+    def test_rejects_take_nothing(self):
+        """Test rejected requests do not delay the next token."""
+        for _ in range(10):
+            throttling.take('k', (1, 10), now=100)
+
+        self.assertEqual(throttling.take('k', (1, 10), now=110), 0)
+
+    def test_idle_bucket_is_full(self):
+        """Test a bucket left idle for a period allows a full burst."""
+        for _ in range(2):
+            throttling.take('k', (2, 10), now=100)
+
+        self.assertEqual(
+            [throttling.take('k', (2, 10), now=200) for _ in range(3)],
+            [0, 0, 5],
+        )
+
+    def test_single_value_per_bucket(self):
+        """Test a bucket is a single integer."""
+        for _ in range(5):
+            throttling.take('k', (10, 10))
+
+        self.assertIsInstance(cache.get('k'), int)
+
+
+@override_settings(THROTTLE_NUM_PROXIES=0)
+class ScopeKeyTests(SimpleTestCase):
+    """Test identifying clients."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_ip(self):
+        """Test ip buckets use the client address."""
+        request = self.factory.get(
+            '/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4',
+        )
+
+        self.assertEqual(
+            throttling.get_scope_key(request, 'ip'), 'ip:10.0.0.1',
+        )
+        with self.settings(THROTTLE_NUM_PROXIES=1):
+            self.assertEqual(
+                throttling.get_scope_key(request, 'ip'), 'ip:1.2.3.4',
+            )
+
+    def test_user(self):
+        """Test user buckets use the known token, or else the address."""
+        request = self.factory.get(
+            '/', REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Token abc',
+        )
+
+        self.assertTrue(
+            throttling.get_scope_key(request, 'user', 'abc')
+            .startswith('token:'),
+        )
+        self.assertNotEqual(throttling.get_scope_key(request, 'user', 'abc'),
+                            throttling.get_scope_key(request, 'user', 'abd'))
+        self.assertEqual(throttling.get_scope_key(request, 'user'),
+                         'ip:10.0.0.1')
+
+
+@override_settings(THROTTLE_RATES={
+    'user:token': {'ip': '2/m'},
+    'recipe:recipe-list': {'user': '1/m', 'ip': ''},
+})
+class ThrottleMiddlewareTests(TestCase):
+    """Test throttling API requests."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+
+    def create_token(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        return Token.objects.create(user=user)
+
+    def test_token_throttled_per_ip(self):
+        """Test requests over the limit get 429 with Retry-After."""
+        payload = {'email': 'test@example.com', 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+        self.assertIn('throttled', res.json()['detail'])
+        self.assertEqual(metrics.get_counters()['throttle.rejected'], 1)
+
+        other = self.client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_throttled_before_authentication(self):
+        """Test rejected requests never reach the database."""
+        token = self.create_token()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        # The first request, before the token is known, counts for the
+        # address; the next for the token.
+        for _ in range(2):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_unknown_tokens_share_address_bucket(self):
+        """Test made-up tokens do not each get a bucket of their own."""
+        token = self.create_token()
+        CachedTokenAuthentication().authenticate_credentials(token.key)
+        codes = []
+        for i in range(3):
+            self.client.credentials(HTTP_AUTHORIZATION='Token bogus%d' % i)
+            codes.append(self.client.get(RECIPES_URL).status_code)
+
+        self.assertEqual(codes, [401, 429, 429])
+        # A valid token still has a bucket of its own.
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_async(self):
+        """Test the middleware runs in an async stack."""
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = ThrottleMiddleware(get_response)
+        request = RequestFactory().post(TOKEN_URL)
+        codes = [
+            async_to_sync(middleware)(request).status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(codes, [200, 200, 429])
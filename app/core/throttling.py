@@ -0,0 +1,182 @@
+"""
+Rate limiting with GCRA buckets kept in the cache.
+
+Each bucket is a single integer: its theoretical arrival time (TAT) in
+milliseconds, the time at which it would be full again. A request adds
+one emission interval (period / requests) to it with an atomic
+cache.incr() and is allowed while the TAT stays within one period of
+now, so a bucket holds `requests` tokens and refills one per interval.
+Rejected requests take their interval back. The key expires when the
+bucket is full again, so idle clients cost no memory; one used after
+its TAT but before the cache evicted it is moved forward to now.
+
+Unlike DRF's throttles, which keep a list of request timestamps per
+client, every check is two cache calls on a constant-size value.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.authentication import get_authorization_header
+
+from core.aio import acache_call
+from core.authentication import (
+    get_current_token,
+    get_token_cache,
+    token_cache_key,
+    token_generation_key,
+)
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) for a rate such as '10/min'."""
+    requests, period = rate.split('/')
+    return int(requests), RATE_PERIODS[period[0]]
+
+
+def get_cache():
+    """Return the cache backend holding the buckets."""
+    return caches[settings.THROTTLE_CACHE_ALIAS]
+
+
+def get_ident(request):
+    """Return the client address, per THROTTLE_NUM_PROXIES."""
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded and settings.THROTTLE_NUM_PROXIES:
+        addresses = forwarded.split(',')
+        return addresses[-min(settings.THROTTLE_NUM_PROXIES,
+                              len(addresses))].strip()
+
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_token(request):
+    """Return the API token key presented by request, if any."""
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    try:
+        return auth[1].decode()
+    except UnicodeError:
+        return None
+
+
+def get_known_token(request):
+    """Return the token of request if it is cached as valid."""
+    key = get_token(request)
+    if key is None:
+        return None
+
+    values = get_token_cache().get_many(
+        [token_cache_key(key), token_generation_key(key)],
+    )
+    return key if get_current_token(values, key) else None
+
+
+async def aget_known_token(request):
+    """Async get_known_token()."""
+    key = get_token(request)
+    if key is None:
+        return None
+
+    values = await acache_call(
+        get_token_cache(), 'get_many',
+        [token_cache_key(key), token_generation_key(key)],
+    )
+    return key if get_current_token(values, key) else None
+
+
+def get_scope_key(request, scope, token=None):
+    """Return what identifies the client of request within scope.
+
+    Throttling runs before authentication, so 'user' buckets are keyed
+    by token only when get_known_token() found it valid in the
+    authentication cache. Other requests, made-up tokens included, use
+    the bucket of their address.
+    """
+    if scope == 'user':
+        if token:
+            return 'token:%s' % hashlib.sha256(token.encode()).hexdigest()
+    elif scope != 'ip':
+        raise ValueError('Unknown throttle scope %r.' % scope)
+
+    return 'ip:%s' % get_ident(request)
+
+
+def get_buckets(request, view_name, token=None):
+    """Return (key, rate) for each bucket a request to view_name uses."""
+    rates = settings.THROTTLE_RATES.get(view_name, {})
+    return [
+        (
+            'throttle:%s:%s' % (
+                view_name, get_scope_key(request, scope, token),
+            ),
+            parse_rate(rate),
+        )
+        for scope, rate in rates.items() if rate
+    ]
+
+
+def _params(rate, now):
+    requests, period = rate
+    now = int((time.time() if now is None else now) * 1000)
+    return now, period * 1000 // requests, period * 1000
+
+
+def _timeout(milliseconds):
+    return math.ceil(milliseconds / 1000)
+
+
+def take(key, rate, now=None):
+    """Take a token from the bucket at key.
+
+    Returns 0 if allowed, else the seconds until a token is available.
+    """
+    cache = get_cache()
+    now, interval, limit = _params(rate, now)
+    while True:
+        try:
+            tat = cache.incr(key, interval)
+            break
+        except ValueError:
+            # Expired, so full: start a new bucket.
+            if cache.add(key, now + interval, _timeout(interval)):
+                return 0
+
+    if tat - interval < now:
+        tat = cache.incr(key, now + interval - tat)
+    if tat - now > limit:
+        cache.incr(key, -interval)
+        return (tat - limit - now) / 1000
+
+    cache.touch(key, _timeout(tat - now))
+    return 0
+
+
+async def atake(key, rate, now=None):
+    """Async take()."""
+    cache = get_cache()
+    now, interval, limit = _params(rate, now)
+    while True:
+        try:
+            tat = await acache_call(cache, 'incr', key, interval)
+            break
+        except ValueError:
+            if await acache_call(
+                cache, 'add', key, now + interval, _timeout(interval),
+            ):
+                return 0
+
+    if tat - interval < now:
+        tat = await acache_call(cache, 'incr', key, now + interval - tat)
+    if tat - now > limit:
+        await acache_call(cache, 'incr', key, -interval)
+        return (tat - limit - now) / 1000
+
+    await acache_call(cache, 'touch', key, _timeout(tat - now))
+    return 0
@@ -0,0 +1,28 @@
+"""
+Views of the core app.
+"""
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core import metrics as core_metrics
+
+
+@require_GET
+def metrics(request):
+    """Export core.metrics for Prometheus, given the METRICS_TOKEN."""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not constant_time_compare(
+            authorization, 'Bearer %s' % settings.METRICS_TOKEN):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    return HttpResponse(
+        core_metrics.to_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
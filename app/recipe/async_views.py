@@ -0,0 +1,149 @@
+"""
+Async views for the recipe API, routed in place of the list and detail
+routes of RetrieveRecipeView when served over ASGI.
+"""
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core import aio
+from core.async_views import AsyncAPIView
+from core.db import routers
+from core.models import Recipe
+from recipe.views import (
+    RetrieveRecipeView,
+    get_entry_response,
+    make_cache_entry,
+    recipe_cache,
+)
+
+
+class RecipeAPIView(AsyncAPIView):
+    """Async recipe endpoint built on RetrieveRecipeView.
+
+    The viewset supplies querysets, filters, pagination, serializers and
+    validators; only the database and cache access differ.
+    """
+
+    def get_viewset(self, request, action):
+        """Return a RetrieveRecipeView set up for request and action."""
+        return RetrieveRecipeView(
+            request=request,
+            action=action,
+            args=self.args,
+            kwargs=self.kwargs,
+            format_kwarg=None,
+        )
+
+    async def get_cached_response(self, handler, request, view):
+        """Async RetrieveRecipeView.get_cached_response()."""
+        key = await recipe_cache.amake_key(
+            request.user.pk,
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+        )
+        computed = {}
+
+        async def compute():
+            response = self.finalize_response(await handler(request, view))
+            computed['response'] = response
+            if response.status_code != status.HTTP_200_OK:
+                return None
+            return make_cache_entry(response)
+
+        entry = await recipe_cache.aget_or_compute(key, compute)
+        if 'response' in computed:
+            return computed['response']
+
+        return get_entry_response(request._request, entry)
+
+
+class RecipeListView(RecipeAPIView):
+    """List and create the user's recipes."""
+    sync_view = staticmethod(RetrieveRecipeView.as_view(
+        {'get': 'list', 'post': 'create'}
+    ))
+
+    async def get(self, request):
+        """List recipes through the per-user response cache."""
+        view = self.get_viewset(request, 'list')
+        with routers.replica_reads(request.user.pk):
+            return await self.get_cached_response(self.list, request, view)
+
+    async def list(self, request, view):
+        """Async RetrieveRecipeView.list_uncached()."""
+        stats = await aio.aaggregate(
+            Recipe.objects.filter(user=request.user),
+            count=Count('*'),
+            updated_at=Max('updated_at'),
+        )
+        etag = view.get_etag(stats['count'], stats['updated_at'])
+        response = get_conditional_response(request._request, etag=etag)
+        if response is not None:
+            return response
+
+        queryset = view.get_list_queryset()
+        paginator = view.paginator
+        page_queryset = paginator.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            rows = await aio.alist(queryset)
+            response = Response(view.serialize_list(rows))
+        else:
+            page = paginator.set_page(await aio.alist(page_queryset))
+            response = paginator.get_paginated_response(
+                view.serialize_list(page)
+            )
+
+        return view.set_validators(response, etag)
+
+    async def post(self, request):
+        """Create a recipe for the user and record the write."""
+        view = self.get_viewset(request, 'create')
+        serializer = view.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        serializer.instance = await aio.acreate(
+            Recipe.objects,
+            user=request.user,
+            **serializer.validated_data,
+        )
+        await recipe_cache.abump(request.user.pk)
+        await routers.arecord_write(request.user.pk)
+
+        headers = view.get_success_headers(serializer.data)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED,
+            headers=headers,
+        )
+
+
+class RecipeDetailView(RecipeAPIView):
+    """Retrieve a recipe; updates and deletes go to the sync view."""
+    sync_view = staticmethod(RetrieveRecipeView.as_view({
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    }))
+
+    async def get(self, request, pk):
+        """Retrieve a recipe through the per-user response cache."""
+        view = self.get_viewset(request, 'retrieve')
+        with routers.replica_reads(request.user.pk):
+            return await self.get_cached_response(
+                self.retrieve, request, view
+            )
+
+    async def retrieve(self, request, view):
+        """Async RetrieveRecipeView.retrieve_uncached()."""
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            instance = await aio.aget(queryset, pk=self.kwargs['pk'])
+        except Recipe.DoesNotExist:
+            raise Http404
+
+        return view.get_retrieve_response(instance)
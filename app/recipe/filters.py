@@ -0,0 +1,194 @@
+"""
+Filters for the recipe API.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from recipe.serializers import FIELDS_PARAM, get_requested_fields
+
+# Must match the configuration used by the search_vector trigger.
+SEARCH_CONFIG = 'english'
+
+# ts_rank is a float; it is scaled to an integer so keyset pagination can
+# seek on it exactly.
+RANK_SCALE = 1000000
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Full-text search over title and description, best matches first.
+
+    On PostgreSQL this matches the trigger maintained `search_vector`
+    through its GIN index. Other backends fall back to a case-insensitive
+    substring match, ranking title matches above description matches.
+    """
+    search_param = 'search'
+    search_description = _('Words to search for in title and description.')
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(
+                term,
+                config=SEARCH_CONFIG,
+                search_type='websearch',
+            )
+            rank = Cast(
+                SearchRank(F('search_vector'), query) * RANK_SCALE,
+                IntegerField(),
+            )
+            queryset = queryset.filter(search_vector=query)
+        else:
+            rank = Case(
+                When(title__icontains=term, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(description__icontains=term)
+            )
+
+        return queryset.annotate(rank=rank).order_by('-rank', '-id')
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.search_description),
+                'schema': {
+                    'type': 'string',
+                },
+            },
+        ]
+
+
+class RecipeFilter(BaseFilterBackend):
+    """Filter recipes on query parameters backed by the recipe indexes.
+
+    `price__range` takes two comma separated bounds, e.g. `1.00,9.50`.
+    """
+    fields = {
+        'time_in_minutes__lte': serializers.IntegerField(),
+        'price__range': serializers.ListField(
+            child=serializers.DecimalField(max_digits=5, decimal_places=2),
+            min_length=2,
+            max_length=2,
+        ),
+        'title__istartswith': serializers.CharField(max_length=255),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        lookups = {}
+        errors = {}
+        for param, field in self.fields.items():
+            if param not in request.query_params:
+                continue
+
+            value = request.query_params[param]
+            if isinstance(field, serializers.ListField):
+                value = value.split(',')
+            try:
+                lookups[param] = field.run_validation(value)
+            except serializers.ValidationError as error:
+                errors[param] = error.detail
+
+        if errors:
+            raise ValidationError(errors)
+
+        return queryset.filter(**lookups)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'schema': {
+                    'type': 'integer'
+                    if isinstance(field, serializers.IntegerField)
+                    else 'string',
+                },
+            }
+            for param, field in self.fields.items()
+        ]
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Order recipes by one of the fields that has a matching index."""
+    ordering_fields = ['id', 'price', 'time_in_minutes', 'title']
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        """Keep only the first valid field, mixed orderings are unindexed."""
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        return valid[:1]
+
+
+class RecipeFieldsFilter(BaseFilterBackend):
+    """Load only the columns of the fields requested with ?fields=.
+
+    Must run after the filters that set the ordering: the ordering
+    columns are loaded too, as keyset pagination reads them from every
+    row, along with the view's `get_required_fields()`.
+    """
+    fields_description = _(
+        'Comma separated fields to return, e.g. `id,title`.'
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        if FIELDS_PARAM not in request.query_params:
+            return queryset
+
+        fields = get_requested_fields(
+            request,
+            view.get_serializer_class().Meta.fields,
+        )
+        if fields is None:
+            return queryset
+
+        ordering = [
+            field.lstrip('-') for field in queryset.query.order_by
+            if isinstance(field, str)
+        ]
+        required = getattr(view, 'get_required_fields', list)()
+        columns = {'id'}
+        for name in fields + ordering + required:
+            try:
+                queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotations such as the search rank are always loaded.
+                continue
+            columns.add(name)
+
+        return queryset.only(*columns)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': FIELDS_PARAM,
+                'required': False,
+                'in': 'query',
+                'description': str(self.fields_description),
+                'schema': {
+                    'type': 'string',
+                },
+            },
+        ]
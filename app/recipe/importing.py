@@ -0,0 +1,273 @@
+"""
+Bulk import of recipes from CSV, NDJSON or JSON files.
+
+Files are read as a stream and validated in batches with the rules of
+RecipeDetailSerializer. On PostgreSQL valid rows are copied into a
+temporary staging table with COPY and merged into core_recipe with one
+INSERT ... SELECT; elsewhere they are inserted with bulk_create. Memory
+use depends on the batch size, not on the size of the file.
+"""
+import csv
+import io
+import json
+import re
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import ValidationError
+
+from core import seeding
+from core.models import Recipe
+from recipe.serializers import IMPORT_FORMATS, RecipeDetailSerializer
+
+# Columns loaded from the file; user_id and updated_at are set on merge.
+IMPORT_COLUMNS = ['title', 'time_in_minutes', 'price', 'description', 'link']
+
+STAGING_TABLE = 'recipe_import_staging'
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be read as the given format."""
+
+
+def get_format(filename):
+    """Return the import format matching the extension of filename."""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension == 'jsonl':
+        return 'ndjson'
+    if extension in IMPORT_FORMATS:
+        return extension
+
+    raise ImportFormatError(
+        _('Cannot tell the format of %s, expected one of: %s.')
+        % (filename, ', '.join(IMPORT_FORMATS))
+    )
+
+
+def read_rows(stream, format):
+    """Yield the rows of a binary stream, or an error per broken row."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if format == 'csv':
+            yield from read_csv(text)
+        elif format == 'ndjson':
+            yield from read_ndjson(text)
+        else:
+            yield from read_json_array(text)
+    except UnicodeDecodeError:
+        raise ImportFormatError(_('The file is not valid UTF-8.'))
+    finally:
+        # Leave the stream open for its owner.
+        text.detach()
+
+
+def read_csv(text):
+    """Yield the rows of a CSV file with a header line as dicts."""
+    try:
+        for row in csv.DictReader(text):
+            # Empty and missing cells are left out, so optional fields
+            # get their defaults; extra cells are keyed by None.
+            yield {
+                key: value for key, value in row.items()
+                if key is not None and value not in ('', None)
+            }
+    except csv.Error as error:
+        raise ImportFormatError(str(error))
+
+
+def read_ndjson(text):
+    """Yield one JSON value per non-empty line."""
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValidationError({'non_field_errors': [_('Invalid JSON.')]})
+
+
+def read_json_array(text, chunk_size=CHUNK_SIZE):
+    """Yield the items of a JSON array, reading text in chunks."""
+    yield from JSONArrayReader(text, chunk_size)
+
+
+class JSONArrayReader:
+    """Iterator over the items of a JSON array read in chunks.
+
+    Only the current chunk, and an item spanning chunks, is kept in
+    memory.
+    """
+
+    def __init__(self, text, chunk_size=CHUNK_SIZE):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        if self.peek() != '[':
+            raise ImportFormatError(_('Expected a JSON array.'))
+        self.pos += 1
+        if self.peek() == ']':
+            return
+
+        while True:
+            yield self.decode()
+            char = self.peek()
+            if char == ']':
+                return
+            if char != ',':
+                raise ImportFormatError(_('Expected , or ] in JSON array.'))
+            self.pos += 1
+            self.peek()
+
+    def fill(self):
+        """Append the next chunk to the buffer; return False at the end."""
+        chunk = self.text.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+
+        return not self.eof
+
+    def peek(self):
+        """Skip whitespace and return the next character, '' at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def decode(self):
+        """Return the value at the current position."""
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                end = None
+            # A number ending the buffer may go on in the next chunk.
+            if end is not None and (end < len(self.buffer) or self.eof):
+                self.pos = end
+                return item
+            if not self.fill() and end is None:
+                raise ImportFormatError(_('Invalid JSON array.'))
+
+
+def import_recipes(user, rows, batch_size=None, max_errors=None,
+                   reject=None, copy=None, using='default'):
+    """Validate rows and create the valid ones as recipes of user.
+
+    Returns the number of rows imported and rejected, and the errors of
+    the first max_errors rejected rows by row number. reject, if given,
+    is called with the number and errors of every rejected row.
+    """
+    batch_size = batch_size or settings.RECIPE_IMPORT_BATCH_SIZE
+    if max_errors is None:
+        max_errors = settings.RECIPE_IMPORT_MAX_ERRORS
+    connection = connections[using]
+    if copy is None:
+        copy = connection.vendor == 'postgresql'
+    serializer = RecipeDetailSerializer()
+    defaults = {
+        name: Recipe._meta.get_field(name).get_default()
+        for name in IMPORT_COLUMNS
+    }
+    result = {'imported': 0, 'rejected': 0, 'errors': []}
+
+    def validate(number, row):
+        try:
+            if isinstance(row, ValidationError):
+                raise row
+            if not isinstance(row, dict):
+                raise ValidationError({'non_field_errors': [
+                    _('Expected an object.')
+                ]})
+            data = serializer.run_validation(row)
+        except ValidationError as error:
+            result['rejected'] += 1
+            if len(result['errors']) < max_errors:
+                result['errors'].append({
+                    'row': number,
+                    'errors': error.detail,
+                })
+            if reject is not None:
+                reject(number, error.detail)
+            return None
+
+        return tuple(data.get(name, defaults[name]) for name in IMPORT_COLUMNS)
+
+    with transaction.atomic(using=using):
+        if copy:
+            create_staging_table(connection)
+        batch = []
+        for number, row in enumerate(rows, 1):
+            values = validate(number, row)
+            if values is not None:
+                batch.append(values)
+            if len(batch) == batch_size:
+                load(connection, user, batch, copy)
+                result['imported'] += len(batch)
+                batch = []
+        if batch:
+            load(connection, user, batch, copy)
+            result['imported'] += len(batch)
+        if copy:
+            merge_staging_table(connection, user)
+
+    return result
+
+
+def load(connection, user, batch, copy):
+    """Copy a batch into the staging table, or insert it."""
+    if copy:
+        seeding.copy_rows(connection, STAGING_TABLE, IMPORT_COLUMNS, batch)
+        return
+
+    Recipe.objects.using(connection.alias).bulk_create([
+        Recipe(user=user, **dict(zip(IMPORT_COLUMNS, values)))
+        for values in batch
+    ])
+
+
+def create_staging_table(connection):
+    """Create the staging table, dropped at the end of the transaction."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        '%s %s NOT NULL' % (
+            quote(name),
+            Recipe._meta.get_field(name).db_type(connection),
+        )
+        for name in IMPORT_COLUMNS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE %s (%s) ON COMMIT DROP'
+            % (quote(STAGING_TABLE), columns)
+        )
+
+
+def merge_staging_table(connection, user):
+    """Insert the staged rows as recipes of user and drop the table."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(name) for name in IMPORT_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO %s (%s, %s, %s) SELECT %%s, %%s, %s FROM %s' % (
+                quote(Recipe._meta.db_table),
+                quote('user_id'),
+                quote('updated_at'),
+                columns,
+                columns,
+                quote(STAGING_TABLE),
+            ),
+            [user.pk, timezone.now()],
+        )
+        cursor.execute('DROP TABLE %s' % quote(STAGING_TABLE))
@@ -1,19 +1,108 @@
 """"
 Serializers for recipe API.
 """
+import decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext as _
 
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
 
+from core.instrumentation import TimedSerializerMixin
 from core.models import Recipe
 
+# File formats accepted by the recipe import.
+IMPORT_FORMATS = ['csv', 'ndjson', 'json']
+
+# Query parameter naming the fields to return, e.g. ?fields=id,title.
+FIELDS_PARAM = 'fields'
+
+
+def get_requested_fields(request, available):
+    """Return the fields requested with FIELDS_PARAM, or None for all.
+
+    Only reads are trimmed. Unknown names raise ValidationError.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+
+    value = request.query_params.get(FIELDS_PARAM, '')
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        return None
+
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise serializers.ValidationError({FIELDS_PARAM: [
+            _('Unknown field(s): %s.') % ', '.join(unknown)
+        ]})
+
+    return names
+
+
+class SparseFieldsMixin:
+    """Drop the fields not named in ?fields= from the output."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = get_requested_fields(
+            self.context.get('request'),
+            self.fields,
+        )
+        if requested is not None:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class RecipeListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """Create and update many recipes with batched queries."""
+
+    def create(self, validated_data):
+        """Insert every recipe with bulk_create."""
+        recipes = [Recipe(**attrs) for attrs in validated_data]
+
+        return Recipe.objects.bulk_create(
+            recipes,
+            batch_size=settings.RECIPE_BULK_BATCH_SIZE,
+        )
+
+    def update(self, instance, validated_data):
+        """Update the recipes in instance, in order, with bulk_update."""
+        fields = set()
+        now = timezone.now()
+        for recipe, attrs in zip(instance, validated_data):
+            for attr, value in attrs.items():
+                setattr(recipe, attr, value)
+            fields.update(attrs)
+            # bulk_update skips auto_now, set it like save() would.
+            recipe.updated_at = now
+
+        if fields:
+            fields.add('updated_at')
+            Recipe.objects.bulk_update(
+                instance,
+                fields,
+                batch_size=settings.RECIPE_BULK_BATCH_SIZE,
+            )
+
+        return instance
+
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(
+    TimedSerializerMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer,
+):
     """Serializer for recipe."""
 
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_in_minutes', 'price', 'link']
         read_only_fields = ['id']
+        list_serializer_class = RecipeListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -21,3 +110,114 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
+
+
+def _compile_converter(field):
+    """Return a function equivalent to field.to_representation()."""
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.DecimalField and \
+            field.decimal_places is not None and not field.localize and \
+            getattr(field, 'coerce_to_string',
+                    api_settings.COERCE_DECIMAL_TO_STRING):
+        exponent = decimal.Decimal('.1') ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+        # str() only switches to exponent notation below 1E-6, otherwise
+        # it matches the '{:f}' DRF formats with and is faster.
+        format_ = str if field.decimal_places <= 6 else '{:f}'.format
+
+        def to_string(value):
+            if not isinstance(value, decimal.Decimal):
+                value = decimal.Decimal(str(value).strip())
+            return format_(value.quantize(exponent, rounding, context))
+
+        return to_string
+
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """Read-only output of a model serializer built from values_list() rows.
+
+    Instantiating model instances and running every DRF field per row
+    dominate the cost of large lists. This reads the same columns with
+    values_list() and applies one converter per field, compiled once
+    from the serializer's fields, so the output is identical.
+    """
+
+    def __init__(self, serializer):
+        fields = [
+            field for field in serializer.fields.values()
+            if not field.write_only
+        ]
+        self.names = [field.field_name for field in fields]
+        self.sources = [field.source for field in fields]
+        self.converters = [_compile_converter(field) for field in fields]
+
+    @classmethod
+    def supports(cls, serializer):
+        """Return whether every field of serializer is a plain column."""
+        return all(
+            field.write_only or (
+                field.source != '*' and '.' not in field.source and
+                not isinstance(field, (
+                    serializers.BaseSerializer,
+                    serializers.RelatedField,
+                    serializers.ManyRelatedField,
+                    serializers.SerializerMethodField,
+                ))
+            )
+            for field in serializer.fields.values()
+        )
+
+    def get_rows(self, queryset):
+        """Return queryset as named rows of the fields and ordering.
+
+        The ordering columns and id are read too, for keyset pagination
+        to take the cursor position from the rows.
+        """
+        ordering = [
+            field.lstrip('-') for field in queryset.query.order_by
+            if isinstance(field, str)
+        ]
+        extra = [
+            name for name in dict.fromkeys(ordering + ['id'])
+            if name not in self.sources
+        ]
+
+        return queryset.values_list(*self.sources, *extra, named=True)
+
+    def to_representation(self, rows):
+        """Return the serialized form of rows from get_rows()."""
+        columns = list(zip(self.names, self.converters))
+        return [
+            {
+                name: None if value is None else convert(value)
+                for (name, convert), value in zip(columns, row)
+            }
+            for row in rows
+        ]
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for the ids of recipes to delete in bulk."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BULK_MAX_ITEMS,
+    )
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    """Serializer for a file of recipes to import."""
+    file = serializers.FileField()
+    format = serializers.ChoiceField(
+        choices=IMPORT_FORMATS,
+        required=False,
+        help_text='Defaults to the extension of the file.',
+    )
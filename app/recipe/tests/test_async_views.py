@@ -0,0 +1,167 @@
+"""
+Tests for the async recipe views.
+"""
+import json
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.async_views import RecipeDetailView, RecipeListView
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    default = {
+        'title': 'Sample recipe title',
+        'time_in_minutes': 8,
+        'price': Decimal('132.50'),
+        'link': 'http://ex.com/recipe.pdf',
+    }
+    default.update(params)
+
+    return Recipe.objects.create(user=user, **default)
+
+
+class AsyncRecipeViewTests(TestCase):
+    """Tests for the async recipe list and detail views."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='async@example.com',
+            password='Testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.factory = AsyncRequestFactory()
+        # AsyncRequestFactory takes extra headers by their HTTP name.
+        self.auth = {'authorization': 'Token %s' % self.token.key}
+
+    async def test_list_matches_sync_view(self):
+        """Test the async list returns what the DRF view returns."""
+        await sync_to_async(create_recipe)(self.user, title='One')
+        await sync_to_async(create_recipe)(self.user, title='Two')
+
+        res = await RecipeListView.as_view()(
+            self.factory.get(RECIPES_URL, **self.auth)
+        )
+
+        await sync_to_async(cache.clear)()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        expected = await sync_to_async(client.get)(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), expected.json())
+        self.assertEqual(res['ETag'], expected['ETag'])
+
+    def test_cached_list_without_queries(self):
+        """Test a cached list and its 304 need no database queries."""
+        create_recipe(self.user)
+        view = async_to_sync(RecipeListView.as_view())
+        res = view(self.factory.get(RECIPES_URL, **self.auth))
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = view(self.factory.get(RECIPES_URL, **self.auth))
+            not_modified = view(self.factory.get(
+                RECIPES_URL,
+                **{'if-none-match': res['ETag']},
+                **self.auth,
+            ))
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+    async def test_auth_required(self):
+        """Test requests without a token are rejected."""
+        request = AsyncRequestFactory().get(RECIPES_URL)
+
+        res = await RecipeListView.as_view()(request)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    async def test_create_recipe(self):
+        """Test creating a recipe invalidates the cached list."""
+        view = RecipeListView.as_view()
+        await view(self.factory.get(RECIPES_URL, **self.auth))
+
+        res = await view(self.factory.post(
+            RECIPES_URL,
+            {'title': 'Async', 'time_in_minutes': 5, 'price': '1.50'},
+            content_type='application/json',
+            **self.auth,
+        ))
+        listed = await view(self.factory.get(RECIPES_URL, **self.auth))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = await sync_to_async(Recipe.objects.get)(id=res.data['id'])
+        self.assertEqual(recipe.user_id, self.user.id)
+        titles = [r['title'] for r in json.loads(listed.content)['results']]
+        self.assertEqual(titles, ['Async'])
+
+    async def test_create_invalid_recipe(self):
+        """Test validation errors are returned as by the DRF view."""
+        res = await RecipeListView.as_view()(self.factory.post(
+            RECIPES_URL,
+            {'title': 'Slow', 'time_in_minutes': 'long'},
+            content_type='application/json',
+            **self.auth,
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time_in_minutes', json.loads(res.content))
+
+    async def test_retrieve_other_users_recipe(self):
+        """Test another user's recipe is not found."""
+        other = await sync_to_async(get_user_model().objects.create_user)(
+            email='other@example.com',
+            password='Testpass123',
+        )
+        recipe = await sync_to_async(create_recipe)(other)
+        url = detail_url(recipe.id)
+
+        res = await RecipeDetailView.as_view()(
+            self.factory.get(url, **self.auth), pk=recipe.id
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_update_goes_to_sync_view(self):
+        """Test methods without an async handler use the DRF view."""
+        recipe = await sync_to_async(create_recipe)(self.user)
+        url = detail_url(recipe.id)
+
+        res = await RecipeDetailView.as_view()(
+            self.factory.patch(
+                url,
+                {'title': 'Updated'},
+                content_type='application/json',
+                **self.auth,
+            ),
+            pk=recipe.id,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        await sync_to_async(recipe.refresh_from_db)()
+        self.assertEqual(recipe.title, 'Updated')
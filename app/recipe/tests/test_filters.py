@@ -0,0 +1,373 @@
+"""
+Tests for filtering and ordering the recipe list.
+"""
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.serializers import RecipeSerializer, ValuesSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+# Every supported filter and ordering, alone and combined.
+FILTER_COMBINATIONS = [
+    {},
+    {'time_in_minutes__lte': 30},
+    {'price__range': '1.00,10.00'},
+    {'title__istartswith': 'pa'},
+    {'time_in_minutes__lte': 30, 'price__range': '1.00,10.00',
+     'title__istartswith': 'pa'},
+] + [
+    {'ordering': ordering}
+    for field in ['id', 'price', 'time_in_minutes', 'title']
+    for ordering in [field, '-' + field]
+] + [
+    {'ordering': 'price', 'price__range': '1.00,10.00'},
+    {'ordering': '-time_in_minutes', 'time_in_minutes__lte': 30},
+    {'ordering': 'title', 'title__istartswith': 'pa'},
+    {'fields': 'id,title'},
+    {'fields': 'title', 'ordering': 'price', 'price__range': '1.00,10.00'},
+    {'fields': 'id', 'ordering': '-time_in_minutes'},
+]
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_in_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeFilterTests(TestCase):
+    """Test filtering and ordering recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, params):
+        """Return the ids listed for params."""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['id'] for item in res.data['results']]
+
+    def test_filter_time_in_minutes_lte(self):
+        """Test filtering recipes by maximum preparation time."""
+        quick = create_recipe(user=self.user, time_in_minutes=10)
+        create_recipe(user=self.user, time_in_minutes=45)
+
+        self.assertEqual(
+            self.get_ids({'time_in_minutes__lte': 30}),
+            [quick.id],
+        )
+
+    def test_filter_price_range(self):
+        """Test filtering recipes within a price range."""
+        create_recipe(user=self.user, price=Decimal('0.50'))
+        in_range = create_recipe(user=self.user, price=Decimal('4.00'))
+        create_recipe(user=self.user, price=Decimal('20.00'))
+
+        self.assertEqual(
+            self.get_ids({'price__range': '1.00,10.00'}),
+            [in_range.id],
+        )
+
+    def test_filter_title_istartswith(self):
+        """Test filtering recipes by title prefix, ignoring case."""
+        pasta = create_recipe(user=self.user, title='Pasta bake')
+        create_recipe(user=self.user, title='Baked pasta')
+
+        self.assertEqual(
+            self.get_ids({'title__istartswith': 'pA'}),
+            [pasta.id],
+        )
+
+    def test_invalid_filter_values(self):
+        """Test malformed filter values are rejected."""
+        for params in [
+            {'time_in_minutes__lte': 'soon'},
+            {'price__range': '1.00'},
+            {'price__range': '1.00,cheap'},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_ordering(self):
+        """Test ordering recipes, with id as the tie-breaker."""
+        a = create_recipe(user=self.user, price=Decimal('3.00'))
+        b = create_recipe(user=self.user, price=Decimal('1.00'))
+        c = create_recipe(user=self.user, price=Decimal('3.00'))
+
+        self.assertEqual(
+            self.get_ids({'ordering': 'price'}),
+            [b.id, a.id, c.id],
+        )
+        self.assertEqual(
+            self.get_ids({'ordering': '-price'}),
+            [c.id, a.id, b.id],
+        )
+
+    def test_ordering_paginated(self):
+        """Test walking an ordered list page by page."""
+        recipes = [
+            create_recipe(user=self.user, time_in_minutes=minutes)
+            for minutes in [5, 1, 5, 3, 5]
+        ]
+        recipes.sort(key=lambda recipe: (recipe.time_in_minutes, recipe.id))
+        expected = [recipe.id for recipe in recipes]
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'ordering': 'time_in_minutes', 'page_size': 2},
+        )
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(seen, expected)
+
+    def test_unsupported_ordering_ignored(self):
+        """Test orderings outside the whitelist fall back to newest first."""
+        first = create_recipe(user=self.user, link='b')
+        second = create_recipe(user=self.user, link='a')
+
+        self.assertEqual(
+            self.get_ids({'ordering': 'link'}),
+            [second.id, first.id],
+        )
+
+
+class RecipeFieldsTests(TestCase):
+    """Test sparse fieldsets with ?fields=."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_selected_sql(self, url, params):
+        """Return the SQL of the query loading the rows for url."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, queries[-1]['sql']
+
+    def test_list_fields(self):
+        """Test the list returns and selects only the requested fields."""
+        create_recipe(user=self.user, link='https://example.com')
+
+        res, sql = self.get_selected_sql(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(list(res.data['results'][0]), ['id', 'title'])
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn('"link"', sql)
+
+    def test_detail_fields(self):
+        """Test the detail skips the description unless requested."""
+        recipe = create_recipe(user=self.user, description='Long text')
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        res, sql = self.get_selected_sql(url, {'fields': 'title'})
+
+        self.assertEqual(res.data, {'title': recipe.title})
+        self.assertNotIn('"description"', sql)
+        self.assertIn('ETag', res)
+
+    def test_fields_paginated_by_unrequested_column(self):
+        """Test paging by a column outside ?fields= still works."""
+        recipes = [
+            create_recipe(user=self.user, price=Decimal(price))
+            for price in [3, 1, 2]
+        ]
+        params = {'fields': 'id', 'ordering': 'price', 'page_size': 1}
+
+        res = self.client.get(RECIPES_URL, params)
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(seen, [recipes[1].id, recipes[2].id, recipes[0].id])
+
+    def test_unknown_fields(self):
+        """Test requesting an unknown field is an error."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_fields_ignored_on_write(self):
+        """Test ?fields= does not restrict writable fields."""
+        res = self.client.post(
+            RECIPES_URL + '?fields=id',
+            {'title': 'Soup', 'price': '2.00'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Soup')
+
+
+class RecipeQueryPlanTests(TestCase):
+    """Test every supported filter and ordering stays index backed."""
+
+    def setUp(self):
+        # Cached responses are keyed by user pk, which may be reused.
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(20):
+            create_recipe(
+                user=self.user,
+                title='Pasta %d' % i,
+                time_in_minutes=i * 5,
+                price=Decimal(i),
+            )
+
+    def explain(self, sql):
+        """Return the query plan of sql with sequential scans and sorts
+        discouraged, so a plan only contains them if no index applies."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+                cursor.execute('EXPLAIN ' + sql)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+        return plan
+
+    def test_filters_query_count(self):
+        """Test each combination needs the ETag query and one page query."""
+        for params in FILTER_COMBINATIONS:
+            with self.subTest(params=params), self.assertNumQueries(2):
+                self.client.get(RECIPES_URL, params)
+
+    def test_filters_index_backed(self):
+        """Test no combination needs a sequential scan or a sort."""
+        for params in FILTER_COMBINATIONS:
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(RECIPES_URL, params)
+
+                for query in queries:
+                    plan = self.explain(query['sql'])
+                    if connection.vendor == 'postgresql':
+                        self.assertNotIn('Seq Scan', plan)
+                        self.assertNotIn('Sort', plan)
+                    else:
+                        # SQLite has no planner switches, it may still
+                        # prefer a range scan plus sort; require an index.
+                        self.assertIn('USING', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_title_prefix_index_condition(self):
+        """Test title prefixes are matched in the index, not filtered."""
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title='Soup %d' % i) for i in range(1000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, {'title__istartswith': 'pa'})
+
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ANALYZE ' + queries[-1]['sql'])
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        self.assertIn('recipe_user_title_upper_idx', plan)
+        self.assertIn("upper((title)::text) ~>=~ 'PA'", plan)
+        self.assertNotIn('Rows Removed by Filter', plan)
+
+
+class ValuesSerializerTests(TestCase):
+    """Test the values_list() fast path matches RecipeSerializer."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(12):
+            create_recipe(
+                user=self.user,
+                title='Pasta %d' % i,
+                time_in_minutes=i * 5,
+                price=Decimal('%d.%02d' % (i, i * 7 % 100)),
+                link='' if i % 3 else 'https://example.com/%d' % i,
+                description='Tomato pasta' if i % 2 else 'Soup',
+            )
+
+    def get_pages(self, params):
+        """Return the content of every page listed for params."""
+        cache.clear()
+        res = self.client.get(RECIPES_URL, dict(params, page_size=5))
+        pages = [res.content]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(res.content)
+
+        return pages
+
+    def test_identical_output(self):
+        """Test every filter, ordering and page renders the same bytes."""
+        combinations = FILTER_COMBINATIONS + [{'search': 'pasta'}]
+        for params in combinations:
+            with self.subTest(params=params):
+                expected = self.get_pages(params)
+                with override_settings(RECIPE_FAST_SERIALIZER=True):
+                    self.assertEqual(self.get_pages(params), expected)
+
+    @override_settings(RECIPE_FAST_SERIALIZER=True)
+    def test_query_count(self):
+        """Test the fast path keeps the list at two queries."""
+        for params in FILTER_COMBINATIONS:
+            cache.clear()
+            with self.subTest(params=params), self.assertNumQueries(2):
+                self.client.get(RECIPES_URL, params)
+
+    def test_decimal_rounding(self):
+        """Test prices convert exactly as DecimalField does."""
+        serializer = RecipeSerializer()
+        convert = ValuesSerializer(serializer).converters[3]
+        field = serializer.fields['price']
+
+        for value in ['1.005', '2.5', '0', '0E-7', '1E+2', '999.99', '-3.125']:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    convert(Decimal(value)),
+                    field.to_representation(Decimal(value)),
+                )
@@ -0,0 +1,230 @@
+"""
+Tests for importing recipes from files.
+"""
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.testing import QueryBudgetMixin
+from recipe import importing
+
+RECIPES_URL = reverse('recipe:recipe-list')
+IMPORT_URL = reverse('recipe:recipe-import')
+
+CSV = (
+    'title,time_in_minutes,price,link,description\n'
+    'Pasta,10,5.50,,Quick\n'
+    ',10,5.50,,No title\n'
+    'Curry,,1234.00,,\n'
+    'Soup,20,2.00,https://example.com/soup,\n'
+)
+
+
+def upload(name, content):
+    return SimpleUploadedFile(name, content.encode())
+
+
+class JSONArrayReaderTests(SimpleTestCase):
+    """Test reading JSON arrays in chunks."""
+
+    def test_items_across_chunks(self):
+        """Test items split over several chunks are decoded."""
+        items = [{'title': 'Recipe %d' % i} for i in range(20)]
+        items += [12345, 'text', []]
+        text = json.dumps(items, indent=2)
+
+        for chunk_size in [1, 3, 64]:
+            with self.subTest(chunk_size=chunk_size):
+                reader = importing.read_json_array(
+                    io.StringIO(text), chunk_size,
+                )
+
+                self.assertEqual(list(reader), items)
+
+    def test_invalid_array(self):
+        """Test files that are not a JSON array are refused."""
+        for text in ['', '{}', '[{}', '[{} {}]', '[{},]']:
+            with self.subTest(text=text):
+                with self.assertRaises(importing.ImportFormatError):
+                    list(importing.read_json_array(io.StringIO(text), 2))
+
+
+class ImportRecipesTests(TestCase):
+    """Test import_recipes() and the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_copy_matches_bulk_create(self):
+        """Test both load paths create the same recipes."""
+        for copy in [True, False]:
+            rows = importing.read_rows(io.BytesIO(CSV.encode()), 'csv')
+            result = importing.import_recipes(self.user, rows, copy=copy)
+
+            self.assertEqual(result['imported'], 2)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        values = list(recipes.values_list(
+            'title', 'time_in_minutes', 'price', 'link', 'description',
+        ))
+
+        self.assertEqual(values[:2], values[2:])
+        self.assertEqual(values[:2], [
+            ('Pasta', 10, Decimal('5.50'), '', 'Quick'),
+            ('Soup', 20, Decimal('2.00'), 'https://example.com/soup', ''),
+        ])
+
+    def test_batches(self):
+        """Test rows are loaded over several batches."""
+        rows = [{'title': 'Recipe %d' % i} for i in range(7)]
+
+        result = importing.import_recipes(self.user, rows, batch_size=3)
+
+        self.assertEqual(result['imported'], 7)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 7)
+
+    def test_max_errors(self):
+        """Test only the first errors are kept, all are counted."""
+        rejected = []
+
+        result = importing.import_recipes(
+            self.user,
+            [{'title': ''}] * 5,
+            max_errors=2,
+            reject=lambda number, errors: rejected.append(number),
+        )
+
+        self.assertEqual(result['rejected'], 5)
+        self.assertEqual([error['row'] for error in result['errors']], [1, 2])
+        self.assertEqual(rejected, [1, 2, 3, 4, 5])
+
+    def test_command(self):
+        """Test the command imports a file and reports rejects."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv')
+            rejects = os.path.join(directory, 'rejects.ndjson')
+            with open(path, 'w') as f:
+                f.write(CSV)
+            out = io.StringIO()
+
+            call_command(
+                'import_recipes', path, user='USER@example.com',
+                rejects=rejects, stdout=out,
+            )
+
+            with open(rejects) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertIn('Imported 2 recipes, rejected 2', out.getvalue())
+        self.assertEqual([line['row'] for line in lines], [2, 3])
+        self.assertIn('price', lines[1]['errors'])
+
+
+class ImportRecipesAPITests(QueryBudgetMixin, TestCase):
+    """Test the recipe import endpoint."""
+    # Plus a COPY per RECIPE_IMPORT_BATCH_SIZE rows after the first.
+    query_budgets = {('POST', 'recipe:recipe-import'): 6}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test importing requires authentication."""
+        res = APIClient().post(IMPORT_URL, {'file': upload('r.csv', CSV)})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_import_csv(self):
+        """Test valid rows are created and invalid ones reported."""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.post(IMPORT_URL, {'file': upload('r.csv', CSV)})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertEqual(res.data['rejected'], 2)
+        self.assertEqual(res.data['errors'][0]['row'], 2)
+        self.assertIn('title', res.data['errors'][0]['errors'])
+        self.assertIn('price', res.data['errors'][1]['errors'])
+        # The cached list is invalidated.
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            sorted(recipe['title'] for recipe in res.data['results']),
+            ['Pasta', 'Soup'],
+        )
+
+    def test_import_ndjson(self):
+        """Test broken lines and non-objects are rejected by row."""
+        content = '{"title": "Pasta"}\n\n{"title": \n[1]\n'
+
+        res = self.client.post(IMPORT_URL, {
+            'file': upload('recipes.txt', content),
+            'format': 'ndjson',
+        })
+
+        self.assertEqual(res.data['imported'], 1)
+        self.assertEqual(res.data['rejected'], 2)
+        self.assertEqual(res.data['errors'][0], {
+            'row': 2,
+            'errors': {'non_field_errors': ['Invalid JSON.']},
+        })
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_import_json_from_disk(self):
+        """Test uploads spooled to a temporary file are imported."""
+        content = json.dumps([
+            {'title': 'Recipe %d' % i, 'price': '1.50'} for i in range(50)
+        ])
+
+        res = self.client.post(IMPORT_URL, {
+            'file': upload('recipes.json', content),
+        })
+
+        self.assertEqual(res.data['imported'], 50)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 50)
+
+    def test_unknown_format(self):
+        """Test files without a known extension or format are refused."""
+        res = self.client.post(IMPORT_URL, {
+            'file': upload('recipes.xml', '<recipes/>'),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', res.data)
+
+    def test_invalid_file(self):
+        """Test undecodable files and broken arrays import nothing."""
+        for name, content in [
+            ('recipes.csv', b'title\nP\xe2sta\n'),
+            ('recipes.json', b'[{"title": "Pasta"}, {"title"'),
+        ]:
+            with self.subTest(name=name):
+                res = self.client.post(IMPORT_URL, {
+                    'file': SimpleUploadedFile(name, content),
+                })
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
@@ -1,16 +1,23 @@
 """
 Test for recipe api
 """
+import json
+from base64 import b64encode
 from decimal import Decimal
+from urllib.parse import parse_qs, urlencode, urlparse
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe
+from core.testing import QueryBudgetMixin, query_budget
 
 from recipe.serializers import (
     RecipeSerializer,
@@ -18,6 +25,22 @@ from recipe.serializers import (
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+# Most queries each endpoint may make, whatever the number of recipes.
+QUERY_BUDGETS = {
+    ('GET', 'recipe:recipe-list'): 2,
+    ('POST', 'recipe:recipe-list'): 1,
+    ('GET', 'recipe:recipe-detail'): 1,
+    ('PATCH', 'recipe:recipe-detail'): 2,
+    ('DELETE', 'recipe:recipe-detail'): 2,
+    ('POST', 'recipe:recipe-bulk'): 3,
+    ('PATCH', 'recipe:recipe-bulk'): 4,
+    ('DELETE', 'recipe:recipe-bulk'): 4,
+    # Rows are read while the body streams, see test_export_query_budget.
+    ('GET', 'recipe:recipe-export'): 0,
+}
 
 
 def detail_url(recipe_id):
@@ -42,8 +65,10 @@ def create_recipe(user, **params):
     return reciepe
 
 
-class PublicRecipeAPI(TestCase):
+class PublicRecipeAPI(QueryBudgetMixin, TestCase):
     """Tests for unauthorized users."""
+    query_budgets = QUERY_BUDGETS
+
     def setUp(self):
         self.client = APIClient()
 
@@ -54,9 +79,12 @@ class PublicRecipeAPI(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class privateRecipeAPI(TestCase):
+class privateRecipeAPI(QueryBudgetMixin, TestCase):
     """Tests for authorized users."""
+    query_budgets = QUERY_BUDGETS
+
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email='test@user.com',
@@ -74,7 +102,7 @@ class privateRecipeAPI(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes limited to authenticated users."""
@@ -91,7 +119,86 @@ class privateRecipeAPI(TestCase):
         recipes = Recipe.objects.all().filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_recipe_list_selects_indexed_columns(self):
+        """Test the list query only reads columns held in the index."""
+        create_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+
+        sql = queries[-1]['sql']
+        self.assertIn('"core_recipe"."title"', sql)
+        self.assertNotIn('"core_recipe"."description"', sql)
+
+    def test_recipe_list_paginated(self):
+        """Test walking the recipe list with next and previous cursors."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        ids = [recipe.id for recipe in reversed(recipes)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+        self.assertEqual(seen, ids)
+
+        res = self.client.get(res.data['previous'])
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            ids[2:4],
+        )
+
+    def test_recipe_list_page_size_capped(self):
+        """Test the page size can not exceed the configured maximum."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        with self.settings(PAGINATION_MAX_PAGE_SIZE=2):
+            res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_recipe_list_invalid_cursor(self):
+        """Test a tampered cursor is rejected."""
+        res = self.client.get(RECIPES_URL, {'cursor': 'cD1ub3QtanNvbg=='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_list_cursor_of_other_ordering(self):
+        """Test a cursor reused with another ordering is rejected."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL, {
+            'ordering': 'title', 'page_size': 1,
+        })
+        cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+
+        for ordering in ['price', 'time_in_minutes', '-id']:
+            with self.subTest(ordering=ordering):
+                res = self.client.get(RECIPES_URL, {
+                    'ordering': ordering, 'cursor': cursor,
+                })
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_list_cursor_of_wrong_type(self):
+        """Test cursor positions of the wrong type are rejected."""
+        for position in [['abc'], [{'id': 1}], [None], [[1]]]:
+            cursor = b64encode(urlencode({
+                'p': json.dumps(position),
+            }).encode()).decode()
+
+            with self.subTest(position=position):
+                res = self.client.get(RECIPES_URL, {'cursor': cursor})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def tes_get_recipe_details(self):
         """Test for recipe details."""
@@ -104,3 +211,379 @@ class privateRecipeAPI(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
+
+    def test_export_recipes_ndjson(self):
+        """Test exporting recipes streams one JSON document per line."""
+        create_recipe(user=self.user, title='First')
+        create_recipe(user=self.user, title='Second')
+        create_recipe(user=get_user_model().objects.create_user(
+            email='other@ex.com',
+            password='otheruser123',
+        ))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeDetailSerializer(recipes, many=True)
+        self.assertEqual([json.loads(line) for line in lines], serializer.data)
+
+    def test_export_query_budget(self):
+        """Test streaming the export reads the rows in one query."""
+        for i in range(5):
+            create_recipe(user=self.user, title='Recipe %d' % i)
+        res = self.client.get(EXPORT_URL)
+
+        with query_budget(1):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+
+    def test_export_recipes_json_array(self):
+        """Test exporting recipes as a single JSON array."""
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+
+        res = self.client.get(EXPORT_URL, {'output': 'json'})
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        body = json.loads(b''.join(res.streaming_content))
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeDetailSerializer(recipes, many=True)
+        self.assertEqual(body, serializer.data)
+
+    def test_export_recipes_empty(self):
+        """Test exporting with no recipes returns an empty array."""
+        res = self.client.get(EXPORT_URL, {'output': 'json'})
+
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), [])
+
+    def test_export_invalid_output(self):
+        """Test an unknown export output is rejected."""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes in one request."""
+        payload = [
+            {'title': 'Recipe %d' % i, 'time_in_minutes': i,
+             'price': '1.50', 'description': 'Bulk'}
+            for i in range(3)
+        ]
+
+        with self.assertNumQueries(3):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes],
+                         [item['title'] for item in payload])
+        if connection.features.can_return_rows_from_bulk_insert:
+            # Elsewhere, such as on SQLite, bulk_create() sets no ids.
+            self.assertEqual([item['id'] for item in res.data],
+                             [r.id for r in recipes])
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported by position and nothing saved."""
+        payload = [
+            {'title': 'Good', 'price': '1.00'},
+            {'title': '', 'price': '1.00'},
+            {'title': 'Too expensive', 'price': '12345.00'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertIn('price', res.data[2])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test a single object is rejected by the bulk endpoint."""
+        res = self.client.post(BULK_URL, {'title': 'One'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        """Test updating many recipes in one request."""
+        first = create_recipe(user=self.user)
+        second = create_recipe(user=self.user)
+        payload = [
+            {'id': first.id, 'title': 'First updated'},
+            {'id': second.id, 'price': '9.99'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.title, 'First updated')
+        self.assertEqual(second.price, Decimal('9.99'))
+        self.assertEqual(second.title, 'Sample recipe title')
+        self.assertEqual(res.data[0]['title'], 'First updated')
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test recipes of other users can not be bulk updated."""
+        other_user = get_user_model().objects.create_user(
+            email='other@ex.com',
+            password='otheruser123',
+        )
+        own = create_recipe(user=self.user)
+        other = create_recipe(user=other_user)
+        payload = [
+            {'id': own.id, 'title': 'Mine'},
+            {'id': other.id, 'title': 'Not mine'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        other.refresh_from_db()
+        own.refresh_from_db()
+        self.assertNotEqual(other.title, 'Not mine')
+        self.assertNotEqual(own.title, 'Mine')
+
+    def test_bulk_update_duplicate_ids(self):
+        """Test a recipe listed twice is reported and nothing saved."""
+        recipe = create_recipe(user=self.user)
+        payload = [
+            {'id': recipe.id, 'title': 'First'},
+            {'id': recipe.id, 'title': 'Second'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(res.data[1], {'id': ['Duplicate id.']})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe title')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes in one request."""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        ids = [recipe.id for recipe in recipes[:2]]
+
+        res = self.client.delete(BULK_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual(
+            list(Recipe.objects.values_list('id', flat=True)),
+            [recipes[2].id],
+        )
+
+    def test_bulk_delete_unknown_recipe(self):
+        """Test nothing is deleted if any id is unknown."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.delete(
+            BULK_URL,
+            {'ids': [recipe.id, recipe.id + 100]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(1, res.data['ids'])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_search_recipes(self):
+        """Test searching matches title and description, best first."""
+        in_description = create_recipe(
+            user=self.user,
+            title='Weeknight dinner',
+            description='Quick tomato pasta with basil',
+        )
+        in_title = create_recipe(
+            user=self.user,
+            title='Pasta carbonara',
+            description='Eggs and cheese',
+        )
+        create_recipe(user=self.user, title='Pancakes', description='Sweet')
+
+        res = self.client.get(RECIPES_URL, {'search': 'pasta'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [in_title.id, in_description.id],
+        )
+
+    def test_search_recipes_after_update(self):
+        """Test search reflects updated titles."""
+        recipe = create_recipe(user=self.user, title='Soup')
+        self.client.patch(detail_url(recipe.id), {'title': 'Lentil stew'})
+
+        res = self.client.get(RECIPES_URL, {'search': 'lentil'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipe.id],
+        )
+
+    def test_search_recipes_paginated(self):
+        """Test ranked search results can be paged through."""
+        ids = {create_recipe(user=self.user, title='Pasta %d' % i).id
+               for i in range(5)}
+
+        res = self.client.get(RECIPES_URL, {'search': 'pasta', 'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), ids)
+
+    def test_list_not_modified(self):
+        """Test an unchanged list returns 304 with a single query."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_not_modified_cached(self):
+        """Test a cached list answers If-None-Match without queries."""
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_cached(self):
+        """Test repeated list and detail reads are served from the cache."""
+        recipe = create_recipe(user=self.user)
+        list_res = self.client.get(RECIPES_URL)
+        detail_res = self.client.get(detail_url(recipe.id))
+
+        with self.assertNumQueries(0):
+            cached_list = self.client.get(RECIPES_URL)
+            cached_detail = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(cached_list.content, list_res.content)
+        self.assertEqual(cached_list['ETag'], list_res['ETag'])
+        self.assertEqual(cached_detail.content, detail_res.content)
+        self.assertEqual(
+            cached_detail['Last-Modified'],
+            detail_res['Last-Modified'],
+        )
+
+    def test_cache_invalidated_by_writes(self):
+        """Test every write through the API refreshes cached responses."""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        self.client.get(detail_url(recipe.id))
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Changed'})
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.data['title'], 'Changed')
+        self.assertEqual(
+            self.client.get(RECIPES_URL).data['results'][0]['title'],
+            'Changed',
+        )
+
+        self.client.post(RECIPES_URL, {'title': 'New', 'price': '1.00'})
+        self.assertEqual(
+            len(self.client.get(RECIPES_URL).data['results']),
+            2,
+        )
+
+        self.client.delete(BULK_URL, {'ids': [recipe.id]}, format='json')
+        self.assertEqual(
+            len(self.client.get(RECIPES_URL).data['results']),
+            1,
+        )
+
+    def test_cache_per_user(self):
+        """Test cached responses are never shared between users."""
+        create_recipe(user=self.user, title='Mine')
+        self.client.get(RECIPES_URL)
+        other_user = get_user_model().objects.create_user(
+            email='other@ex.com',
+            password='otheruser123',
+        )
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    @override_settings(ALLOWED_HOSTS=['a.example.com', 'b.example.com'])
+    def test_cache_per_host(self):
+        """Test cached page links are never served to another host."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+        params = {'page_size': 1}
+        res_a = self.client.get(RECIPES_URL, params, HTTP_HOST='a.example.com')
+
+        res_b = self.client.get(RECIPES_URL, params, HTTP_HOST='b.example.com')
+
+        self.assertTrue(
+            res_b.json()['next'].startswith('http://b.example.com/'),
+        )
+        self.assertNotEqual(res_a['ETag'], res_b['ETag'])
+
+    def test_list_etag_changes(self):
+        """Test creating, updating or deleting a recipe changes the ETag."""
+        recipe = create_recipe(user=self.user)
+        etags = [self.client.get(RECIPES_URL)['ETag']]
+
+        self.client.post(RECIPES_URL, {'title': 'New', 'price': '1.00'})
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        self.client.patch(detail_url(recipe.id), {'title': 'Changed'})
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        self.client.delete(detail_url(recipe.id))
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        self.client.patch(BULK_URL, [], format='json')
+        etags.append(self.client.get(RECIPES_URL, {'page_size': 1})['ETag'])
+
+        self.assertEqual(len(set(etags)), len(etags))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test an unchanged recipe returns 304 for ETag and date checks."""
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        by_etag = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        by_date = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_on_bulk_update(self):
+        """Test bulk updates refresh the validators of each recipe."""
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        self.client.patch(
+            BULK_URL,
+            [{'id': recipe.id, 'price': '2.00'}],
+            format='json',
+        )
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
@@ -1,11 +1,12 @@
 """
 URL's for the recipe API
 """
+from django.conf import settings
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 router = DefaultRouter()
 router.register(r'recipes', views.RetrieveRecipeView)
@@ -15,3 +16,17 @@ app_name = 'recipe'
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+if settings.API_ASYNC_VIEWS:
+    urlpatterns = [
+        path(
+            'recipes/',
+            async_views.RecipeListView.as_view(),
+            name='recipe-list',
+        ),
+        path(
+            'recipes/<int:pk>/',
+            async_views.RecipeDetailView.as_view(),
+            name='recipe-detail',
+        ),
+    ] + urlpatterns
@@ -1,31 +1,459 @@
 """
 views for recipe api.
 """
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, parse_http_date, quote_etag
+from django.utils.translation import gettext as _
+
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
+from core.authentication import CachedTokenAuthentication
+from core.cache import VersionedCache
+from core.db import routers
+from core.instrumentation import timed
 from core.models import Recipe
+from recipe import importing
+from recipe.filters import (
+    RecipeFieldsFilter,
+    RecipeFilter,
+    RecipeOrderingFilter,
+    RecipeSearchFilter,
+)
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    RecipeBulkDeleteSerializer,
+    RecipeImportSerializer,
+    ValuesSerializer,
 )
 
 
+recipe_cache = VersionedCache('recipe_cache')
+
+# Headers stored along with cached list and detail bodies.
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Cache-Control']
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def _stream_json_array(rows):
+    """Wrap already encoded JSON rows in a streamed JSON array."""
+    yield '['
+    for index, row in enumerate(rows):
+        yield row if index == 0 else ',' + row
+    yield ']'
+
+
+def make_cache_entry(response):
+    """Return the cached form of a rendered response."""
+    return {
+        'content': response.content,
+        'headers': {
+            header: response[header]
+            for header in CACHED_HEADERS
+            if response.has_header(header)
+        },
+    }
+
+
+def get_entry_response(request, entry):
+    """Return the response of a cached entry, or 304 if still current."""
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers'].items():
+        response[header] = value
+    patch_vary_headers(response, ['Authorization'])
+    last_modified = entry['headers'].get('Last-Modified')
+
+    return get_conditional_response(
+        request,
+        etag=entry['headers']['ETag'],
+        last_modified=last_modified and parse_http_date(last_modified),
+        response=response,
+    )
+
+
 class RetrieveRecipeView(viewsets.ModelViewSet):
     """view for manage recipe API."""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    filter_backends = [
+        RecipeFilter,
+        RecipeSearchFilter,
+        RecipeOrderingFilter,
+        RecipeFieldsFilter,
+    ]
 
     def get_queryset(self):
         """Retrieve recipes for authenticated user only."""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            # Only the indexed columns, so the list is an index-only scan.
+            queryset = queryset.only(*RecipeSerializer.Meta.fields)
+
+        return queryset.order_by('-id')
+
+    def get_required_fields(self):
+        """Return the fields the view reads besides the serialized ones."""
+        if self.action == 'retrieve':
+            # For the ETag and Last-Modified validators.
+            return ['updated_at']
+        return []
+
+    def list(self, request, *args, **kwargs):
+        """List recipes through the per-user response cache."""
+        with routers.replica_reads(request.user.pk):
+            return self.get_cached_response(
+                self.list_uncached, request, *args, **kwargs
+            )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe through the per-user response cache."""
+        with routers.replica_reads(request.user.pk):
+            return self.get_cached_response(
+                self.retrieve_uncached, request, *args, **kwargs
+            )
+
+    def perform_create(self, serializer):
+        """Create a recipe for the user and record the write."""
+        serializer.save(user=self.request.user)
+        self.record_write()
+
+    def perform_update(self, serializer):
+        """Update a recipe and record the write."""
+        serializer.save()
+        self.record_write()
+
+    def perform_destroy(self, instance):
+        """Delete a recipe and record the write."""
+        instance.delete()
+        self.record_write()
+
+    def record_write(self):
+        """Invalidate the user's cache and keep their reads on the primary."""
+        recipe_cache.bump(self.request.user.pk)
+        routers.record_write(self.request.user.pk)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        """Return the rendered response of handler from the cache.
+
+        Entries are keyed by user, absolute URI (host, page, filters) and
+        media type under the user's cache version, which every write
+        bumps; the host is needed as bodies hold absolute page links. Cached
+        entries keep their validators, so a matching If-None-Match is
+        answered without touching the database.
+        """
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key = recipe_cache.make_key(
+            request.user.pk,
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+        )
+        computed = {}
+
+        def compute():
+            response = handler(request, *args, **kwargs)
+            computed['response'] = response
+            if response.status_code != status.HTTP_200_OK:
+                return None
+
+            response = self.finalize_response(
+                request, response, *args, **kwargs
+            )
+            response.render()
+            return make_cache_entry(response)
+
+        entry = recipe_cache.get_or_compute(key, compute)
+        if 'response' in computed:
+            return computed['response']
+
+        return get_entry_response(request._request, entry)
+
+    def list_uncached(self, request, *args, **kwargs):
+        """List recipes, or 304 if the client's ETag is still current."""
+        # COUNT(*) rather than COUNT(id) is answered by an index-only scan
+        # of recipe_user_updated_idx, which does not hold id.
+        stats = Recipe.objects.filter(user=request.user).aggregate(
+            count=Count('*'),
+            updated_at=Max('updated_at'),
+        )
+        etag = self.get_etag(stats['count'], stats['updated_at'])
+        response = get_conditional_response(request._request, etag=etag)
+        if response is not None:
+            return response
+
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = self.serialize_list(page)
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(self.serialize_list(queryset))
+
+        return self.set_validators(response, etag)
+
+    def get_values_serializer(self):
+        """Return the ValuesSerializer for the list, if enabled."""
+        if not settings.RECIPE_FAST_SERIALIZER:
+            return None
+
+        if not hasattr(self, '_values_serializer'):
+            serializer = self.get_serializer()
+            self._values_serializer = ValuesSerializer(serializer) \
+                if ValuesSerializer.supports(serializer) else None
+
+        return self._values_serializer
+
+    def get_list_queryset(self):
+        """Return the filtered list, as values_list() rows if enabled."""
+        queryset = self.filter_queryset(self.get_queryset())
+        values_serializer = self.get_values_serializer()
+        if values_serializer is not None:
+            return values_serializer.get_rows(queryset)
+
+        return queryset
+
+    def serialize_list(self, rows):
+        """Return the serialized data of rows from get_list_queryset()."""
+        values_serializer = self.get_values_serializer()
+        if values_serializer is not None:
+            with timed('serialize'):
+                return values_serializer.to_representation(rows)
+
+        return self.get_serializer(rows, many=True).data
+
+    def retrieve_uncached(self, request, *args, **kwargs):
+        """Retrieve a recipe, or 304 if it has not changed."""
+        return self.get_retrieve_response(self.get_object())
+
+    def get_retrieve_response(self, instance):
+        """Return the detail response of instance, or 304 if unchanged."""
+        etag = self.get_etag(instance.pk, instance.updated_at)
+        last_modified = int(instance.updated_at.timestamp())
+        response = get_conditional_response(
+            self.request._request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is not None:
+            return response
+
+        serializer = self.get_serializer(instance)
+        response = self.set_validators(Response(serializer.data), etag)
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_etag(self, *parts):
+        """Return an ETag for parts of the resource state.
+
+        The absolute URI (host, page, filters) and the negotiated media
+        type are part of the tag, as they change the representation.
+        """
+        parts += (
+            self.request.build_absolute_uri(),
+            self.request.accepted_media_type,
+        )
+        value = ':'.join(str(part) for part in parts)
+        return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+    def set_validators(self, response, etag):
+        """Add the ETag and revalidation headers to response."""
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if(self.action == 'list'):
             return RecipeSerializer
+        if self.action == 'bulk' and self.request.method == 'DELETE':
+            return RecipeBulkDeleteSerializer
+        if self.action == 'import_recipes':
+            return RecipeImportSerializer
 
         return self.serializer_class
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """Create, update or delete many recipes in one transaction.
+
+        POST and PATCH take a list of recipes (PATCH items need an `id`)
+        and DELETE takes `{"ids": [...]}`. Errors are reported per item,
+        in request order, and nothing is written unless every item is
+        valid.
+        """
+        if request.method == 'DELETE':
+            return self._bulk_destroy(request)
+
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': [
+                _('Expected a list of items.')
+            ]})
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                _('Ensure this list has no more than %d items.')
+                % settings.RECIPE_BULK_MAX_ITEMS
+            ]})
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=items, many=True)
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                serializer.save(user=request.user)
+            self.record_write()
+
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        with transaction.atomic():
+            instances = self._get_bulk_instances(items)
+            serializer = self.get_serializer(
+                instances,
+                data=items,
+                many=True,
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        self.record_write()
+
+        return Response(serializer.data)
+
+    def _get_bulk_instances(self, items):
+        """Return the user's recipes matching the `id` of every item.
+
+        Each recipe may only be listed once.
+        """
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        valid_ids = [pk for pk in ids if isinstance(pk, int)]
+        recipes = self.get_queryset().select_for_update().in_bulk(valid_ids)
+
+        errors = []
+        seen = set()
+        for pk in ids:
+            if pk not in recipes:
+                errors.append({'id': [_('Not found.')]})
+            elif pk in seen:
+                errors.append({'id': [_('Duplicate id.')]})
+            else:
+                errors.append({})
+            seen.add(pk)
+        if any(errors):
+            raise ValidationError(errors)
+
+        return [recipes[pk] for pk in ids]
+
+    def _bulk_destroy(self, request):
+        """Delete the user's recipes listed in `ids`."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        with transaction.atomic():
+            recipes = self.get_queryset().filter(id__in=ids)
+            found = set(
+                recipes.select_for_update().values_list('id', flat=True)
+            )
+            missing = {
+                index: [_('Not found.')]
+                for index, pk in enumerate(ids) if pk not in found
+            }
+            if missing:
+                raise ValidationError({'ids': missing})
+            deleted, _rows = recipes.delete()
+        self.record_write()
+
+        return Response({'deleted': deleted})
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        url_name='import',
+        parser_classes=[MultiPartParser],
+    )
+    def import_recipes(self, request):
+        """Import recipes from an uploaded CSV, NDJSON or JSON file.
+
+        Rows are validated like single recipes. Valid rows are created
+        in one transaction, invalid ones are skipped and reported by row
+        number (the first RECIPE_IMPORT_MAX_ERRORS of them).
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+
+        try:
+            format = serializer.validated_data.get('format') or \
+                importing.get_format(upload.name)
+            result = importing.import_recipes(
+                request.user,
+                importing.read_rows(upload, format),
+            )
+        except importing.ImportFormatError as error:
+            raise ValidationError({'file': [str(error)]})
+        if result['imported']:
+            self.record_write()
+
+        return Response(result)
+
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or a JSON array."""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({'output': [
+                _('Must be one of: %s.') % ', '.join(EXPORT_CONTENT_TYPES)
+            ]})
+
+        with routers.replica_reads(request.user.pk):
+            queryset = self.filter_queryset(self.get_queryset())
+            # Resolve the database now: rows stream after the view returns.
+            recipes = queryset.using(queryset.db).iterator(
+                chunk_size=settings.RECIPE_EXPORT_CHUNK_SIZE,
+            )
+        serializer = self.get_serializer()
+        rows = (
+            json.dumps(
+                serializer.to_representation(recipe),
+                cls=JSONEncoder,
+                ensure_ascii=False,
+                separators=(',', ':'),
+            )
+            for recipe in recipes
+        )
+
+        if output == 'json':
+            content = _stream_json_array(rows)
+        else:
+            content = (row + '\n' for row in rows)
+
+        return StreamingHttpResponse(
+            content,
+            content_type=EXPORT_CONTENT_TYPES[output],
+        )
@@ -0,0 +1,22 @@
+"""
+Async views for the user API, routed in place of ManageUserView when
+served over ASGI.
+"""
+from rest_framework.response import Response
+
+from core.async_views import AsyncAPIView
+from user import views
+from user.serializers import UserSerializer
+
+
+class ManageUserView(AsyncAPIView):
+    """Manage the authenticated user; updates go to the sync view."""
+    sync_view = staticmethod(views.ManageUserView.as_view())
+
+    async def get(self, request):
+        """Return the authenticated user."""
+        serializer = UserSerializer(request.user, context={
+            'request': request,
+            'view': self,
+        })
+        return Response(serializer.data)
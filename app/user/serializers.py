@@ -1,16 +1,16 @@
 """
 Serializers for the use API view
 """
-from django.contrib.auth import (
-    get_user_model,
-    authenticate,
-)
+from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core import hashing
+from core.instrumentation import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the user object"""
 
     class Meta:
@@ -20,21 +20,23 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """create and return user with encrypted password."""
-        return get_user_model().objects.create_user(**validated_data)
+        password = validated_data.pop('password')
+        user = get_user_model().objects.make_user(**validated_data)
+        hashing.set_user_password(user, password)
+        user.save()
+
+        return user
 
     def update(self, instance, validated_data):
         """Update and return user."""
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            hashing.set_user_password(instance, password)
 
-        return user
+        return super().update(instance, validated_data)
 
 
-class AuthTokenSerializer(serializers.Serializer):
+class AuthTokenSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for the user auth token."""
     email = serializers.EmailField()
     password = serializers.CharField(
@@ -43,17 +45,30 @@ class AuthTokenSerializer(serializers.Serializer):
     )
 
     def validate(self, attrs):
-        """Validate and authenticate the user."""
+        """Validate and authenticate the user.
+
+        Like ModelBackend, with the password checked by core.hashing.
+        """
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        user = self.authenticate(email, password)
         if not user:
             msg = _('Unable to authenticate with provided credentials.')
             raise serializers.ValidationError(msg, code='authorization')
 
         attrs['user'] = user
         return attrs
+
+    def authenticate(self, email, password):
+        """Return the active user with email and password, if any."""
+        User = get_user_model()
+        try:
+            user = User._default_manager.get_by_natural_key(email)
+        except User.DoesNotExist:
+            # Hash anyway, so unknown emails take as long as known ones.
+            hashing.make_password(password)
+            return None
+
+        if hashing.check_user_password(user, password) and user.is_active:
+            return user
+        return None
@@ -1,13 +1,21 @@
 """
 Test from user api
 """
-from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncRequestFactory, TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.testing import QueryBudgetMixin
+from user.async_views import ManageUserView
+
 
 CREATE_USER_URL = reverse('user:create')
 
@@ -15,16 +23,28 @@ TOKEN_URL = reverse('user:token')
 
 ME_URL = reverse('user:about')
 
+# Most queries each endpoint may make.
+QUERY_BUDGETS = {
+    ('POST', 'user:create'): 2,
+    ('POST', 'user:token'): 5,
+    ('GET', 'user:about'): 0,
+    ('PATCH', 'user:about'): 4,
+    ('POST', 'user:about'): 0,
+}
+
 
 def create_user(**params):
     """Create and return a new user"""
     return get_user_model().objects.create_user(**params)
 
 
-class publicUserApiTests(TestCase):
+class publicUserApiTests(QueryBudgetMixin, TestCase):
     """Test the public features of user API"""
+    query_budgets = QUERY_BUDGETS
 
     def setUp(self):
+        # Start with full rate limit buckets.
+        cache.clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -127,8 +147,9 @@ class publicUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class privateUserApiTests(TestCase):
+class privateUserApiTests(QueryBudgetMixin, TestCase):
     """Test API that require authentication."""
+    query_budgets = QUERY_BUDGETS
 
     def setUp(self):
         self.user = create_user(
@@ -165,3 +186,47 @@ class privateUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
+
+
+class asyncUserApiTests(TestCase):
+    """Test the async view of the authenticated user."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(
+            email='test@gmail.com',
+            password='pass123',
+            name='Test User',
+        )
+        token = Token.objects.create(user=self.user)
+        self.factory = AsyncRequestFactory()
+        # AsyncRequestFactory takes extra headers by their HTTP name.
+        self.auth = {'authorization': 'Token %s' % token.key}
+
+    def test_retrieve_profile_from_token_cache(self):
+        """Test the profile is served from the cached token."""
+        view = async_to_sync(ManageUserView.as_view())
+        view(self.factory.get(ME_URL, **self.auth))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = view(self.factory.get(ME_URL, **self.auth))
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'email': self.user.email,
+            'name': self.user.name,
+        })
+
+    async def test_update_user_profile(self):
+        """Test updates are handled by the sync view."""
+        res = await ManageUserView.as_view()(self.factory.patch(
+            ME_URL,
+            {'name': 'updated_name'},
+            content_type='application/json',
+            **self.auth,
+        ))
+
+        await sync_to_async(self.user.refresh_from_db)()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.name, 'updated_name')
@@ -1,15 +1,21 @@
 """
 URL's for the user API
 """
+from django.conf import settings
 from django.urls import path
 
-from user import views
+from user import async_views, views
 
 
 app_name = 'user'
 
+if settings.API_ASYNC_VIEWS:
+    manage_user_view = async_views.ManageUserView.as_view()
+else:
+    manage_user_view = views.ManageUserView.as_view()
+
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
-    path('about/', views.ManageUserView.as_view(), name='about'),
+    path('about/', manage_user_view, name='about'),
 ]